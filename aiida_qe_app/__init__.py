@@ -1,15 +1,22 @@
-from aiida_qe_app.backend.app.api import app
-
 __version__ = "0.0.3"
 
 
-qeapp = {
-    "app": app,
-    "version": __version__,
-    "title": "AiiDA Quantum ESPRESSO App",
-    "description": (
-        "AiiDA Quantum ESPRESSO App is a web application for managing "
-        "and submitting Quantum ESPRESSO calculations using AiiDA."
-    ),
-    "logo": "logo.png",
-}
+def __getattr__(name):
+    # The app imports aiida and loads the profile, so it is only imported when
+    # it is used, not by the CLI or the workflow entry points.
+    if name == "app":
+        from aiida_qe_app.backend.app.api import app
+
+        return app
+    if name == "qeapp":
+        return {
+            "app": __getattr__("app"),
+            "version": __version__,
+            "title": "AiiDA Quantum ESPRESSO App",
+            "description": (
+                "AiiDA Quantum ESPRESSO App is a web application for managing "
+                "and submitting Quantum ESPRESSO calculations using AiiDA."
+            ),
+            "logo": "logo.png",
+        }
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -11,32 +11,24 @@ from aiida_qe_app.backend.app.calculation import router as calculation_router
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 import os
-from .utils import get_plugins
+from .utils import get_plugins, get_plugin_report, reload_plugins
 from aiida_qe_app.backend.app.submit import router as submit_router
+from aiida_qe_app.backend.app.events import router as events_router
+from aiida_qe_app.backend.app.tasks import router as tasks_router, get_task_registry
+from aiida_qe_app.backend.app.instrumentation import router as instrumentation_router
 
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.exception_handlers import http_exception_handler
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from pydantic_settings import BaseSettings
+from .config import backend_settings
+from .executor import get_executor
+import asyncio
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=backend_settings.qeapp_log_level.upper())
 logger = logging.getLogger(__name__)
 
-
-class BackendSettings(BaseSettings):
-    """
-    Settings can be set by setting the environment variables in upper case.
-    For example for setting `qeapp_gui_profile` one has to export
-    the evironment variable `qeapp_GUI_PROFILE`.
-    """
-
-    qeapp_gui_profile: str = ""  # if empty aiida uses default profile
-
-
-backend_settings = BackendSettings()
-
 app = FastAPI()
 manager.get_manager().load_profile(backend_settings.qeapp_gui_profile)
 
@@ -54,16 +46,63 @@ async def read_root() -> dict:
     return {"message": "Welcome to AiiDA-WorkGraph."}
 
 
+@app.get("/api/health")
+async def read_health() -> dict:
+    """Liveness probe, the worker is up and serving requests."""
+    return {"status": "ok"}
+
+
+def _check_storage() -> None:
+    from aiida import orm
+
+    orm.QueryBuilder().append(orm.User, project="id").first()
+
+
+@app.get("/api/ready")
+async def read_readiness():
+    """Readiness probe, the profile storage can be queried by the executor."""
+    try:
+        await asyncio.wait_for(get_executor().run(_check_storage), timeout=5)
+    except Exception as e:
+        return JSONResponse(
+            status_code=503, content={"status": "unavailable", "error": str(e)}
+        )
+    return {"status": "ready", "executor": get_executor().get_metrics()}
+
+
 @app.get("/plugins")
 async def list_plugins():
     plugins = get_plugins()
-    print(f"Found plugins: {plugins.keys()}")
     plugin_names = [plugin_name for plugin_name in plugins.keys()]
     return {"plugins": plugin_names}
 
 
+@app.get("/plugins/report")
+async def read_plugin_report():
+    """Return whether each plugin was loaded, its load time and error."""
+    return get_plugin_report()
+
+
+@app.post("/plugins/reload")
+async def reload_plugin_registry():
+    """Discover the installed plugins again.
+
+    The APIs of the plugins are mounted at startup, so a restart is still needed
+    to serve the API of a newly installed plugin.
+    """
+    plugins = await get_executor().run(reload_plugins)
+    return {"plugins": list(plugins.keys())}
+
+
 def mount_plugins():
     plugins = get_plugins()
+    for plugin_name, report in get_plugin_report().items():
+        logger.info(
+            "Plugin %s: %s in %.3f s",
+            plugin_name,
+            "loaded" if report["loaded"] else f"failed ({report['error']})",
+            report["load_time"],
+        )
     for plugin_name, plugin_module in plugins.items():
         print(f"Mounting plugin: {plugin_name}")
         router = plugin_module["router"]
@@ -91,6 +130,29 @@ mount_plugins()
 
 app.include_router(submit_router)
 app.include_router(calculation_router)
+app.include_router(events_router)
+app.include_router(tasks_router)
+app.include_router(instrumentation_router)
+
+
+@app.get("/api/executor/metrics")
+async def read_executor_metrics() -> dict:
+    """Return the queue depth of the executor running the blocking AiiDA calls."""
+    return get_executor().get_metrics()
+
+
+@app.on_event("startup")
+async def warm_up_caches():
+    """Load the protocols and pseudo families in the background."""
+    from .calculation import warm_up_calculation_caches
+
+    get_executor().submit(warm_up_calculation_caches)
+
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    get_task_registry().shutdown()
+    get_executor().shutdown()
 
 
 @app.get("/debug")
@@ -99,7 +161,7 @@ async def debug() -> dict:
 
 
 @app.get("/backend-setting")
-async def backend_settings():
+async def read_backend_settings():
     return backend_settings
 
 
@@ -0,0 +1,125 @@
+"""Disk cache for the payloads computed from the outputs of finished processes."""
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from .config import backend_settings
+
+
+def _to_json(obj: Any) -> Any:
+    """Serialize the objects unknown to ``json``, e.g. numpy arrays and scalars."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ResultCache:
+    """A content-addressed cache of JSON payloads, stored on disk.
+
+    The outputs of a finished process are immutable, so a payload computed from
+    them is addressed by the UUID of the node, the kind of payload and the version
+    of its schema. The total size is bounded: when it exceeds ``max_bytes``, the
+    least recently used entries are evicted, the modification time of an entry
+    being updated on every hit.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(uuid: str, kind: str, version: int, *args) -> str:
+        """Return the key of a payload."""
+        content = json.dumps([uuid, kind, version, args], default=str)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _get_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the payload stored under ``key``, or ``None`` if missing."""
+        path = self._get_path(key)
+        try:
+            with open(path, "r") as handle:
+                payload = json.load(handle)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return payload
+
+    def set(self, key: str, payload: Any) -> None:
+        """Store ``payload`` under ``key`` and evict old entries if needed."""
+        path = self._get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, so that readers never see partial entries
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, suffix=".tmp", delete=False
+        ) as handle:
+            json.dump(payload, handle, default=_to_json)
+        os.replace(handle.name, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the size limit is met."""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        for path in self.directory.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_result_cache() -> ResultCache:
+    """Return the result cache configured by the backend settings."""
+    return ResultCache(
+        backend_settings.qeapp_cache_dir, backend_settings.qeapp_cache_max_bytes
+    )
+
+
+def cached_payload(kind: str, version: int) -> Callable:
+    """Cache the payload returned by a function computing it from a process node.
+
+    Only the payloads of processes that finished successfully are cached, since
+    the outputs of running or failed processes can still change or be missing.
+    Bump ``version`` whenever the schema of the payload changes. The positional
+    arguments are part of the key, the keyword arguments are not and must not
+    change the payload.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(node, *args, **kwargs):
+            if not node.is_finished_ok:
+                return func(node, *args, **kwargs)
+            cache = get_result_cache()
+            key = cache.get_key(node.uuid, kind, version, *args)
+            payload = cache.get(key)
+            if payload is None:
+                payload = func(node, *args, **kwargs)
+                if payload is not None:
+                    cache.set(key, payload)
+            return payload
+
+        return wrapper
+
+    return decorator
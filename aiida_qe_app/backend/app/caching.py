@@ -0,0 +1,106 @@
+"""Opt-in AiiDA caching of the calculations, and the cache hits of a job.
+
+With caching enabled, a calculation with the same inputs as a finished one is
+not run again: its outputs are copied from the finished one, and the
+``_aiida_cached_from`` extra of the new node holds the uuid of the source.
+"""
+from typing import Any, Dict, List
+
+from aiida import orm
+
+CACHED_CALCULATIONS = (
+    "aiida.calculations:quantumespresso.pw",
+    "aiida.calculations:quantumespresso.projwfc",
+    "aiida.calculations:quantumespresso.dos",
+)
+CACHED_FROM_EXTRA = "_aiida_cached_from"
+
+
+def enable_caching() -> bool:
+    """Enable the caching of ``CACHED_CALCULATIONS`` for the loaded profile.
+
+    Caching is decided by the daemon workers running the calculations, from the
+    ``caching.enabled_for`` option of the profile, which they read at startup.
+    The option is only set once: the jobs that do not opt in disable the cache of
+    their calculations with ``metadata.disable_cache``, see ``disable_caching``.
+
+    :return: whether the option changed, in which case the daemon has to be
+        restarted for the workers to use it.
+    """
+    from aiida.manage import get_config, get_manager
+
+    config = get_config()
+    profile = get_manager().get_profile()
+    enabled_for = config.get_option("caching.enabled_for", scope=profile.name)
+    missing = [name for name in CACHED_CALCULATIONS if name not in enabled_for]
+    if not missing:
+        return False
+    config.set_option(
+        "caching.enabled_for", list(enabled_for) + missing, scope=profile.name
+    )
+    config.store()
+    return True
+
+
+def _get_cpu_hours(resources: dict, job_info: dict, ctime, mtime) -> float:
+    """Return the CPU-hours of a calculation, from its resources and wallclock time.
+
+    The wallclock time reported by the scheduler is used if available, otherwise
+    the time from the creation to the last modification of the node.
+    """
+    resources = resources or {}
+    cpus = resources.get("tot_num_mpiprocs") or resources.get(
+        "num_machines", 1
+    ) * resources.get("num_mpiprocs_per_machine", 1)
+    cpus *= resources.get("num_cores_per_mpiproc") or 1
+    seconds = (job_info or {}).get("wallclock_time_seconds")
+    if seconds is None:
+        seconds = (mtime - ctime).total_seconds()
+    return cpus * seconds / 3600
+
+
+def get_cache_report(process_ids: List[int]) -> Dict[str, Any]:
+    """Return the calculations among the processes that were cache hits.
+
+    The CPU-hours saved by each hit are estimated from the calculation it was
+    cached from.
+    """
+    qb = orm.QueryBuilder()
+    qb.append(
+        orm.CalcJobNode,
+        filters={"id": {"in": process_ids}},
+        project=["id", "attributes.process_label", f"extras.{CACHED_FROM_EXTRA}"],
+    )
+    calculations = qb.all()
+    sources = {uuid for _, _, uuid in calculations if uuid}
+    cpu_hours = {}
+    if sources:
+        qb = orm.QueryBuilder()
+        qb.append(
+            orm.CalcJobNode,
+            filters={"uuid": {"in": list(sources)}},
+            project=[
+                "uuid",
+                "attributes.resources",
+                "attributes.last_job_info",
+                "ctime",
+                "mtime",
+            ],
+        )
+        for uuid, resources, job_info, ctime, mtime in qb.iterall():
+            cpu_hours[uuid] = _get_cpu_hours(resources, job_info, ctime, mtime)
+    hits = [
+        {
+            "id": pk,
+            "process_label": process_label,
+            "cached_from": uuid,
+            "cpu_hours_saved": cpu_hours.get(uuid),
+        }
+        for pk, process_label, uuid in calculations
+        if uuid
+    ]
+    return {
+        "calculations": len(calculations),
+        "cache_hits": hits,
+        "cpu_hours_saved": sum(hit["cpu_hours_saved"] or 0 for hit in hits),
+    }
@@ -2,11 +2,19 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 from .models import StructureModel
+from copy import deepcopy
+import functools
+import logging
+import threading
+import time
 import traceback
+from .executor import offload
 
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 
 class CalculationRequest(BaseModel):
     protocol: str = "moderate"
@@ -17,14 +25,144 @@ class CalculationRequest(BaseModel):
     spin_orbit: str = "no"
 
 
-@router.post("/api/calculation/pw_parameters_from_protocol")
-async def get_pw_parameters_from_protocol(request: CalculationRequest):
+# the pseudo families are checked for modifications at most every PSEUDO_FAMILY_TTL seconds
+PSEUDO_FAMILY_TTL = 60
+PROTOCOLS = ("fast", "moderate", "precise")
+
+_pseudo_families = {}
+_pseudo_families_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_protocol_inputs(protocol: str) -> dict:
     from aiida_quantumespresso.workflows.pw.base import PwBaseWorkChain
 
-    print("request: ", request)
+    return PwBaseWorkChain.get_protocol_inputs(protocol)
+
+
+def get_protocol_inputs(protocol: str) -> dict:
+    """Return the inputs of the ``PwBaseWorkChain`` protocol.
+
+    The protocol files are installed with the package, so they are parsed once.
+    """
+    return deepcopy(_get_protocol_inputs(protocol))
+
+
+def _get_pseudo_family_state(uuid: str) -> Optional[tuple]:
+    """Return the state of the family, which changes when the family is modified,
+    ``None`` if it was deleted.
+
+    The state is the number of pseudos and their last modification time, with the
+    extras of the group, where its cutoffs are stored by ``set_cutoffs``.
+    """
+    from aiida import orm
+
+    qb = orm.QueryBuilder()
+    qb.append(orm.Group, filters={"uuid": uuid}, project="extras")
+    extras = qb.first(flat=True)
+    if extras is None:
+        return None
+    qb = orm.QueryBuilder()
+    qb.append(orm.Group, filters={"uuid": uuid}, tag="group")
+    qb.append(
+        orm.Node,
+        with_group="group",
+        project=[{"id": {"func": "count"}}, {"mtime": {"func": "max"}}],
+    )
+    count, mtime = qb.one()
+    return count, mtime, extras
+
+
+def _load_pseudo_family(label: str) -> dict:
+    """Load the pseudos of the family ``label`` and its cutoffs in Ry."""
+    from aiida.orm import QueryBuilder
+    from aiida.plugins import GroupFactory
+    from aiida_pseudo.common.units import U
+
+    SsspFamily = GroupFactory("pseudo.family.sssp")
+    PseudoDojoFamily = GroupFactory("pseudo.family.pseudo_dojo")
+    CutoffsPseudoPotentialFamily = GroupFactory("pseudo.family.cutoffs")
+
+    pseudo_set = (PseudoDojoFamily, SsspFamily, CutoffsPseudoPotentialFamily)
+    pseudo_family = QueryBuilder().append(pseudo_set, filters={"label": label}).one()[0]
+    pseudos = {
+        k: {"name": v.filename, "uuid": v.uuid}
+        for k, v in pseudo_family.pseudos.items()
+    }
+    current_unit = pseudo_family.get_cutoffs_unit()
+    cutoffs = {
+        element: {
+            k: U.Quantity(v, current_unit).to("Ry").to_tuple()[0]
+            for k, v in cutoff.items()
+        }
+        for element, cutoff in pseudo_family.get_cutoffs().items()
+    }
+    return {
+        "uuid": pseudo_family.uuid,
+        "state": _get_pseudo_family_state(pseudo_family.uuid),
+        "checked": time.monotonic(),
+        "pseudos": pseudos,
+        "cutoffs": cutoffs,
+    }
+
+
+def get_pseudo_family_data(label: str) -> dict:
+    """Return the pseudos and the cutoffs (in Ry) of all the elements of a family.
+
+    The data is cached, and reloaded when the family is modified: every
+    ``PSEUDO_FAMILY_TTL`` seconds, the state of the family, see
+    ``_get_pseudo_family_state``, is compared to the cached one.
+    """
+    with _pseudo_families_lock:
+        family = _pseudo_families.get(label)
+    if family is not None and time.monotonic() - family["checked"] > PSEUDO_FAMILY_TTL:
+        if _get_pseudo_family_state(family["uuid"]) == family["state"]:
+            family["checked"] = time.monotonic()
+        else:
+            family = None
+    if family is None:
+        family = _load_pseudo_family(label)
+        with _pseudo_families_lock:
+            _pseudo_families[label] = family
+    return family
+
+
+def clear_calculation_caches() -> None:
+    """Clear the cached protocols and pseudo families."""
+    _get_protocol_inputs.cache_clear()
+    with _pseudo_families_lock:
+        _pseudo_families.clear()
+
+
+def warm_up_calculation_caches() -> None:
+    """Load the protocols and the installed SSSP and PseudoDojo families."""
+    from aiida.orm import Group, QueryBuilder
+
+    for protocol in PROTOCOLS:
+        try:
+            _get_protocol_inputs(protocol)
+        except Exception as e:
+            logger.warning("Failed to load protocol %s: %s", protocol, e)
+    qb = QueryBuilder().append(
+        Group,
+        filters={
+            "or": [{"label": {"like": "SSSP/%"}}, {"label": {"like": "PseudoDojo/%"}}]
+        },
+        project="label",
+    )
+    for (label,) in qb.all():
+        try:
+            get_pseudo_family_data(label)
+        except Exception as e:
+            logger.warning("Failed to load pseudo family %s: %s", label, e)
+
+
+@router.post("/api/calculation/pw_parameters_from_protocol")
+@offload
+def get_pw_parameters_from_protocol(request: CalculationRequest):
     try:
         # Get parameters for the specified protocol
-        parameters = PwBaseWorkChain.get_protocol_inputs(request.protocol)
+        parameters = get_protocol_inputs(request.protocol)
 
         # Handle kpoints distance based on structure (pbc)
         if request.structure:
@@ -89,15 +227,8 @@ def get_pseudo_family_label(library_selection, exchange_functional, spin_orbit):
 
 
 @router.post("/api/calculation/get_pseudos")
-async def get_pseudos(request: CalculationRequest):
-    from aiida.orm import QueryBuilder
-    from aiida.plugins import GroupFactory
-    from aiida_pseudo.common.units import U
-
-    SsspFamily = GroupFactory("pseudo.family.sssp")
-    PseudoDojoFamily = GroupFactory("pseudo.family.pseudo_dojo")
-    CutoffsPseudoPotentialFamily = GroupFactory("pseudo.family.cutoffs")
-
+@offload
+def get_pseudos(request: CalculationRequest):
     try:
         structure = request.structure
         exchange_functional = request.exchange_functional
@@ -106,31 +237,17 @@ async def get_pseudos(request: CalculationRequest):
         pseudo_family_label = get_pseudo_family_label(
             library_selection, exchange_functional, spin_orbit
         )
-        # print("pseudo_family_label: ", pseudo_family_label)
         kind_list = list(set(list(structure.symbols)))
-        pseudo_set = (PseudoDojoFamily, SsspFamily, CutoffsPseudoPotentialFamily)
-        pseudo_family = (
-            QueryBuilder()
-            .append(pseudo_set, filters={"label": pseudo_family_label})
-            .one()[0]
-        )
-        pseudos = pseudo_family.get_pseudos(elements=kind_list)
-        pseudos = {k: {"name": v.filename, "uuid": v.uuid} for k, v in pseudos.items()}
-        all_cutoffs = pseudo_family.get_cutoffs()
-        current_unit = pseudo_family.get_cutoffs_unit()
-        cutoffs = {}
-        for element in kind_list:
-            cutoff = all_cutoffs.get(element, {})
-            cutoffs[element] = {
-                k: U.Quantity(v, current_unit).to("Ry").to_tuple()[0]
-                for k, v in cutoff.items()
-            }
+        pseudo_family = get_pseudo_family_data(pseudo_family_label)
+        pseudos = {k: pseudo_family["pseudos"][k] for k in kind_list}
+        cutoffs = {
+            element: pseudo_family["cutoffs"].get(element, {}) for element in kind_list
+        }
 
         data = {
             "pseudos": pseudos,
             "cutoffs": cutoffs,
         }
-        print("data: ", data)
         return data
     except KeyError as e:
         traceback.print_exc()
@@ -5,18 +5,24 @@ from typing import List, Optional
 from aiida import orm
 from aiida.cmdline.utils.decorators import with_dbenv
 from aiida.orm.querybuilder import QueryBuilder
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
 from .models import Code
+from .utils import ndjson_response, wants_ndjson
+from .executor import offload
 
 
 router = APIRouter()
 
 
 @router.get("/api/codes", response_model=List[Code])
+@offload
 @with_dbenv()
-async def read_codes() -> List[Code]:
+def read_codes(
+    request: Request, batch_size: int = Query(100, ge=1, le=1000)
+) -> List[Code]:
     """Get list of all codes"""
-
+    if wants_ndjson(request):
+        return ndjson_response(Code.iter_entities(batch_size=batch_size))
     return Code.get_entities()
 
 
@@ -28,8 +34,9 @@ async def get_codes_projectable_properties() -> List[str]:
 
 
 @router.get("/api/codes/{comp_id}", response_model=Code)
+@offload
 @with_dbenv()
-async def read_code(comp_id: int) -> Optional[Code]:
+def read_code(comp_id: int) -> Optional[Code]:
     """Get code by id."""
     qbobj = QueryBuilder()
     qbobj.append(orm.Code, filters={"id": comp_id}, project="**", tag="code").limit(1)
@@ -38,8 +45,9 @@ async def read_code(comp_id: int) -> Optional[Code]:
 
 
 @router.post("/api/codes", response_model=Code)
+@offload
 @with_dbenv()
-async def create_code(
+def create_code(
     code: Code,
 ) -> Code:
     """Create new AiiDA code."""
@@ -5,18 +5,24 @@ from typing import List, Optional
 from aiida import orm
 from aiida.cmdline.utils.decorators import with_dbenv
 from aiida.orm.querybuilder import QueryBuilder
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Query, Request, HTTPException
 from .models import Computer
+from .utils import ndjson_response, wants_ndjson
+from .executor import offload
 
 
 router = APIRouter()
 
 
 @router.get("/api/computers", response_model=List[Computer])
+@offload
 @with_dbenv()
-async def read_computers() -> List[Computer]:
+def read_computers(
+    request: Request, batch_size: int = Query(100, ge=1, le=1000)
+) -> List[Computer]:
     """Get list of all computers"""
-
+    if wants_ndjson(request):
+        return ndjson_response(Computer.iter_entities(batch_size=batch_size))
     return Computer.get_entities()
 
 
@@ -28,8 +34,9 @@ async def get_computers_projectable_properties() -> List[str]:
 
 
 @router.get("/api/computers/{comp_id}", response_model=Computer)
+@offload
 @with_dbenv()
-async def read_computer(comp_id: int) -> Optional[Computer]:
+def read_computer(comp_id: int) -> Optional[Computer]:
     """Get computer by id."""
     qbobj = QueryBuilder()
     qbobj.append(
@@ -40,7 +47,8 @@ async def read_computer(comp_id: int) -> Optional[Computer]:
 
 
 @router.post("/api/computers", status_code=201)
-async def add_computer(computer_data: dict):
+@offload
+def add_computer(computer_data: dict):
     # Check if the computer already exists
     from aiida.orm.utils.builders.computer import ComputerBuilder
     from aiida import orm
@@ -0,0 +1,30 @@
+from pathlib import Path
+from pydantic_settings import BaseSettings
+
+
+class BackendSettings(BaseSettings):
+    """
+    Settings can be set by setting the environment variables in upper case.
+    For example for setting `qeapp_gui_profile` one has to export
+    the evironment variable `qeapp_GUI_PROFILE`.
+    """
+
+    qeapp_gui_profile: str = ""  # if empty aiida uses default profile
+    # directory and maximum size of the cache of the results payloads
+    qeapp_cache_dir: Path = Path.home() / ".cache" / "aiida_qe_app"
+    qeapp_cache_max_bytes: int = 512 * 1024**2
+    # number of threads running the blocking AiiDA calls of the routes
+    qeapp_executor_workers: int = 8
+    qeapp_log_level: str = "debug"
+    # largest attribute or array slice returned by the data node routes
+    qeapp_max_payload_bytes: int = 10 * 1024**2
+    # seconds between two polls of the modified processes, for the job events
+    qeapp_watch_interval: float = 2.0
+    # production server, each worker process loads its own profile
+    qeapp_server_workers: int = 4
+    qeapp_server_timeout: int = 120  # restart a worker silent for longer (s)
+    qeapp_server_graceful_timeout: int = 30  # let requests finish on restart (s)
+    qeapp_server_keep_alive: int = 5  # keep idle connections open (s)
+
+
+backend_settings = BackendSettings()
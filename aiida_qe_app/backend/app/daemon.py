@@ -8,6 +8,7 @@ from aiida.cmdline.utils.decorators import with_dbenv
 from aiida.engine.daemon.client import DaemonException, get_daemon_client
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
+from .executor import offload
 
 
 router = APIRouter()
@@ -23,8 +24,9 @@ class DaemonStatusModel(BaseModel):
 
 
 @router.get("/api/daemon/status", response_model=DaemonStatusModel)
+@offload
 @with_dbenv()
-async def get_daemon_status() -> DaemonStatusModel:
+def get_daemon_status() -> DaemonStatusModel:
     """Return the daemon status."""
     client = get_daemon_client()
 
@@ -37,8 +39,9 @@ async def get_daemon_status() -> DaemonStatusModel:
 
 
 @router.get("/api/daemon/worker")
+@offload
 @with_dbenv()
-async def get_daemon_worker():
+def get_daemon_worker():
     """Return the daemon status."""
     client = get_daemon_client()
 
@@ -51,8 +54,9 @@ async def get_daemon_worker():
 
 
 @router.post("/api/daemon/start", response_model=DaemonStatusModel)
+@offload
 @with_dbenv()
-async def get_daemon_start() -> DaemonStatusModel:
+def get_daemon_start() -> DaemonStatusModel:
     """Start the daemon."""
     client = get_daemon_client()
 
@@ -70,8 +74,9 @@ async def get_daemon_start() -> DaemonStatusModel:
 
 
 @router.post("/api/daemon/stop", response_model=DaemonStatusModel)
+@offload
 @with_dbenv()
-async def get_daemon_stop() -> DaemonStatusModel:
+def get_daemon_stop() -> DaemonStatusModel:
     """Stop the daemon."""
     client = get_daemon_client()
 
@@ -87,8 +92,9 @@ async def get_daemon_stop() -> DaemonStatusModel:
 
 
 @router.post("/api/daemon/increase", response_model=DaemonStatusModel)
+@offload
 @with_dbenv()
-async def increase_daemon_worker() -> DaemonStatusModel:
+def increase_daemon_worker() -> DaemonStatusModel:
     """increase the daemon worker."""
     client = get_daemon_client()
 
@@ -104,8 +110,9 @@ async def increase_daemon_worker() -> DaemonStatusModel:
 
 
 @router.post("/api/daemon/decrease", response_model=DaemonStatusModel)
+@offload
 @with_dbenv()
-async def decrease_daemon_worker() -> DaemonStatusModel:
+def decrease_daemon_worker() -> DaemonStatusModel:
     """decrease the daemon worker."""
     client = get_daemon_client()
 
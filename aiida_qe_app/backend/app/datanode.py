@@ -1,66 +1,456 @@
-from typing import List, Dict, Any, Union
-from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Callable, Dict, List, Optional, Union
+from fastapi import APIRouter, HTTPException, Query, Request
 from aiida import orm
+import threading
+import time
+from .utils import (
+    decode_cursor,
+    encode_cursor,
+    keyset_filters,
+    ndjson_response,
+    wants_ndjson,
+)
+from .config import backend_settings
+from .executor import offload
+from .indexes import FORMULA_EXTRA, extra_text, uses_postgresql
 
 router = APIRouter()
 
 
+# the node types are queried again at most every NODE_TYPES_TTL seconds
+NODE_TYPES_TTL = 300
+
+_node_types = {"checked": None, "types": []}
+_node_types_lock = threading.Lock()
+
+
+def get_node_types() -> List[str]:
+    """Return the node types of the data nodes, cached for ``NODE_TYPES_TTL`` s."""
+    with _node_types_lock:
+        checked = _node_types["checked"]
+        if checked is None or time.monotonic() - checked > NODE_TYPES_TTL:
+            qb = orm.QueryBuilder()
+            qb.append(orm.Data, project="node_type")
+            qb.distinct()
+            _node_types["types"] = sorted(node_type for node_type, in qb.iterall())
+            _node_types["checked"] = time.monotonic()
+        return list(_node_types["types"])
+
+
+def _search_filter(value: str, match: str) -> Dict[str, str]:
+    """Return the filter matching the start of, or a substring of, a column."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    if match == "prefix":
+        # uses the btree (pattern ops) indexes of AiiDA
+        return {"like": f"{escaped}%"}
+    # uses the trigram indexes, see ``indexes.py``
+    return {"ilike": f"%{escaped}%"}
+
+
+def _search_expression(column, value: str, match: str):
+    """Return the SQLAlchemy expression of ``_search_filter`` on a column."""
+    ((operator, pattern),) = _search_filter(value, match).items()
+    return getattr(column, operator)(pattern)
+
+
+def _formula_search_query(
+    nodeType: str,
+    typeSearch: str,
+    labelSearch: str,
+    formulaSearch: str,
+    match: str,
+    cursor: str,
+):
+    """Return the query of ``read_datanode_data`` filtering on the formula.
+
+    The filters of QueryBuilder on the extras can not use the indexes of the
+    ``formula`` extra, see ``indexes.py``, so on PostgreSQL this query is built
+    with SQLAlchemy, with the same filters and order as the QueryBuilder one.
+
+    :raises ValueError: if the cursor is malformed.
+    """
+    from aiida.manage import get_manager
+    from aiida.storage.psql_dos.models.node import DbNode
+    from sqlalchemy import and_, or_
+
+    session = get_manager().get_profile_storage().get_session()
+    query = session.query(
+        DbNode.id, DbNode.uuid, DbNode.ctime, DbNode.node_type, DbNode.label
+    ).filter(
+        DbNode.node_type.like("data.%"),
+        _search_expression(extra_text(FORMULA_EXTRA), formulaSearch, match),
+    )
+    if nodeType:
+        query = query.filter(DbNode.node_type == nodeType)
+    if typeSearch:
+        query = query.filter(_search_expression(DbNode.node_type, typeSearch, match))
+    if labelSearch:
+        query = query.filter(_search_expression(DbNode.label, labelSearch, match))
+    if cursor:
+        ctime, pk = decode_cursor(cursor)
+        query = query.filter(
+            or_(DbNode.ctime < ctime, and_(DbNode.ctime == ctime, DbNode.id < pk))
+        )
+    return query.order_by(DbNode.ctime.desc(), DbNode.id.desc())
+
+
+def _search_builder(
+    nodeType: str,
+    typeSearch: str,
+    labelSearch: str,
+    formulaSearch: str,
+    match: str,
+    cursor: str,
+) -> orm.QueryBuilder:
+    """Return the query of ``read_datanode_data``, newest first.
+
+    :raises HTTPException: if the cursor is malformed.
+    """
+    filters = {"and": []}
+    if nodeType:
+        filters["and"].append({"node_type": nodeType})
+    if typeSearch:
+        filters["and"].append({"node_type": _search_filter(typeSearch, match)})
+    if labelSearch:
+        filters["and"].append({"label": _search_filter(labelSearch, match)})
+    if formulaSearch:
+        filters["and"].append(
+            {f"extras.{FORMULA_EXTRA}": _search_filter(formulaSearch, match)}
+        )
+    try:
+        if cursor:
+            filters["and"].append(keyset_filters(cursor))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    builder = orm.QueryBuilder()
+    builder.append(
+        orm.Data,
+        filters=filters,
+        project=["id", "uuid", "ctime", "node_type", "label"],
+        tag="data",
+    )
+    builder.order_by({"data": [{"ctime": "desc"}, {"id": "desc"}]})
+    return builder
+
+
+@router.get("/api/datanode-types")
+@offload
+def read_datanode_types() -> List[str]:
+    """Return the node types of the data nodes, to filter by exact type."""
+    return get_node_types()
+
+
 @router.get("/api/datanode-data")
-async def read_datanode_data(
+@offload
+def read_datanode_data(
+    request: Request,
     typeSearch: str = Query(None),
     labelSearch: str = Query(None),
-) -> List[Dict[str, Any]]:
-    from aiida.orm import QueryBuilder, Data
+    formulaSearch: str = Query(None),
+    nodeType: str = Query(None),
+    match: str = Query("contains", pattern="^(prefix|contains)$"),
+    limit: int = Query(None, ge=1, le=500),
+    cursor: str = Query(None),
+    batch_size: int = Query(100, ge=1, le=1000),
+):
+    """Return one page of data nodes, newest first.
+
+    ``nodeType`` selects an exact node type, see ``/api/datanode-types``, while
+    ``typeSearch``, ``labelSearch`` and ``formulaSearch`` match the start of the
+    value (``match=prefix``) or any substring of it. Pagination uses a keyset on
+    ``(ctime, id)``: pass the ``next_cursor`` of a page as ``cursor``.
+
+    If the client accepts ``application/x-ndjson``, the nodes are streamed one per
+    line instead, each with the ``cursor`` pointing after it.
+    """
     from aiida_workgraph.web.backend.app.utils import time_ago
 
-    try:
-        builder = QueryBuilder()
-        filters = {}
+    def to_dict(pk, uuid, ctime, node_type, label):
+        return {
+            "pk": pk,
+            "uuid": uuid,
+            "ctime": time_ago(ctime),
+            "node_type": node_type,
+            "label": label,
+            "cursor": encode_cursor(ctime, pk),
+        }
 
-        if typeSearch:
-            filters["node_type"] = {"like": f"%{typeSearch}%"}
+    if formulaSearch and uses_postgresql():
+        try:
+            query = _formula_search_query(
+                nodeType, typeSearch, labelSearch, formulaSearch, match, cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        if labelSearch:
-            filters["label"] = {"like": f"%{labelSearch}%"}
+        def rows(count, stream):
+            selected = query if count is None else query.limit(count)
+            return selected.yield_per(batch_size) if stream else selected.all()
 
-        builder.append(
-            Data,
-            filters=filters,
-            project=["id", "uuid", "ctime", "node_type", "label"],
-            tag="data",
+    else:
+        builder = _search_builder(
+            nodeType, typeSearch, labelSearch, formulaSearch, match, cursor
         )
-        builder.order_by({"data": {"ctime": "desc"}})
-        records = builder.all()
-        data = [
-            {
-                "pk": pk,
-                "uuid": uuid,
-                "ctime": time_ago(ctime),
-                "node_type": node_type,
-                "label": label,
-            }
-            for pk, uuid, ctime, node_type, label in records
-        ]
-        return data
-    except KeyError:
-        raise HTTPException(status_code=404, detail=f"Data node {id} not found")
 
+        def rows(count, stream):
+            if count is not None:
+                builder.limit(count)
+            return builder.iterall(batch_size=batch_size) if stream else builder.all()
+
+    if wants_ndjson(request):
+        return ndjson_response(to_dict(*row) for row in rows(limit, stream=True))
+
+    limit = limit or 50
+    # fetch one extra row to know whether there is a next page
+    results = rows(limit + 1, stream=False)
+    data = [to_dict(*row) for row in results[:limit]]
+    next_cursor = data[-1]["cursor"] if len(results) > limit else None
+    return {"nodes": data, "next_cursor": next_cursor}
 
-@router.get("/api/datanode/{id}")
-async def read_data_node_item(id: int) -> Dict[str, Any]:
+
+def _load_data_node(id: int) -> orm.Data:
+    from aiida.common.exceptions import NotExistent
 
     try:
         node = orm.load_node(id)
-        content = node.backend_entity.attributes
+    except NotExistent:
+        raise HTTPException(status_code=404, detail=f"Data node {id} not found")
+    if not isinstance(node, orm.Data):
+        raise HTTPException(status_code=404, detail=f"Data node {id} not found")
+    return node
+
+
+def _check_payload_size(size: int, what: str):
+    max_size = backend_settings.qeapp_max_payload_bytes
+    if size > max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{what} is {size} bytes, more than the maximum of {max_size}",
+        )
+
+
+def _read_array_header(handle) -> Optional[tuple]:
+    """Return the shape, Fortran order and dtype in the header of a ``.npy`` file.
+
+    The handle is left at the start of the data. ``None`` is returned for the
+    versions of the format which are not supported.
+    """
+    import numpy as np
+
+    version = np.lib.format.read_magic(handle)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(handle)
+    if version == (2, 0):
+        return np.lib.format.read_array_header_2_0(handle)
+    return None
+
+
+def _get_array_info(node: orm.ArrayData, name: str) -> Dict[str, Any]:
+    """Return the shape and dtype of an array, reading only the header of the file."""
+    import numpy as np
+
+    shape = node.get_shape(name)
+    info = {"shape": list(shape), "dtype": None, "nbytes": None}
+    with node.base.repository.open(f"{name}.npy", mode="rb") as handle:
+        header = _read_array_header(handle)
+    if header is None:
+        return info
+    dtype = header[2]
+    info["dtype"] = str(dtype)
+    info["nbytes"] = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+    return info
+
+
+def read_array_slice(
+    node: orm.ArrayData,
+    name: str,
+    index: tuple,
+    check_size: Optional[Callable[[int], None]] = None,
+):
+    """Return ``node.get_array(name)[index]``, reading only the selected rows.
+
+    ``index`` holds an integer or a slice per dimension, see ``parse_slices``.
+    Only the rows of the first dimension selected by ``index`` are read from the
+    ``.npy`` file, with one read for a contiguous range of rows. Arrays stored
+    in Fortran order, or in an unsupported format, are read whole.
+
+    :param check_size: called with the size of the slice in bytes, before the
+        rows are read.
+    :raises ValueError: if the index does not match the array.
+    """
+    import numpy as np
+
+    with node.base.repository.open(f"{name}.npy", mode="rb") as handle:
+        header = _read_array_header(handle)
+        if header is None or header[1] or header[2].hasobject:
+            handle.seek(0)
+            array = np.load(handle)
+            shape, dtype = array.shape, array.dtype
+        else:
+            shape, _, dtype = header
+            array = None
+        if len(index) > len(shape):
+            raise ValueError(
+                f"Array {name} has {len(shape)} dimensions, not {len(index)}"
+            )
+        # a view of the same shape without data, to check the index and the size
+        try:
+            view = np.broadcast_to(np.zeros((), dtype=dtype), shape)[index]
+        except (IndexError, ValueError) as e:
+            raise ValueError(str(e))
+        if check_size is not None:
+            check_size(view.size * dtype.itemsize)
+        if array is not None:
+            return array[index]
+        if not shape or not index:
+            return np.frombuffer(handle.read(), dtype=dtype).reshape(shape)
+        first, rest = index[0], index[1:]
+        if isinstance(first, slice):
+            rows = range(*first.indices(shape[0]))
+        else:
+            row = first % shape[0]
+            rows = range(row, row + 1)
+        row_shape = tuple(shape[1:])
+        row_bytes = int(np.prod(row_shape, dtype=np.int64)) * dtype.itemsize
+        offset = handle.tell()
+        if len(rows) > 0 and rows.step == 1:
+            handle.seek(offset + rows.start * row_bytes)
+            buffer = handle.read(len(rows) * row_bytes)
+        else:
+            chunks = []
+            for row in rows:
+                handle.seek(offset + row * row_bytes)
+                chunks.append(handle.read(row_bytes))
+            buffer = b"".join(chunks)
+    block = np.frombuffer(buffer, dtype=dtype).reshape((len(rows),) + row_shape)
+    if isinstance(first, slice):
+        return block[(slice(None),) + rest]
+    return block[(0,) + rest]
+
+
+def parse_slices(value: str) -> tuple:
+    """Parse ``start:stop:step`` ranges separated by commas, one per dimension."""
+    slices = []
+    for item in value.split(","):
+        parts = item.strip().split(":")
+        if len(parts) > 3:
+            raise ValueError(f"Invalid slice: {item!r}")
+        try:
+            bounds = [int(part) if part.strip() else None for part in parts]
+        except ValueError:
+            raise ValueError(f"Invalid slice: {item!r}")
+        if len(parts) == 1:
+            if bounds[0] is None:
+                raise ValueError(f"Invalid slice: {item!r}")
+            slices.append(bounds[0])
+        else:
+            slices.append(slice(*bounds))
+    return tuple(slices)
+
+
+@router.get("/api/datanode/{id}")
+@offload
+def read_data_node_item(id: int, full: bool = False) -> Dict[str, Any]:
+    """Return a summary of the node, with the size of each attribute.
+
+    The attributes are fetched with ``/api/datanode/{id}/attributes/{key}`` and the
+    arrays with ``/api/datanode/{id}/arrays/{name}``. With ``full``, all the
+    attributes are returned, if they are smaller than the maximum payload size.
+    """
+    import json
+
+    node = _load_data_node(id)
+    attributes = node.base.attributes.all
+    if full:
+        content = dict(attributes)
         content["node_type"] = node.node_type
+        _check_payload_size(len(json.dumps(content, default=str)), "The node")
         return content
-    except KeyError:
-        raise HTTPException(status_code=404, detail=f"Data node {id} not found")
+    summary = {
+        "pk": node.pk,
+        "uuid": node.uuid,
+        "node_type": node.node_type,
+        "label": node.label,
+        "description": node.description,
+        "ctime": node.ctime,
+        "mtime": node.mtime,
+        "attributes": {
+            key: {
+                "type": type(value).__name__,
+                "size": len(json.dumps(value, default=str)),
+            }
+            for key, value in attributes.items()
+        },
+    }
+    if isinstance(node, orm.ArrayData):
+        summary["arrays"] = {
+            name: _get_array_info(node, name) for name in node.get_arraynames()
+        }
+    return summary
+
+
+@router.get("/api/datanode/{id}/attributes/{key}")
+@offload
+def read_data_node_attribute(id: int, key: str) -> Dict[str, Any]:
+    """Return one attribute of the node."""
+    import json
+
+    node = _load_data_node(id)
+    try:
+        value = node.base.attributes.get(key)
+    except AttributeError:
+        raise HTTPException(status_code=404, detail=f"Attribute {key} not found")
+    _check_payload_size(len(json.dumps(value, default=str)), f"Attribute {key}")
+    return {"key": key, "value": value}
+
+
+@router.get("/api/datanode/{id}/arrays/{name}")
+@offload
+def read_data_node_array(
+    id: int,
+    name: str,
+    slices: str = Query(None, description="start:stop:step per dimension"),
+) -> Dict[str, Any]:
+    """Return a slice of an array of the node.
+
+    Only the rows of the first dimension in the slice are read from the ``.npy``
+    file, for example ``slices=0:100,::10`` reads the first 100 rows and returns
+    every tenth column of them.
+    """
+    import numpy as np
+
+    node = _load_data_node(id)
+    if not isinstance(node, orm.ArrayData) or name not in node.get_arraynames():
+        raise HTTPException(status_code=404, detail=f"Array {name} not found")
+    try:
+        index = parse_slices(slices) if slices else ()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        data = read_array_slice(
+            node,
+            name,
+            index,
+            check_size=lambda size: _check_payload_size(
+                size, f"The slice of array {name}"
+            ),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "name": name,
+        "shape": list(node.get_shape(name)),
+        "dtype": str(data.dtype),
+        "slices": slices,
+        "data": np.asarray(data).tolist(),
+    }
 
 
 # Route for deleting a datanode item
 @router.delete("/api/datanode/delete/{id}")
-async def delete_data_node(
+@offload
+def delete_data_node(
     id: int,
     dry_run: bool = False,
 ) -> Dict[str, Union[bool, str, List[int]]]:
@@ -0,0 +1,213 @@
+"""Push the state changes of the jobs to the clients with server-sent events.
+
+A single watcher polls the processes modified since its previous poll and
+dispatches the changes to the subscribed clients, so that N open browser tabs
+cost one query per interval instead of N polling loops.
+"""
+import asyncio
+import functools
+import json
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aiida.common.exceptions import NotExistent
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from .config import backend_settings
+from .executor import get_executor
+from .process_tree import get_job_processes, get_processes, is_qeapp_job
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+# channel of the creation and state changes of all the jobs
+ALL_JOBS = None
+QUEUE_SIZE = 1000
+HEARTBEAT = 15  # seconds
+# overlap of the polled time windows, in case of clock skew with the daemon
+CLOCK_MARGIN = timedelta(seconds=1)
+
+
+def _get_state(row: Dict[str, Any]) -> Tuple:
+    return (
+        row["process_state"],
+        row["process_status"],
+        row["exit_status"],
+        row["scheduler_state"],
+    )
+
+
+class ProcessWatcher:
+    """Poll the modified processes while there are subscribers.
+
+    A client subscribes to one job, receiving the changes of all its processes,
+    or to ``ALL_JOBS``, receiving the changes of the jobs themselves. Only the
+    processes whose state changed are pushed.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._subscribers: Dict[Optional[int], Set[asyncio.Queue]] = {}
+        # the job of each watched process, and the last state pushed per channel
+        self._jobs: Dict[int, int] = {}
+        self._states: Dict[Optional[int], Dict[int, Tuple]] = {}
+        self._since = None
+        self._task = None
+
+    async def subscribe(
+        self, job_id: Optional[int] = ALL_JOBS
+    ) -> Tuple[asyncio.Queue, List[Dict[str, Any]]]:
+        """Subscribe to a channel, return the queue of its events and a snapshot.
+
+        The snapshot holds the current processes of the job, it is empty for the
+        ``ALL_JOBS`` channel.
+        """
+        from aiida.common import timezone
+
+        snapshot = []
+        if job_id is not ALL_JOBS:
+            snapshot = await get_executor().run(get_job_processes, job_id)
+        if self._since is None:
+            self._since = timezone.now() - CLOCK_MARGIN
+        states = self._states.setdefault(job_id, {})
+        for row in snapshot:
+            self._jobs[row["id"]] = job_id
+            states[row["id"]] = _get_state(row)
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+        return queue, snapshot
+
+    def unsubscribe(self, queue: asyncio.Queue, job_id: Optional[int] = ALL_JOBS):
+        """Remove the queue, and forget the channel when it has no subscriber."""
+        subscribers = self._subscribers.get(job_id, set())
+        subscribers.discard(queue)
+        if subscribers:
+            return
+        self._subscribers.pop(job_id, None)
+        self._states.pop(job_id, None)
+        if job_id is not ALL_JOBS:
+            self._jobs = {pk: job for pk, job in self._jobs.items() if job != job_id}
+
+    async def _watch(self):
+        from aiida.common import timezone
+
+        try:
+            while self._subscribers:
+                start = timezone.now()
+                try:
+                    rows = await get_executor().run(
+                        get_processes, modified_since=self._since
+                    )
+                except Exception:
+                    logger.exception("Failed to poll the modified processes")
+                else:
+                    self._since = start - CLOCK_MARGIN
+                    self._dispatch(rows)
+                await asyncio.sleep(self.interval)
+        finally:
+            self._task = None
+            self._since = None
+
+    def _dispatch(self, rows: List[Dict[str, Any]]):
+        # ordered by ctime, so the caller of a process is dispatched before it
+        for row in rows:
+            channels = []
+            job_id = self._jobs.get(row["id"], self._jobs.get(row["caller"]))
+            if job_id is not None:
+                self._jobs[row["id"]] = job_id
+                channels.append(job_id)
+            if ALL_JOBS in self._subscribers and is_qeapp_job(row):
+                channels.append(ALL_JOBS)
+            state = _get_state(row)
+            for channel in channels:
+                states = self._states.setdefault(channel, {})
+                if states.get(row["id"]) == state:
+                    continue
+                states[row["id"]] = state
+                self._publish(channel, "update", row)
+
+    def _publish(self, channel: Optional[int], event: str, data: Any):
+        for queue in self._subscribers.get(channel, ()):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # the client is too slow, it has to reload the state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", None))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return the number of subscribers and watched processes."""
+        return {
+            "running": self._task is not None,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "channels": len(self._subscribers),
+            "processes": len(self._jobs),
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_watcher() -> ProcessWatcher:
+    """Return the process watcher shared by all the clients."""
+    return ProcessWatcher(backend_settings.qeapp_watch_interval)
+
+
+def format_event(event: str, data: Any) -> str:
+    """Return a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def event_response(request: Request, job_id: Optional[int] = ALL_JOBS):
+    """Stream the events of a channel until the client disconnects."""
+    watcher = get_watcher()
+    try:
+        queue, snapshot = await watcher.subscribe(job_id)
+    except NotExistent:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def stream():
+        try:
+            yield format_event("snapshot", snapshot)
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event(event, data)
+        finally:
+            watcher.unsubscribe(queue, job_id)
+
+    return StreamingResponse(
+        stream(),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/api/events/jobs")
+async def read_jobs_events(request: Request):
+    """Stream the creation and state changes of the jobs."""
+    return await event_response(request)
+
+
+@router.get("/api/events/jobs/{id}")
+async def read_job_events(id: int, request: Request):
+    """Stream the processes of a job, then the changes of their state.
+
+    The first ``snapshot`` event holds all the processes, each with the id of its
+    ``caller``, the following ``update`` events hold one modified process. After a
+    ``resync`` event, the client missed events and should reconnect.
+    """
+    return await event_response(request, id)
+
+
+@router.get("/api/events/metrics")
+async def read_events_metrics() -> dict:
+    """Return the number of subscribers of the process watcher."""
+    return get_watcher().get_metrics()
@@ -0,0 +1,103 @@
+"""Execution of the blocking AiiDA calls off the event loop.
+
+The AiiDA API is synchronous and bound by the database and the disk. Calling it
+from an ``async`` route blocks the event loop, so that one slow request stalls
+all the others. The routes are instead run in a dedicated, bounded thread pool.
+The storage backend of AiiDA uses a scoped session, so every worker thread gets
+its own session.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from .config import backend_settings
+
+
+def _initialize_worker() -> None:
+    """Open the storage of the loaded profile in the worker thread."""
+    from aiida.manage import get_manager
+
+    get_manager().get_profile_storage()
+
+
+class BlockingExecutor:
+    """A bounded thread pool running blocking calls, with queue-depth metrics."""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="qeapp-aiida",
+            initializer=_initialize_worker,
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+
+    def _call(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run ``func`` in the pool and wait for its result."""
+        with self._lock:
+            self._queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self._call, func, args, kwargs)
+        )
+
+    def submit(self, func: Callable, *args, **kwargs):
+        """Run ``func`` in the pool without waiting, return its future."""
+        with self._lock:
+            self._queued += 1
+        return self._executor.submit(self._call, func, args, kwargs)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return the size of the pool and the number of queued and running calls."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_executor() -> BlockingExecutor:
+    """Return the executor configured by the backend settings."""
+    return BlockingExecutor(backend_settings.qeapp_executor_workers)
+
+
+def offload(func: Callable) -> Callable:
+    """Turn a blocking route function into a coroutine run by the executor.
+
+    The signature of ``func`` is kept, so that FastAPI parses the parameters of
+    the route as usual.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await get_executor().run(func, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,126 @@
+"""Create the database indexes used by the search of the data nodes.
+
+AiiDA indexes ``node_type`` and ``label`` for prefix searches (``LIKE 'x%'``),
+but a search for a substring (``LIKE '%x%'``) scans the whole node table. These
+trigram indexes, and the indexes of the ``formula`` extra of the structures, keep
+the search interactive on large profiles. The index of the structure hash makes
+the lookup of an already stored structure, see ``structures.py``, a single
+index scan. Only PostgreSQL is supported.
+
+QueryBuilder wraps each filter on the extras in ``CASE WHEN jsonb_typeof(...)``,
+which no expression index can serve: the queries meant to use the indexes of the
+extras filter on ``extra_text`` instead, the exact expression of the indexes.
+The ``formula`` extra is only set on the structures submitted by the app, so
+``backfill_formula_extra`` sets it on the structures stored before.
+"""
+from typing import Dict, List
+
+# extra holding the chemical formula of the structures
+FORMULA_EXTRA = "formula"
+
+SEARCH_INDEXES = {
+    "ix_qeapp_db_dbnode_label_trgm": (
+        "CREATE INDEX IF NOT EXISTS ix_qeapp_db_dbnode_label_trgm "
+        "ON db_dbnode USING gin (label gin_trgm_ops)"
+    ),
+    "ix_qeapp_db_dbnode_node_type_trgm": (
+        "CREATE INDEX IF NOT EXISTS ix_qeapp_db_dbnode_node_type_trgm "
+        "ON db_dbnode USING gin (node_type gin_trgm_ops)"
+    ),
+    "ix_qeapp_db_dbnode_formula": (
+        "CREATE INDEX IF NOT EXISTS ix_qeapp_db_dbnode_formula "
+        "ON db_dbnode ((extras ->> 'formula') text_pattern_ops)"
+    ),
+    "ix_qeapp_db_dbnode_structure_hash": (
+        "CREATE INDEX IF NOT EXISTS ix_qeapp_db_dbnode_structure_hash "
+        "ON db_dbnode ((extras ->> 'qeapp_structure_hash'))"
+    ),
+    "ix_qeapp_db_dbnode_formula_trgm": (
+        "CREATE INDEX IF NOT EXISTS ix_qeapp_db_dbnode_formula_trgm "
+        "ON db_dbnode USING gin ((extras ->> 'formula') gin_trgm_ops)"
+    ),
+}
+
+
+def _get_session():
+    from aiida.manage import get_manager
+
+    return get_manager().get_profile_storage().get_session()
+
+
+def uses_postgresql() -> bool:
+    """Return whether the storage of the loaded profile is a PostgreSQL database."""
+    return _get_session().get_bind().dialect.name == "postgresql"
+
+
+def extra_text(name: str):
+    """Return the SQLAlchemy expression ``extras ->> 'name'`` of the node table.
+
+    This is the expression of the indexes above: a query filtering on it, and not
+    on the ``extras.name`` filter of QueryBuilder, can use them. The key is
+    written in the SQL as a literal, a bound parameter would not match the index.
+    """
+    from aiida.storage.psql_dos.models.node import DbNode
+    from sqlalchemy import literal_column
+
+    if not name.isidentifier():
+        raise ValueError(f"Invalid extra name: {name!r}")
+    return DbNode.extras.op("->>")(literal_column(f"'{name}'"))
+
+
+def backfill_formula_extra(dry_run: bool = False, batch_size: int = 1000) -> int:
+    """Set the ``formula`` extra on the stored structures which do not have it.
+
+    :return: the number of structures updated, or to update with ``dry_run``.
+    """
+    from aiida import orm
+
+    qb = orm.QueryBuilder()
+    qb.append(
+        orm.StructureData,
+        filters={"extras": {"!has_key": FORMULA_EXTRA}},
+        project="id",
+    )
+    # the ids are fetched first, the extras must not change during the query
+    pks = [pk for pk, in qb.iterall(batch_size=batch_size)]
+    if dry_run:
+        return len(pks)
+    for start in range(0, len(pks), batch_size):
+        qb = orm.QueryBuilder()
+        qb.append(
+            orm.StructureData,
+            filters={"id": {"in": pks[start : start + batch_size]}},
+            project="*",
+        )
+        for (structure,) in qb.all():
+            structure.base.extras.set(FORMULA_EXTRA, structure.get_formula())
+    return len(pks)
+
+
+def create_search_indexes(dry_run: bool = False) -> Dict[str, str]:
+    """Create the missing search indexes in the storage of the loaded profile.
+
+    :return: the status of each index: ``ok`` (created or already existing),
+        ``skipped`` (dry run) or the error raised by the database.
+    """
+    from sqlalchemy import text
+
+    session = _get_session()
+    dialect = session.get_bind().dialect.name
+    if dialect != "postgresql":
+        raise ValueError(f"Search indexes require PostgreSQL, not {dialect}")
+    statements: List[str] = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+    statements.extend(SEARCH_INDEXES.values())
+    status = {}
+    for name, statement in zip(["pg_trgm"] + list(SEARCH_INDEXES), statements):
+        if dry_run:
+            status[name] = "skipped"
+            continue
+        try:
+            session.execute(text(statement))
+            session.commit()
+            status[name] = "ok"
+        except Exception as e:
+            session.rollback()
+            status[name] = str(e)
+    return status
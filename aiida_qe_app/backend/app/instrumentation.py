@@ -0,0 +1,413 @@
+"""Where the time of the jobs goes: queue wait, run time, parsing and overhead.
+
+AiiDA keeps only the last scheduler state of a calculation, so the timeline of
+each calculation is reconstructed from the timestamps of its node, of the
+``last_job_info`` reported by the scheduler and of its outputs. The durations
+within the scheduler (queue wait and run time) only use the clock of the
+scheduler, the other ones the clock of the AiiDA daemon.
+"""
+import math
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from aiida import orm
+from aiida.common import timezone
+from aiida.common.exceptions import NotExistent
+from fastapi import APIRouter, HTTPException, Query
+
+from .cache import cached_payload, get_result_cache
+from .executor import offload
+from .process_tree import (
+    QEAPP_WORKCHAIN_PROCESS_TYPE,
+    QEAPP_WORKGRAPH_PROCESS_LABEL,
+    TERMINAL_STATES,
+    get_job_processes,
+)
+
+router = APIRouter()
+
+PAYLOAD_VERSION = 1
+CALCJOB_PROCESS_TYPE_PREFIX = "aiida.calculations:"
+# the outputs of a calculation that are not created by its parser
+UNPARSED_OUTPUTS = ("retrieved", "remote_folder", "remote_stash")
+# the upper bound of the number of atoms of each structure size
+STRUCTURE_SIZES = ((10, "1-10"), (50, "11-50"), (200, "51-200"))
+PERCENTILES = (50, 90, 99)
+CALCJOB_PROJECTIONS = [
+    "id",
+    "attributes.process_label",
+    "attributes.process_state",
+    "attributes.state",
+    "attributes.scheduler_state",
+    "attributes.scheduler_lastchecktime",
+    "attributes.last_job_info",
+    "ctime",
+    "mtime",
+]
+
+
+def _get_job_info(job_info: Optional[dict]) -> Dict[str, Any]:
+    """Return the times reported by the scheduler for a calculation."""
+    from aiida.schedulers.datastructures import JobInfo
+
+    keys = ("submission_time", "dispatch_time", "finish_time", "wallclock_time_seconds")
+    try:
+        info = JobInfo.load_from_dict(job_info or {})
+    except Exception:
+        return dict.fromkeys(keys)
+    return {key: getattr(info, key, None) for key in keys}
+
+
+def _seconds(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    """Return the seconds from ``start`` to ``end``, if both are known."""
+    if start is None or end is None:
+        return None
+    try:
+        return (end - start).total_seconds()
+    except TypeError:
+        # a naive and an aware datetime
+        return None
+
+
+def _isoformat(time: Optional[datetime]) -> Optional[str]:
+    return time.isoformat() if time is not None else None
+
+
+def _read_folder_size(node: orm.Node) -> Dict[str, int]:
+    """Return the number of files and bytes in the repository of the node."""
+    files = size = 0
+    for root, _, filenames in node.base.repository.walk():
+        for filename in filenames:
+            with node.base.repository.open(root / filename, "rb") as handle:
+                handle.seek(0, os.SEEK_END)
+                size += handle.tell()
+            files += 1
+    return {"files": files, "bytes": size}
+
+
+def get_folder_size(uuid: str) -> Dict[str, int]:
+    """Return the number of files and bytes in the repository of a stored node.
+
+    The repository of a stored node never changes: its size is computed once,
+    opening each file, and then read from the result cache, keyed by the UUID.
+    """
+    cache = get_result_cache()
+    key = cache.get_key(uuid, "folder_size", PAYLOAD_VERSION)
+    size = cache.get(key)
+    if size is None:
+        size = _read_folder_size(orm.load_node(uuid))
+        cache.set(key, size)
+    return size
+
+
+def _get_outputs(calcjob_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Return the retrieved folder and the end of the parsing of each calculation.
+
+    The parsing ends with the creation of its last output.
+    """
+    outputs = {pk: {"retrieved": None, "parsed": None} for pk in calcjob_ids}
+    if not calcjob_ids:
+        return outputs
+    qb = orm.QueryBuilder()
+    qb.append(
+        orm.CalcJobNode,
+        filters={"id": {"in": calcjob_ids}},
+        project="id",
+        tag="calcjob",
+    )
+    qb.append(
+        orm.Data,
+        with_incoming="calcjob",
+        edge_project="label",
+        project=["uuid", "ctime"],
+    )
+    for calcjob_id, label, uuid, ctime in qb.iterall(batch_size=100):
+        if label == "retrieved":
+            outputs[calcjob_id]["retrieved"] = (uuid, ctime)
+        elif label not in UNPARSED_OUTPUTS:
+            parsed = outputs[calcjob_id]["parsed"]
+            outputs[calcjob_id]["parsed"] = max(ctime, parsed or ctime)
+    return outputs
+
+
+def get_calcjob_timings(calcjob_ids: List[int]) -> List[Dict[str, Any]]:
+    """Return the timeline, durations (s) and retrieved files of the calculations.
+
+    The ``events`` are the creation of the node, the submission to the scheduler,
+    the start and end of the job in the scheduler, the retrieval of the files, the
+    end of the parsing and the termination of the process. The unknown ones are
+    ``None``, e.g. the scheduler times not reported by the ``direct`` scheduler.
+    """
+    if not calcjob_ids:
+        return []
+    qb = orm.QueryBuilder()
+    qb.append(
+        orm.CalcJobNode,
+        filters={"id": {"in": calcjob_ids}},
+        project=CALCJOB_PROJECTIONS,
+        tag="calcjob",
+    )
+    qb.append(
+        orm.AbstractCode, with_outgoing="calcjob", project="label", outerjoin=True
+    )
+    qb.order_by({"calcjob": [{"ctime": "asc"}, {"id": "asc"}]})
+    calcjobs = qb.all()
+    outputs = _get_outputs([projection[0] for projection in calcjobs])
+    now = timezone.now()
+    timings = []
+    for projection in calcjobs:
+        row = {
+            key.replace("attributes.", ""): value
+            for key, value in zip(CALCJOB_PROJECTIONS, projection)
+        }
+        job_info = _get_job_info(row["last_job_info"])
+        retrieved = outputs[row["id"]]["retrieved"]
+        retrieved_time = retrieved[1] if retrieved else None
+        parsed = outputs[row["id"]]["parsed"]
+        terminated = row["mtime"] if row["process_state"] in TERMINAL_STATES else None
+        run_time = job_info["wallclock_time_seconds"]
+        if run_time is None:
+            run_time = _seconds(job_info["dispatch_time"], job_info["finish_time"])
+        timings.append(
+            {
+                "id": row["id"],
+                "process_label": row["process_label"],
+                "code": projection[-1],
+                "process_state": row["process_state"],
+                "calc_job_state": row["state"],
+                "scheduler_state": row["scheduler_state"],
+                "scheduler_lastchecktime": row["scheduler_lastchecktime"],
+                "events": {
+                    "created": _isoformat(row["ctime"]),
+                    "submitted": _isoformat(job_info["submission_time"]),
+                    "started": _isoformat(job_info["dispatch_time"]),
+                    "finished": _isoformat(job_info["finish_time"]),
+                    "retrieved": _isoformat(retrieved_time),
+                    "parsed": _isoformat(parsed),
+                    "terminated": _isoformat(terminated),
+                },
+                "queue_wait": _seconds(
+                    job_info["submission_time"], job_info["dispatch_time"]
+                ),
+                "run_time": run_time,
+                "parse_time": _seconds(retrieved_time, parsed),
+                "total_time": _seconds(row["ctime"], terminated or now),
+                "retrieved": get_folder_size(retrieved[0]) if retrieved else None,
+            }
+        )
+    return timings
+
+
+def _get_busy_time(intervals: List[tuple]) -> float:
+    """Return the seconds covered by at least one of the intervals."""
+    busy = 0.0
+    end = None
+    for start, stop in sorted(intervals):
+        if end is None or start > end:
+            busy += (stop - start).total_seconds()
+            end = stop
+        elif stop > end:
+            busy += (stop - end).total_seconds()
+            end = stop
+    return busy
+
+
+@cached_payload("timings", PAYLOAD_VERSION)
+def get_job_timings(node: orm.ProcessNode) -> Dict[str, Any]:
+    """Return the timings of the calculations of the job, and their totals.
+
+    The ``overhead`` is the time of the job without any calculation running, spent
+    in the workflow steps and waiting for the daemon.
+    """
+    processes = get_job_processes(node.pk)
+    calcjob_ids = [
+        process["id"]
+        for process in processes
+        if (process["process_type"] or "").startswith(CALCJOB_PROCESS_TYPE_PREFIX)
+    ]
+    calcjobs = get_calcjob_timings(calcjob_ids)
+    now = timezone.now()
+    process_state = node.process_state.value if node.process_state else None
+    end = node.mtime if process_state in TERMINAL_STATES else now
+    intervals = []
+    for calcjob in calcjobs:
+        start = datetime.fromisoformat(calcjob["events"]["created"])
+        stop = calcjob["events"]["terminated"]
+        intervals.append((start, datetime.fromisoformat(stop) if stop else now))
+    wall_time = _seconds(node.ctime, end)
+    busy_time = _get_busy_time(intervals)
+
+    def total(key):
+        return sum(calcjob[key] or 0 for calcjob in calcjobs)
+
+    return {
+        "id": node.pk,
+        "process_state": process_state,
+        "ctime": node.ctime.isoformat(),
+        "end": end.isoformat(),
+        "totals": {
+            "wall_time": wall_time,
+            "calculation_time": busy_time,
+            "overhead": max(0.0, wall_time - busy_time),
+            "queue_wait": total("queue_wait"),
+            "run_time": total("run_time"),
+            "parse_time": total("parse_time"),
+            "retrieved_bytes": sum(
+                (calcjob["retrieved"] or {}).get("bytes", 0) for calcjob in calcjobs
+            ),
+        },
+        "calcjobs": calcjobs,
+    }
+
+
+def count_atoms(formula: Optional[str]) -> Optional[int]:
+    """Return the number of atoms of a compact formula, e.g. 8 for ``Si2O6``."""
+    if not formula:
+        return None
+    counts = re.findall(r"[A-Z][a-z]*(\d*)", formula)
+    return sum(int(count or 1) for count in counts) or None
+
+
+def get_structure_size(natoms: Optional[int]) -> str:
+    """Return the structure size bin of a number of atoms."""
+    if natoms is None:
+        return "unknown"
+    for limit, name in STRUCTURE_SIZES:
+        if natoms <= limit:
+            return name
+    return f">{STRUCTURE_SIZES[-1][0]}"
+
+
+def get_percentiles(values: List[float]) -> Dict[str, Any]:
+    """Return the count and nearest-rank ``PERCENTILES`` of the values."""
+    values = sorted(value for value in values if value is not None)
+    summary = {"count": len(values)}
+    for percentile in PERCENTILES:
+        index = max(0, math.ceil(percentile / 100 * len(values)) - 1)
+        summary[f"p{percentile}"] = values[index] if values else None
+    return summary
+
+
+def _summarize(groups: Dict[str, Dict[str, List[float]]]) -> Dict[str, Any]:
+    return {
+        name: {metric: get_percentiles(values) for metric, values in metrics.items()}
+        for name, metrics in sorted(groups.items())
+    }
+
+
+def get_timings_summary(limit: int) -> Dict[str, Any]:
+    """Return the percentiles of the timings of the last finished jobs.
+
+    The durations (s) of the calculations are grouped by protocol, by code and
+    by size of the structure, the wall time of the jobs by protocol and by size.
+    """
+    qb = orm.QueryBuilder()
+    qb.append(
+        orm.ProcessNode,
+        filters={
+            "or": [
+                {"process_type": QEAPP_WORKCHAIN_PROCESS_TYPE},
+                {"attributes.process_label": QEAPP_WORKGRAPH_PROCESS_LABEL},
+            ],
+            "attributes.process_state": "finished",
+        },
+        project=[
+            "id",
+            "extras.workchain.protocol",
+            "extras.structure",
+            "ctime",
+            "mtime",
+        ],
+        tag="job",
+    )
+    qb.order_by({"job": [{"ctime": "desc"}, {"id": "desc"}]})
+    qb.limit(limit)
+    jobs = {}
+    for pk, protocol, formula, ctime, mtime in qb.iterall():
+        jobs[pk] = {
+            "protocol": protocol or "unknown",
+            "structure_size": get_structure_size(count_atoms(formula)),
+            "ctime": ctime,
+            "wall_time": _seconds(ctime, mtime),
+        }
+    groups = {"protocol": {}, "code": {}, "structure_size": {}}
+    for job in jobs.values():
+        for group in ("protocol", "structure_size"):
+            metrics = groups[group].setdefault(job[group], {})
+            metrics.setdefault("job_wall_time", []).append(job["wall_time"])
+    if not jobs:
+        return {"jobs": 0, "calcjobs": 0, **groups}
+    qb = orm.QueryBuilder()
+    qb.append(
+        orm.ProcessNode, filters={"id": {"in": list(jobs)}}, project="id", tag="job"
+    )
+    qb.append(
+        orm.CalcJobNode,
+        with_ancestors="job",
+        filters={"attributes.process_state": "finished"},
+        project=["id", "attributes.last_job_info", "ctime", "mtime"],
+        tag="calcjob",
+    )
+    qb.append(
+        orm.AbstractCode, with_outgoing="calcjob", project="label", outerjoin=True
+    )
+    # a calculation using the outputs of an older job is also its descendant: it
+    # belongs to the last job created before it
+    calcjobs = {}
+    for job_id, pk, job_info, ctime, mtime, code in qb.iterall(batch_size=100):
+        owner = calcjobs.get(pk)
+        if owner is not None and jobs[owner[0]]["ctime"] >= jobs[job_id]["ctime"]:
+            continue
+        calcjobs[pk] = (job_id, job_info, ctime, mtime, code)
+    for job_id, job_info, ctime, mtime, code in calcjobs.values():
+        job_info = _get_job_info(job_info)
+        run_time = job_info["wallclock_time_seconds"]
+        if run_time is None:
+            run_time = _seconds(job_info["dispatch_time"], job_info["finish_time"])
+        values = {
+            "queue_wait": _seconds(
+                job_info["submission_time"], job_info["dispatch_time"]
+            ),
+            "run_time": run_time,
+            "total_time": _seconds(ctime, mtime),
+        }
+        keys = {
+            "protocol": jobs[job_id]["protocol"],
+            "code": code or "unknown",
+            "structure_size": jobs[job_id]["structure_size"],
+        }
+        for group, key in keys.items():
+            metrics = groups[group].setdefault(key, {})
+            for metric, value in values.items():
+                metrics.setdefault(metric, []).append(value)
+    return {
+        "jobs": len(jobs),
+        "calcjobs": len(calcjobs),
+        **{group: _summarize(values) for group, values in groups.items()},
+    }
+
+
+@router.get("/api/jobs-data/{id}/timings")
+@offload
+def read_job_timings(id: int):
+    """Return the queue wait, run time, parsing and overhead of a job and of each
+    of its calculations, see ``get_job_timings``.
+    """
+    try:
+        node = orm.load_node(id)
+    except NotExistent:
+        raise HTTPException(status_code=404, detail=f"Job {id} not found")
+    if not isinstance(node, orm.ProcessNode):
+        raise HTTPException(status_code=404, detail=f"Job {id} not found")
+    return get_job_timings(node)
+
+
+@router.get("/api/instrumentation/summary")
+@offload
+def read_timings_summary(limit: int = Query(500, ge=1, le=5000)):
+    """Return the percentiles of the timings of the ``limit`` last finished jobs,
+    by protocol, code and structure size.
+    """
+    return get_timings_summary(limit)
@@ -1,82 +1,260 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from aiida import orm
-from typing import List, Dict, Union
+from typing import Any, List, Dict, Optional, Union
+from aiida.common.exceptions import NotExistent
+from .process_tree import (
+    QEAPP_WORKCHAIN_PROCESS_TYPE,
+    QEAPP_WORKGRAPH_PROCESS_LABEL,
+    build_call_tree,
+    get_job_processes,
+)
+from .caching import get_cache_report
+from .results import JobResults
+from .utils import encode_cursor, keyset_filters, ndjson_response, wants_ndjson
+from .executor import offload
 
 router = APIRouter()
 
+JOB_PROJECTIONS = [
+    "id",
+    "extras.structure",
+    "ctime",
+    "attributes.process_state",
+    "label",
+    "extras.workchain.relax_type",
+    "extras.workchain.properties",
+]
+
+# the states shown in the job history map to one or more AiiDA process states
+JOB_STATE_FILTERS = {
+    "running": {"attributes.process_state": {"in": ["created", "waiting", "running"]}},
+    "finished": {
+        "and": [
+            {"attributes.process_state": "finished"},
+            {"attributes.exit_status": 0},
+        ]
+    },
+    "failed": {
+        "or": [
+            {"attributes.process_state": {"in": ["excepted", "killed"]}},
+            {
+                "and": [
+                    {"attributes.process_state": "finished"},
+                    {"attributes.exit_status": {">": 0}},
+                ]
+            },
+        ]
+    },
+}
+
+
+def get_job_filters(
+    search: Optional[str] = None,
+    label: Optional[str] = None,
+    formula: Optional[str] = None,
+    state: Optional[str] = None,
+    properties: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Return the QueryBuilder filters selecting the QE App jobs.
+
+    Both the ``QeAppWorkChain`` and the ``QeAppWorkGraph`` processes are selected,
+    so that they can be ordered and paginated in a single query.
+    """
+    from aiida.common import timezone
+    from datetime import datetime, timedelta
+
+    filters = [
+        {
+            "or": [
+                {"process_type": QEAPP_WORKCHAIN_PROCESS_TYPE},
+                {"attributes.process_label": QEAPP_WORKGRAPH_PROCESS_LABEL},
+            ]
+        }
+    ]
+    if search:
+        filters.append(
+            {
+                "or": [
+                    {"label": {"ilike": f"%{search}%"}},
+                    {"extras.structure": {"ilike": f"%{search}%"}},
+                ]
+            }
+        )
+    if label:
+        filters.append({"label": {"ilike": f"%{label}%"}})
+    if formula:
+        filters.append({"extras.structure": {"ilike": f"%{formula}%"}})
+    if state:
+        filters.append(
+            JOB_STATE_FILTERS.get(state, {"attributes.process_state": state})
+        )
+    if properties:
+        filters.append({"extras.workchain.properties": {"contains": properties}})
+    if start_date:
+        start = timezone.make_aware(datetime.fromisoformat(start_date))
+        filters.append({"ctime": {">=": start}})
+    if end_date:
+        # the end date is inclusive
+        end = timezone.make_aware(datetime.fromisoformat(end_date))
+        filters.append({"ctime": {"<": end + timedelta(days=1)}})
+    return {"and": filters}
+
+
+def _with_cursor(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the cursor pointing after ``job``, used when streaming the jobs."""
+    job["cursor"] = encode_cursor(job["ctime"], job["id"])
+    return job
+
 
 @router.get("/api/jobs-data")
-async def read_job_data(search: str = Query(None)):
-    from aiida_qe_app.workflows.qeapp_workchain import QeAppWorkChain
-    from aiida_workgraph.engine.workgraph import WorkGraphEngine
+@offload
+def read_job_data(
+    request: Request,
+    search: str = Query(None),
+    label: str = Query(None),
+    formula: str = Query(None),
+    state: str = Query(None),
+    properties: List[str] = Query(None),
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+    limit: int = Query(None, ge=1, le=500),
+    cursor: str = Query(None),
+    batch_size: int = Query(100, ge=1, le=1000),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+):
+    """Return one page of jobs, newest first, or oldest first with ``order=asc``.
+
+    Pagination uses a keyset on ``(ctime, id)``: pass the ``next_cursor`` of a
+    page as ``cursor``, with the same ``order``, to get the following page.
+
+    If the client accepts ``application/x-ndjson``, the jobs are streamed one per
+    line instead, each with the ``cursor`` pointing after it, and all of them are
+    returned unless ``limit`` is given.
+    """
     from aiida.orm import QueryBuilder
 
     try:
-        projections = [
-            "id",
-            "extras.structure",
-            "ctime",
-            "attributes.process_state",
-            "label",
-            "extras.workchain.relax_type",
-            "extras.workchain.properties",
-        ]
+        filters = get_job_filters(
+            search, label, formula, state, properties, start_date, end_date
+        )
+        if cursor:
+            filters["and"].append(keyset_filters(cursor, ascending=order == "asc"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        qb = QueryBuilder()
-        qb.append(QeAppWorkChain, project=projections, tag="process")
-        qb.order_by({"process": {"ctime": "desc"}})
-        results = qb.all()
-        data = []
-        for p in results:
-            data.append({projections[i]: p[i] for i in range(len(projections))})
-        # query WorkGraphEngine with label WorkGraph<QeAppWorkGraph>
-        qb = QueryBuilder()
-        qb.append(
-            WorkGraphEngine,
-            project=projections,
-            tag="process",
-            filters={
-                orm.WorkChainNode.fields.process_label: "WorkGraph<QeAppWorkGraph>"
-            },
+    qb = QueryBuilder()
+    qb.append(orm.ProcessNode, project=JOB_PROJECTIONS, filters=filters, tag="process")
+    qb.order_by({"process": [{"ctime": order}, {"id": order}]})
+    if wants_ndjson(request):
+        if limit is not None:
+            qb.limit(limit)
+        return ndjson_response(
+            _with_cursor(dict(zip(JOB_PROJECTIONS, p)))
+            for p in qb.iterall(batch_size=batch_size)
         )
-        qb.order_by({"process": {"ctime": "desc"}})
-        results = qb.all()
-        for p in results:
-            data.append({projections[i]: p[i] for i in range(len(projections))})
-        return {"jobs": data}
-    except KeyError:
-        raise HTTPException(status_code=404, detail=f"Workgraph {id} not found")
+
+    limit = limit or 50
+    # fetch one extra row to know whether there is a next page
+    qb.limit(limit + 1)
+    results = qb.all()
+    data = [
+        {JOB_PROJECTIONS[i]: p[i] for i in range(len(JOB_PROJECTIONS))}
+        for p in results[:limit]
+    ]
+    next_cursor = None
+    if len(results) > limit:
+        last = data[-1]
+        next_cursor = encode_cursor(last["ctime"], last["id"])
+    return {"jobs": data, "next_cursor": next_cursor}
+
+
+@router.get("/api/jobs-data/count")
+@offload
+def count_job_data(
+    search: str = Query(None),
+    label: str = Query(None),
+    formula: str = Query(None),
+    state: str = Query(None),
+    properties: List[str] = Query(None),
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+):
+    """Return the total number of jobs matching the filters."""
+    from aiida.orm import QueryBuilder
+
+    try:
+        filters = get_job_filters(
+            search, label, formula, state, properties, start_date, end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    qb = QueryBuilder()
+    qb.append(orm.ProcessNode, filters=filters, tag="process")
+    return {"total": qb.count()}
 
 
 @router.get("/api/jobs-data/{id}")
-async def read_job(id: int):
+@offload
+def read_job(id: int):
     from aiida.orm.utils.serialize import deserialize_unsafe
-    from aiida.cmdline.utils.ascii_vis import build_call_graph
 
     try:
-        node = orm.load_node(id)
+        results = JobResults.from_pk(id, outputs=["output_structure"])
+        node = results.node
         content = deserialize_unsafe(node.base.extras.get("ui_parameters", ""))
-        process_status = build_call_graph(node)
         # output structure
-        structure = None
-        if "relax" in node.base.links.get_outgoing().all_link_labels():
-            relax_node = node.base.links.get_outgoing().get_node_by_label("relax")
-            if "output_structure" in relax_node.outputs:
-                structure = (
-                    relax_node.outputs.output_structure.backend_entity.attributes
-                )
+        structure = results.get_structure()
+        process_ids = [process["id"] for process in get_job_processes(id)]
         return {
             "stepsData": content,
-            "processStatus": process_status,
             "structure": structure,
+            "cacheReport": get_cache_report(process_ids),
         }
-    except KeyError:
+    except (KeyError, NotExistent):
         raise HTTPException(status_code=404, detail=f"Workgraph {id} not found")
 
 
+@router.get("/api/jobs-data/{id}/call-tree")
+@offload
+def read_job_call_tree(id: int, since_mtime: Optional[str] = Query(None)):
+    """Return the processes of a job, with the id of the ``caller`` of each one.
+
+    Without ``since_mtime``, the nested ``tree`` of the processes is also returned.
+    With ``since_mtime``, only the processes modified after it are returned, to
+    update the tree: pass the ``mtime`` of the previous response.
+    """
+    from datetime import datetime, timezone
+
+    modified_since = None
+    if since_mtime:
+        try:
+            modified_since = datetime.fromisoformat(since_mtime)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if modified_since.tzinfo is None:
+            modified_since = modified_since.replace(tzinfo=timezone.utc)
+    try:
+        processes = get_job_processes(id, modified_since)
+    except NotExistent:
+        raise HTTPException(status_code=404, detail=f"Job {id} not found")
+    if modified_since is not None:
+        # the mtime of the previous response if nothing changed
+        mtime = max((p["mtime"] for p in processes), default=since_mtime)
+        return {"processes": processes, "mtime": mtime}
+    return {
+        "processes": processes,
+        "tree": build_call_tree(processes),
+        "mtime": max(p["mtime"] for p in processes),
+    }
+
+
 # Route for deleting a job item
 @router.delete("/api/jobs-data/{id}")
-async def delete_job(
+@offload
+def delete_job(
     id: int,
     dry_run: bool = False,
 ) -> Dict[str, Union[bool, str, List[int]]]:
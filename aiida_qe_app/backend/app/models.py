@@ -1,4 +1,4 @@
-from typing import ClassVar, List, Optional, Type, TypeVar, Tuple
+from typing import Any, ClassVar, Dict, Iterator, List, Optional, Type, TypeVar, Tuple
 from pydantic import BaseModel, Field, validator
 from aiida import orm
 
@@ -9,6 +9,9 @@ class AiidaModel(BaseModel):
     """A mapping of an AiiDA entity to a pydantic model."""
 
     _orm_entity: ClassVar[Type[orm.entities.Entity]] = orm.entities.Entity
+    # related entities fetched in the same query, as
+    # ``{tag: (entity, relationship to the model entity, projections)}``
+    _joins: ClassVar[Dict[str, Tuple[Type[orm.entities.Entity], str, List[str]]]] = {}
 
     class Config:
         """The models configuration."""
@@ -22,19 +25,32 @@ class AiidaModel(BaseModel):
         return list(cls.schema()["properties"].keys())
 
     @classmethod
-    def get_entities(
+    def get_entities(cls: Type[ModelType], **kwargs) -> List[ModelType]:
+        """Return a list of entities (with pagination).
+
+        The keyword arguments are passed to ``iter_entities``.
+        """
+        return list(cls.iter_entities(**kwargs))
+
+    @classmethod
+    def iter_entities(
         cls: Type[ModelType],
         *,
         page_size: Optional[int] = None,
         page: int = 0,
         project: Optional[List[str]] = None,
         order_by: Optional[List[str]] = None,
-    ) -> List[ModelType]:
-        """Return a list of entities (with pagination).
+        batch_size: int = 100,
+    ) -> Iterator[ModelType]:
+        """Iterate over the entities (with pagination), fetching them in batches.
 
         :param project: properties to project (default: all available)
         :param page_size: the page size (default: infinite)
         :param page: the page to return, if page_size set
+        :param batch_size: the number of rows fetched from the database at once
+
+        The entities declared in ``_joins`` are joined (outer join) in the same
+        query, and their projections passed to ``from_query_result``.
         """
         if project is None:
             project = cls.get_projectable_properties()
@@ -45,6 +61,14 @@ class AiidaModel(BaseModel):
         query = orm.QueryBuilder().append(
             cls._orm_entity, tag="fields", project=project
         )
+        for tag, (entity, relationship, join_project) in cls._joins.items():
+            query.append(
+                entity,
+                tag=tag,
+                project=join_project,
+                outerjoin=True,
+                **{relationship: "fields"},
+            )
         if page_size is not None:
             query.offset(page_size * (page - 1))
             query.limit(page_size)
@@ -53,7 +77,15 @@ class AiidaModel(BaseModel):
                 order_by
             ), f"order_by not subset of projectable properties: {project!r}"
             query.order_by({"fields": order_by})
-        return [cls(**result["fields"]) for result in query.dict()]
+        for result in query.iterdict(batch_size=batch_size):
+            yield cls.from_query_result(result)
+
+    @classmethod
+    def from_query_result(
+        cls: Type[ModelType], result: Dict[str, Dict[str, Any]]
+    ) -> ModelType:
+        """Return the model of a query result, keyed by the tags of the query."""
+        return cls(**result["fields"])
 
 
 class Computer(AiidaModel):
@@ -118,14 +150,15 @@ class Code(AiidaModel):
     attributes: Optional[dict] = Field(description="Additional attributes for the code")
     extras: Optional[dict] = Field(description="Additional extras for the code")
 
+    # the label of the computer is fetched in the same query as the codes
+    _joins = {"computer": (orm.Computer, "with_node", ["label"])}
+
     @classmethod
-    def get_entities(cls, **kwargs) -> List["Code"]:
-        """Return a list of codes."""
-        results = super().get_entities(**kwargs)
-        # load the computer for each code
-        for result in results:
-            result.extras["computer"] = orm.load_computer(result.dbcomputer_id).label
-        return results
+    def from_query_result(cls, result) -> "Code":
+        code = super().from_query_result(result)
+        if code.extras is not None:
+            code.extras["computer"] = result["computer"]["label"]
+        return code
 
 
 class StructureModel(BaseModel):
@@ -1,34 +1,57 @@
-from fastapi import APIRouter, HTTPException
-from aiida import orm
+from fastapi import APIRouter, HTTPException, Query, Request
+from aiida.common.exceptions import NotExistent
+from aiida_qe_app.backend.app.results import JobResults
 from .utils import get_bands_data_from_node, get_pdos_data_from_node
+from .transport import binary_response
+from .downsample import reduce_pdos_data
+from aiida_qe_app.backend.app.executor import offload
 
 router = APIRouter()
 
 
 @router.get("/api/electronic_structure/{id}")
-async def get_electronic_structure_data(id: int):
+@offload
+def get_electronic_structure_data(
+    id: int,
+    request: Request,
+    format: str = Query("json", pattern="^(json|binary)$"),
+    compress: bool = Query(True),
+    points: int = Query(None, ge=3),
+    emin: float = Query(None),
+    emax: float = Query(None),
+    aggregate: str = Query("orbital", pattern="^(orbital|l|kind|element)$"),
+    include_bands: bool = Query(True),
+):
+    """Return the results of the process ``id``.
 
+    With ``format=binary``, the numeric arrays are shipped as typed binary
+    buffers, see ``transport.encode_binary_payload``.
+    The PDOS can be reduced to ``points`` points in the ``[emin, emax]`` energy
+    window (in eV) and its projections summed, see ``downsample.reduce_pdos_data``.
+    Set ``include_bands`` to false to only refetch the PDOS, e.g. when zooming.
+    """
     try:
-        node = orm.load_node(id)
+        results = JobResults.from_pk(id)
         # output structure
-        structure = None
-        if "relax" in node.base.links.get_outgoing().all_link_labels():
-            relax_node = node.base.links.get_outgoing().get_node_by_label("relax")
-            if "output_structure" in relax_node.outputs:
-                structure = (
-                    relax_node.outputs.output_structure.backend_entity.attributes
-                )
-
+        structure = results.get_structure()
         # bands
         bands_data = None
-        if "bands" in node.base.links.get_outgoing().all_link_labels():
-            bands_node = node.base.links.get_outgoing().get_node_by_label("bands")
-            bands_data = get_bands_data_from_node(bands_node)
+        bands_node = results.get_called("bands")
+        if include_bands and bands_node is not None:
+            bands_data = get_bands_data_from_node(
+                bands_node, outputs=results.get_outputs("bands")
+            )
         # pdos
         pdos_data = None
-        if "pdos" in node.base.links.get_outgoing().all_link_labels():
-            pdos_node = node.base.links.get_outgoing().get_node_by_label("pdos")
-            pdos_data = get_pdos_data_from_node(pdos_node)
+        pdos_node = results.get_called("pdos")
+        if pdos_node is not None:
+            pdos_data = reduce_pdos_data(
+                get_pdos_data_from_node(pdos_node, outputs=results.get_outputs("pdos")),
+                points,
+                emin,
+                emax,
+                aggregate,
+            )
 
         # Return the data as JSON
         data = {
@@ -36,6 +59,8 @@ async def get_electronic_structure_data(id: int):
             "bands_data": bands_data,
             "pdos_data": pdos_data,
         }
+        if format == "binary":
+            return binary_response(data, request, compressed=compress)
         return data
-    except KeyError:
+    except (KeyError, NotExistent):
         raise HTTPException(status_code=404, detail=f"Process {id} not found")
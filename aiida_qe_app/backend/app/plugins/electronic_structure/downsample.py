@@ -0,0 +1,155 @@
+"""Level-of-detail reduction of the PDOS payloads.
+
+The DOS curves are cut to an energy window, the orbital projections can be
+summed by site, kind or element, and the curves are decimated to a target
+number of points with the largest-triangle-three-buckets (LTTB) algorithm,
+which keeps the peaks and edges that a uniform decimation would miss.
+"""
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+AGGREGATIONS = ("orbital", "l", "kind", "element")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Return the indices of the points kept by the LTTB algorithm.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = 0
+    indices[-1] = size - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else size
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[i + 1] = previous
+    return indices
+
+
+def _get_element(kind_name: str) -> str:
+    match = re.match(r"[A-Z][a-z]?", kind_name)
+    return match.group(0) if match else kind_name
+
+
+def _aggregation_key(orbital: Dict, aggregate: str) -> tuple:
+    """Return the key of the group of ``orbital``, and the orbital of the group."""
+    spin = orbital.get("spin")
+    kind_name = orbital.get("kind_name")
+    momentum = orbital.get("angular_momentum")
+    if aggregate == "l":
+        position = tuple(orbital.get("position") or ())
+        return (kind_name, position, momentum, spin), {
+            "kind_name": kind_name,
+            "position": list(position),
+            "angular_momentum": momentum,
+            "spin": spin,
+        }
+    if aggregate == "element":
+        kind_name = _get_element(kind_name)
+    return (kind_name, momentum, spin), {
+        "kind_name": kind_name,
+        "position": None,
+        "angular_momentum": momentum,
+        "spin": spin,
+    }
+
+
+def aggregate_projections(projections: List[Dict], aggregate: str) -> List[Dict]:
+    """Sum the orbital projections sharing the same site, kind or element.
+
+    The angular momentum and the spin are always kept:
+
+    * ``l``: sum over the magnetic numbers of each site;
+    * ``kind``: sum over the sites of each kind;
+    * ``element``: sum over the kinds of each element.
+    """
+    if aggregate == "orbital":
+        return projections
+    groups = {}
+    for projection in projections:
+        key, orbital = _aggregation_key(projection["orbital"], aggregate)
+        if key in groups:
+            groups[key]["pdos"] = groups[key]["pdos"] + np.asarray(projection["pdos"])
+        else:
+            groups[key] = {
+                "orbital": orbital,
+                "pdos": np.asarray(projection["pdos"], dtype=float),
+                "energy": projection["energy"],
+            }
+    return list(groups.values())
+
+
+def _window(energy: np.ndarray, emin: Optional[float], emax: Optional[float]):
+    mask = np.ones(len(energy), dtype=bool)
+    if emin is not None:
+        mask &= energy >= emin
+    if emax is not None:
+        mask &= energy <= emax
+    return mask
+
+
+def reduce_pdos_data(
+    data: Dict,
+    points: Optional[int] = None,
+    emin: Optional[float] = None,
+    emax: Optional[float] = None,
+    aggregate: str = "orbital",
+) -> Dict:
+    """Return a reduced copy of the payload of ``get_pdos_data_from_node``.
+
+    :param points: the target number of points of each curve (default: all)
+    :param emin: the lower bound of the energy window, in eV
+    :param emax: the upper bound of the energy window, in eV
+    :param aggregate: one of ``AGGREGATIONS``
+    """
+    if data is None or (points, emin, emax, aggregate) == (None, None, None, "orbital"):
+        return data
+    if aggregate not in AGGREGATIONS:
+        raise ValueError(
+            f"Unknown aggregation '{aggregate}', use one of {AGGREGATIONS}"
+        )
+    data = dict(data)
+    # total DOS, the indices are selected on the sum of all the curves
+    energy = np.asarray(data["energy_dos"])
+    mask = _window(energy, emin, emax)
+    energy = energy[mask]
+    tdos = {key: np.asarray(value)[mask] for key, value in data["tdos"].items()}
+    indices = np.arange(len(energy))
+    if points:
+        indices = lttb_indices(energy, np.abs(sum(tdos.values())), points)
+    data["energy_dos"] = energy[indices].tolist()
+    data["tdos"] = {key: value[indices].tolist() for key, value in tdos.items()}
+    # projections, all of them are computed on the same energy grid
+    projections = aggregate_projections(data["projections"], aggregate)
+    if projections:
+        energy = np.asarray(projections[0]["energy"])
+        mask = _window(energy, emin, emax)
+        energy = energy[mask]
+        curves = [np.asarray(projection["pdos"])[mask] for projection in projections]
+        indices = np.arange(len(energy))
+        if points:
+            indices = lttb_indices(energy, np.abs(sum(curves)), points)
+        energy = energy[indices].tolist()
+        projections = [
+            {**projection, "pdos": curve[indices].tolist(), "energy": energy}
+            for projection, curve in zip(projections, curves)
+        ]
+    data["projections"] = projections
+    data["lod"] = {"points": points, "emin": emin, "emax": emax, "aggregate": aggregate}
+    return data
@@ -0,0 +1,107 @@
+"""Binary transport of the numeric arrays of the bands and PDOS payloads.
+
+The payload is encoded as::
+
+    <uint32 little-endian header length> <JSON header> <array buffers>
+
+The header holds the payload, where every numeric array is replaced by
+``{"__array__": index}``, and the description of each array (dtype, shape,
+offset and length in the buffers section). The header is padded with spaces
+so that every buffer is aligned to 4 bytes and can be viewed as a typed array
+by the client without copying.
+"""
+import gzip
+import json
+import struct
+from typing import Any, List, Tuple
+
+import numpy as np
+
+BINARY_MEDIA_TYPE = "application/vnd.qeapp.arrays"
+# shorter lists are kept in the JSON header
+MIN_ARRAY_SIZE = 16
+
+
+def _as_array(value: list):
+    """Return ``value`` as a float32/int32 array, or ``None`` if it is not numeric."""
+    try:
+        array = np.asarray(value)
+    except ValueError:  # ragged nested lists
+        return None
+    if array.size < MIN_ARRAY_SIZE:
+        return None
+    if array.dtype.kind == "f":
+        return array.astype("<f4")
+    if array.dtype.kind in "iu":
+        return array.astype("<i4")
+    return None
+
+
+def _extract_arrays(data: Any, arrays: List[np.ndarray]) -> Any:
+    """Replace the numeric arrays in ``data`` by references to ``arrays``."""
+    if isinstance(data, dict):
+        return {key: _extract_arrays(value, arrays) for key, value in data.items()}
+    if isinstance(data, (list, tuple, np.ndarray)):
+        array = _as_array(data)
+        if array is not None:
+            arrays.append(array)
+            return {"__array__": len(arrays) - 1}
+        return [_extract_arrays(item, arrays) for item in data]
+    return data
+
+
+def encode_binary_payload(data: Any) -> bytes:
+    """Encode ``data`` with its numeric arrays as typed binary buffers."""
+    arrays = []
+    payload = _extract_arrays(data, arrays)
+    descriptions = []
+    offset = 0
+    for array in arrays:
+        descriptions.append(
+            {
+                "dtype": "float32" if array.dtype.kind == "f" else "int32",
+                "shape": list(array.shape),
+                "offset": offset,
+                "length": int(array.size),
+            }
+        )
+        offset += array.nbytes
+    header = json.dumps({"payload": payload, "arrays": descriptions}).encode()
+    header += b" " * (-len(header) % 4)
+    parts = [struct.pack("<I", len(header)), header]
+    parts.extend(array.tobytes() for array in arrays)
+    return b"".join(parts)
+
+
+def compress(content: bytes, accept_encoding: str) -> Tuple[bytes, str]:
+    """Compress ``content`` with the best encoding accepted by the client.
+
+    Brotli is used if the optional ``brotli`` package is installed.
+    Return the content and the value of the ``Content-Encoding`` header.
+    """
+    accepted = {item.split(";")[0].strip() for item in accept_encoding.split(",")}
+    if "br" in accepted:
+        try:
+            import brotli
+
+            return brotli.compress(content, quality=5), "br"
+        except ImportError:
+            pass
+    if "gzip" in accepted:
+        return gzip.compress(content, compresslevel=6), "gzip"
+    return content, "identity"
+
+
+def binary_response(data: Any, request, compressed: bool = True):
+    """Return a response shipping ``data`` in the binary format."""
+    from fastapi.responses import Response
+
+    content = encode_binary_payload(data)
+    headers = {}
+    if compressed:
+        content, encoding = compress(
+            content, request.headers.get("accept-encoding", "")
+        )
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+    return Response(content, media_type=BINARY_MEDIA_TYPE, headers=headers)
@@ -1,6 +1,10 @@
 from aiidalab_qe.common.bands_pdos.utils import _get_bands_labeling
+from aiida_qe_app.backend.app.cache import cached_payload
 import numpy as np
 
+# bump when the structure of the bands or PDOS payloads changes, to invalidate the cache
+PAYLOAD_VERSION = 1
+
 
 def prepare_data(data):
     if isinstance(data, dict):
@@ -15,11 +19,15 @@ def prepare_data(data):
         return data
 
 
-def get_bands_data_from_node(bands_node, fermi_energy=None):
-    """Extract the band structure data from a bands node."""
+@cached_payload("bands", PAYLOAD_VERSION)
+def get_bands_data_from_node(bands_node, fermi_energy=None, *, outputs=None):
+    """Extract the band structure data from a bands node.
+
+    :param outputs: the outputs of the node, if already fetched, e.g. by ``JobResults``
+    """
     if not bands_node.is_finished_ok:
         return None
-    outputs = bands_node.outputs
+    outputs = bands_node.outputs if outputs is None else outputs
     if "bands_projwfc" in outputs:
         bands_output = outputs.bands_projwfc
     elif "bands" in outputs:
@@ -68,12 +76,15 @@ def get_raw_pdos_data(proj_data, data_type="pdos", spin=0):
     return data
 
 
-def get_pdos_data_from_node(pdos_node):
-    """Extract the PDOS data from a PDOS node."""
-    print("pdos_node", pdos_node)
+@cached_payload("pdos", PAYLOAD_VERSION)
+def get_pdos_data_from_node(pdos_node, *, outputs=None):
+    """Extract the PDOS data from a PDOS node.
+
+    :param outputs: the outputs of the node, if already fetched, e.g. by ``JobResults``
+    """
     if not pdos_node.is_finished_ok:
         return None
-    outputs = pdos_node.outputs
+    outputs = pdos_node.outputs if outputs is None else outputs
     data = {}
     _, energy_dos, _ = outputs.dos.output_dos.get_x()
     tdos_values = {f"{n}": v.tolist() for n, v, _ in outputs.dos.output_dos.get_y()}
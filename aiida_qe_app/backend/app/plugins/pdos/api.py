@@ -1,34 +1,59 @@
-from fastapi import APIRouter, HTTPException
-from aiida import orm
+from fastapi import APIRouter, HTTPException, Query, Request
+from aiida.common.exceptions import NotExistent
+from aiida_qe_app.backend.app.results import JobResults
 from aiida_qe_app.backend.app.plugins.electronic_structure.utils import (
     get_pdos_data_from_node,
 )
+from aiida_qe_app.backend.app.plugins.electronic_structure.transport import (
+    binary_response,
+)
+from aiida_qe_app.backend.app.plugins.electronic_structure.downsample import (
+    reduce_pdos_data,
+)
+from aiida_qe_app.backend.app.executor import offload
 
 router = APIRouter()
 
 
 @router.get("/api/pdos/{id}")
-async def get_pdos_data(id: int):
+@offload
+def get_pdos_data(
+    id: int,
+    request: Request,
+    format: str = Query("json", pattern="^(json|binary)$"),
+    compress: bool = Query(True),
+    points: int = Query(None, ge=3),
+    emin: float = Query(None),
+    emax: float = Query(None),
+    aggregate: str = Query("orbital", pattern="^(orbital|l|kind|element)$"),
+):
+    """Return the results of the process ``id``.
 
+    With ``format=binary``, the numeric arrays are shipped as typed binary
+    buffers, see ``transport.encode_binary_payload``.
+    The PDOS can be reduced to ``points`` points in the ``[emin, emax]`` energy
+    window (in eV) and its projections summed, see ``downsample.reduce_pdos_data``.
+    """
     try:
-        node = orm.load_node(id)
+        results = JobResults.from_pk(id)
         # output structure
-        structure = None
-        if "relax" in node.base.links.get_outgoing().all_link_labels():
-            relax_node = node.base.links.get_outgoing().get_node_by_label("relax")
-            if "output_structure" in relax_node.outputs:
-                structure = (
-                    relax_node.outputs.output_structure.backend_entity.attributes
-                )
-
+        structure = results.get_structure()
         # pdos
         pdos_data = None
-        if "pdos" in node.base.links.get_outgoing().all_link_labels():
-            pdos_node = node.base.links.get_outgoing().get_node_by_label("pdos")
-            pdos_data = get_pdos_data_from_node(pdos_node)
+        pdos_node = results.get_called("pdos")
+        if pdos_node is not None:
+            pdos_data = reduce_pdos_data(
+                get_pdos_data_from_node(pdos_node, outputs=results.get_outputs("pdos")),
+                points,
+                emin,
+                emax,
+                aggregate,
+            )
 
         # Return the data as JSON
         data = {"structure": structure, "pdos_data": pdos_data}
+        if format == "binary":
+            return binary_response(data, request, compressed=compress)
         return data
-    except KeyError:
+    except (KeyError, NotExistent):
         raise HTTPException(status_code=404, detail=f"Process {id} not found")
@@ -0,0 +1,118 @@
+"""Query the processes of a job, each with the process that called it."""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from aiida import orm
+from aiida.common.exceptions import NotExistent
+
+# ``QeAppWorkChain.build_process_type()``, without importing the workflow
+QEAPP_WORKCHAIN_PROCESS_TYPE = "aiida.workflows:qeapp.workchain"
+QEAPP_WORKGRAPH_PROCESS_LABEL = "WorkGraph<QeAppWorkGraph>"
+
+PROCESS_PROJECTIONS = [
+    "id",
+    "label",
+    "process_type",
+    "attributes.process_label",
+    "attributes.process_state",
+    "attributes.process_status",
+    "attributes.exit_status",
+    "attributes.scheduler_state",
+    "ctime",
+    "mtime",
+]
+
+TERMINAL_STATES = ("finished", "excepted", "killed")
+
+
+def _to_row(projection: List[Any]) -> Dict[str, Any]:
+    """Return the process row of a ``PROCESS_PROJECTIONS`` + caller id projection."""
+    row = {
+        key.replace("attributes.", ""): value
+        for key, value in zip(PROCESS_PROJECTIONS, projection)
+    }
+    row["caller"] = projection[-1]
+    return row
+
+
+def _serialize(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {**row, "ctime": row["ctime"].isoformat(), "mtime": row["mtime"].isoformat()}
+
+
+def is_qeapp_job(row: Dict[str, Any]) -> bool:
+    """Return whether the process row is a QE App job."""
+    return row["caller"] is None and (
+        row["process_type"] == QEAPP_WORKCHAIN_PROCESS_TYPE
+        or row["process_label"] == QEAPP_WORKGRAPH_PROCESS_LABEL
+    )
+
+
+def get_job_processes(
+    job_id: int, modified_since: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Return the job and all the processes it called, directly or not.
+
+    The descendants are fetched in a single query. Only the processes whose chain
+    of callers leads to the job are kept: processes of other jobs are also
+    descendants when they use the outputs of this job. If ``modified_since`` is
+    given, only the processes modified after it are returned.
+    """
+    qb = orm.QueryBuilder()
+    qb.append(orm.ProcessNode, filters={"id": job_id}, project=PROCESS_PROJECTIONS)
+    job = qb.first()
+    if job is None:
+        raise NotExistent(f"No process with id {job_id}")
+    # the job is the root of the tree
+    rows = [_to_row(list(job) + [None])]
+    qb = orm.QueryBuilder()
+    qb.append(orm.ProcessNode, filters={"id": job_id}, tag="job")
+    qb.append(
+        orm.ProcessNode,
+        with_ancestors="job",
+        project=PROCESS_PROJECTIONS,
+        tag="process",
+    )
+    qb.append(orm.ProcessNode, with_called="process", project="id", outerjoin=True)
+    qb.order_by({"process": [{"ctime": "asc"}, {"id": "asc"}]})
+    members = {job_id}
+    # ordered by ctime, so the caller of a process comes before it
+    for projection in qb.iterall(batch_size=100):
+        row = _to_row(projection)
+        if row["caller"] in members and row["id"] not in members:
+            members.add(row["id"])
+            rows.append(row)
+    if modified_since is not None:
+        rows = [row for row in rows if row["mtime"] > modified_since]
+    return [_serialize(row) for row in rows]
+
+
+def get_processes(
+    filters: Optional[Dict[str, Any]] = None,
+    modified_since: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """Return the processes matching the filters, oldest first."""
+    filters = dict(filters or {})
+    if modified_since is not None:
+        filters["mtime"] = {">": modified_since}
+    qb = orm.QueryBuilder()
+    qb.append(
+        orm.ProcessNode, filters=filters, project=PROCESS_PROJECTIONS, tag="process"
+    )
+    qb.append(orm.ProcessNode, with_called="process", project="id", outerjoin=True)
+    qb.order_by({"process": [{"ctime": "asc"}, {"id": "asc"}]})
+    return [
+        _serialize(_to_row(projection)) for projection in qb.iterall(batch_size=100)
+    ]
+
+
+def build_call_tree(rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Nest the process rows under their caller, return the root of the tree."""
+    nodes = {row["id"]: {**row, "children": []} for row in rows}
+    root = None
+    for node in nodes.values():
+        caller = nodes.get(node["caller"])
+        if caller is None:
+            root = node
+        else:
+            caller["children"].append(node)
+    return root
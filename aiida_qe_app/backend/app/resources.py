@@ -0,0 +1,309 @@
+"""Estimate the computational resources of a job from the size of the system.
+
+The cost of a ``pw.x`` calculation is modelled from the number of k-points, bands
+and plane waves, see ``get_system_size``. The model is rough, it is meant to pick
+a sensible order of magnitude of the MPI ranks, pools, OpenMP threads and
+wallclock time, within the nodes and cores per node chosen by the user.
+"""
+import math
+from typing import Dict, List, Optional
+
+# seconds of one core per unit of cost, see ``_get_core_seconds``
+CORE_SECONDS_PER_UNIT = 3e-8
+SCF_ITERATIONS = 15
+NSCF_ITERATIONS = 5
+# SCF cycles of a relaxation
+RELAX_SCF_STEPS = 8
+# k-points of a band structure path
+BANDS_KPOINTS = 100
+# the NSCF calculations compute more bands than the SCF
+NSCF_BANDS_FACTOR = 1.5
+# valence electrons per atom, when the pseudopotentials are not known
+DEFAULT_VALENCE = 8
+# below this number of plane waves per rank, more ranks do not scale
+MIN_PLANEWAVES_PER_RANK = 1000
+# above this number of plane waves per rank, the wavefunctions may not fit in memory
+MAX_PLANEWAVES_PER_RANK = 50000
+MAX_OMP_THREADS = 4
+# speedup of each additional OpenMP thread, relative to an MPI rank
+THREAD_EFFICIENCY = 0.5
+# use fewer cores when a calculation would finish within this time (s)
+TARGET_WALLCLOCK = 3600
+WALLCLOCK_SAFETY_FACTOR = 2
+MIN_WALLCLOCK = 1800
+MAX_WALLCLOCK = 24 * 3600
+BOHR = 0.529177210903  # Angstrom
+
+
+def get_kpoints_mesh(cell, pbc, kpoints_distance: float) -> List[int]:
+    """Return the k-points mesh with a spacing of at most ``kpoints_distance`` (1/A),
+    as done by ``aiida-quantumespresso``. Non-periodic directions have 1 k-point.
+    """
+    import numpy as np
+
+    try:
+        reciprocal = 2 * np.pi * np.linalg.inv(np.asarray(cell, dtype=float)).T
+    except np.linalg.LinAlgError:
+        return [1, 1, 1]
+    return [
+        max(1, math.ceil(np.linalg.norm(vector) / kpoints_distance)) if periodic else 1
+        for vector, periodic in zip(reciprocal, pbc)
+    ]
+
+
+def _count_kpoints(mesh: List[int]) -> int:
+    """Return the number of k-points of the mesh, halved by time-reversal symmetry."""
+    return max(1, (math.prod(mesh) + 1) // 2)
+
+
+def _get_valences(pseudos: dict) -> Dict[str, float]:
+    """Return the valence charge of each kind, from its pseudopotential."""
+    from aiida import orm
+
+    valences = {}
+    for kind, pseudo in pseudos.items():
+        try:
+            if not isinstance(pseudo, orm.Node):
+                pseudo = orm.load_node(pseudo)
+            valences[kind] = float(pseudo.z_valence)
+        except Exception:
+            continue
+    return valences
+
+
+def get_system_size(atoms, parameters: dict) -> dict:
+    """Return the k-points, bands and plane waves of the SCF of the structure.
+
+    :param atoms: the ``ase.Atoms`` of the structure.
+    :param parameters: the parameters returned by ``prepare_parameters``.
+    """
+    advanced = parameters["advanced"]
+    system = advanced["pw"]["parameters"]["SYSTEM"]
+    valences = _get_valences(advanced["pw"]["pseudos"])
+    symbols = atoms.get_chemical_symbols()
+    nelectrons = sum(valences.get(symbol, DEFAULT_VALENCE) for symbol in symbols)
+    nelectrons -= system.get("tot_charge", 0)
+    if system.get("noncolin"):
+        nspin = 4
+    elif parameters["workchain"].get("spin_type") == "collinear":
+        nspin = 2
+    else:
+        nspin = 1
+    nbands = nelectrons / 2
+    if parameters["workchain"].get("electronic_type") == "metal":
+        nbands = max(1.2 * nbands, nbands + 4)
+    nbands = max(1, math.ceil(nbands))
+    volume = abs(atoms.get_volume()) / BOHR**3 if atoms.cell.rank == 3 else 0
+    nplanewaves = max(1, round(volume * system["ecutwfc"] ** 1.5 / (6 * math.pi**2)))
+    mesh = get_kpoints_mesh(atoms.cell, atoms.pbc, advanced["kpoints_distance"])
+    return {
+        "natoms": len(symbols),
+        "nelectrons": nelectrons,
+        "nspin": nspin,
+        "nbands": nbands,
+        "nplanewaves": nplanewaves,
+        "kpoints_mesh": mesh,
+        "nkpoints": _count_kpoints(mesh),
+    }
+
+
+def _get_core_seconds(size: dict, nkpoints: int, nbands: float, iterations: int):
+    """Return the core-seconds of a calculation.
+
+    The cost of each iteration, for each k-point, scales with the FFTs of the bands
+    and with their orthogonalization. Noncollinear calculations have spinors twice
+    the size of the wavefunctions, and collinear ones two sets of k-points.
+    """
+    nplanewaves = size["nplanewaves"]
+    if size["nspin"] == 4:
+        nbands, nplanewaves = 2 * nbands, 2 * nplanewaves
+    nks = get_nks(size, nkpoints)
+    units = nbands * nplanewaves * math.log2(nplanewaves + 1)
+    units += nbands**2 * nplanewaves
+    return nks * units * iterations * CORE_SECONDS_PER_UNIT
+
+
+def get_nks(size: dict, nkpoints: int) -> int:
+    """Return the number of k-points distributed among the pools."""
+    return nkpoints * (2 if size["nspin"] == 2 else 1)
+
+
+def get_steps(atoms, size: dict, parameters: dict) -> Dict[str, dict]:
+    """Return the core-seconds and k-points of each sub-workflow of the job.
+
+    Each plugin runs an SCF, followed by a NSCF calculation for the ``pdos`` and
+    ``bands`` plugins.
+    """
+    properties = parameters["workchain"].get("properties") or []
+    scf = _get_core_seconds(size, size["nkpoints"], size["nbands"], SCF_ITERATIONS)
+    steps = {}
+    for name in properties:
+        if name == "relax":
+            steps[name] = {
+                "core_seconds": RELAX_SCF_STEPS * scf,
+                "nkpoints": size["nkpoints"],
+            }
+            continue
+        nkpoints = None
+        if name == "pdos":
+            distance = parameters.get("pdos", {}).get(
+                "nscf_kpoints_distance", parameters["advanced"]["kpoints_distance"]
+            )
+            mesh = get_kpoints_mesh(atoms.cell, atoms.pbc, distance)
+            nkpoints = _count_kpoints(mesh)
+        elif name == "bands":
+            nkpoints = BANDS_KPOINTS
+        core_seconds = scf
+        if nkpoints is not None:
+            nbands = NSCF_BANDS_FACTOR * size["nbands"]
+            core_seconds += _get_core_seconds(size, nkpoints, nbands, NSCF_ITERATIONS)
+        steps[name] = {
+            "core_seconds": core_seconds,
+            "nkpoints": max(nkpoints or 0, size["nkpoints"]),
+        }
+    if not steps:
+        steps["scf"] = {"core_seconds": scf, "nkpoints": size["nkpoints"]}
+    return steps
+
+
+def propose_resources(
+    core_seconds: float,
+    nks: int,
+    nplanewaves: int,
+    nodes: int,
+    cores_per_node: int,
+    max_npool: Optional[int] = None,
+) -> dict:
+    """Return the resources and parallelization of a ``pw.x`` calculation.
+
+    The MPI ranks are distributed first among the pools of k-points, then among
+    the plane waves. Cores beyond the useful number of ranks run OpenMP threads.
+    The calculation uses no more than ``nodes`` nodes of ``cores_per_node`` cores,
+    and fewer cores when it would finish within ``TARGET_WALLCLOCK`` anyway.
+
+    :param max_npool: the maximum number of pools, ``nks`` by default. A pool
+        without k-points is an error of ``pw.x``, so it should not exceed the
+        smallest ``nks`` of the calculations run with these resources.
+    """
+    max_nodes = max(1, nodes)
+    max_cores = max(1, max_nodes * cores_per_node)
+    max_ranks = nks * max(1, nplanewaves // MIN_PLANEWAVES_PER_RANK)
+    needed = max(1, math.ceil(core_seconds / TARGET_WALLCLOCK))
+    ranks = min(max_cores, max_ranks, needed)
+    threads = 1
+    if needed > ranks and ranks == max_ranks:
+        threads = min(MAX_OMP_THREADS, cores_per_node, max_cores // ranks)
+        threads = max(1, min(threads, math.ceil(needed / ranks)))
+        # the threads of the ranks on a node must not exceed its cores
+        while threads > 1 and max_nodes * (cores_per_node // threads) < ranks:
+            threads -= 1
+    ranks_per_node = max(1, cores_per_node // threads)
+    nodes = math.ceil(ranks / ranks_per_node)
+    ranks_per_node = math.ceil(ranks / nodes)
+    ranks = nodes * ranks_per_node
+    # each pool has enough ranks to hold the wavefunctions in memory
+    max_npool = min(nks if max_npool is None else max_npool, ranks)
+    max_npool = min(
+        max_npool, ranks // math.ceil(nplanewaves / MAX_PLANEWAVES_PER_RANK)
+    )
+    npool = max(d for d in range(1, max(1, max_npool) + 1) if ranks % d == 0)
+    return {
+        "nodes": nodes,
+        "ntasks_per_node": ranks_per_node,
+        "cpus_per_task": threads,
+        "parallelization": {"npool": npool},
+    }
+
+
+def get_wallclock(core_seconds: float, resources: dict) -> int:
+    """Return the wallclock time (s) to request for a calculation."""
+    cores = resources["nodes"] * resources["ntasks_per_node"]
+    cores *= 1 + THREAD_EFFICIENCY * (resources["cpus_per_task"] - 1)
+    seconds = WALLCLOCK_SAFETY_FACTOR * core_seconds / cores
+    seconds = math.ceil(seconds / MIN_WALLCLOCK) * MIN_WALLCLOCK
+    return int(min(MAX_WALLCLOCK, max(MIN_WALLCLOCK, seconds)))
+
+
+def estimate_resources(atoms, parameters: dict, codes: Optional[dict] = None) -> dict:
+    """Estimate the resources of each code of the job.
+
+    Each sub-workflow gets the resources of the ``pw`` code sized for its own
+    cost, and the ``pw`` code the resources of the most expensive one, within
+    the nodes and cores per node of its settings in ``codes``. The
+    post-processing codes of the PDOS run on a single node.
+
+    :param atoms: the ``ase.Atoms`` of the structure.
+    :param parameters: the parameters returned by ``prepare_parameters``.
+    :param codes: the settings of the codes, ``parameters["codes"]`` by default.
+    :return: the size of the system, the cost and resources of each
+        sub-workflow, and the resources of each code, in the format of
+        ``get_codes_values``.
+    """
+    codes = parameters.get("codes", {}) if codes is None else codes
+    size = get_system_size(atoms, parameters)
+    steps = get_steps(atoms, size, parameters)
+    pw = codes.get("pw", {})
+    max_npool = min(get_nks(size, step["nkpoints"]) for step in steps.values())
+
+    def propose(step):
+        return propose_resources(
+            step["core_seconds"],
+            get_nks(size, step["nkpoints"]),
+            size["nplanewaves"],
+            pw.get("nodes", 1),
+            pw.get("ntasks_per_node", 1),
+            max_npool=max_npool,
+        )
+
+    estimate = {"system": size, "steps": {}, "codes": {}}
+    for name, step in steps.items():
+        resources = propose(step)
+        resources["max_wallclock_seconds"] = get_wallclock(
+            step["core_seconds"], resources
+        )
+        estimate["steps"][name] = {
+            "core_hours": step["core_seconds"] / 3600,
+            "wallclock_seconds": resources["max_wallclock_seconds"],
+            "resources": {"pw": resources},
+        }
+    largest = max(steps.values(), key=lambda step: step["core_seconds"])
+    resources = propose(largest)
+    resources["max_wallclock_seconds"] = max(
+        get_wallclock(step["core_seconds"], resources) for step in steps.values()
+    )
+    estimate["codes"]["pw"] = resources
+    if "projwfc" in codes:
+        estimate["codes"]["projwfc"] = {
+            "nodes": 1,
+            "ntasks_per_node": min(
+                codes["projwfc"].get("ntasks_per_node", 1),
+                get_nks(size, steps.get("pdos", largest)["nkpoints"]),
+            ),
+            "cpus_per_task": 1,
+            "max_wallclock_seconds": MIN_WALLCLOCK,
+        }
+    if "dos" in codes:
+        estimate["codes"]["dos"] = {
+            "nodes": 1,
+            "ntasks_per_node": 1,
+            "cpus_per_task": 1,
+            "max_wallclock_seconds": MIN_WALLCLOCK,
+        }
+    return estimate
+
+
+def apply_resource_estimate(parameters: dict, estimate: dict) -> dict:
+    """Replace the resources of the codes, and of the steps, of the parameters
+    with the ones of the estimate. The resources set for a step in
+    ``parameters["step_resources"]`` take precedence over the estimate.
+    """
+    codes = parameters["codes"]
+    for name, resources in estimate["codes"].items():
+        if name in codes:
+            codes[name].update(resources)
+    step_resources = parameters.setdefault("step_resources", {})
+    for name, step in estimate["steps"].items():
+        for code, resources in step["resources"].items():
+            settings = step_resources.setdefault(name, {}).get(code, {})
+            step_resources[name][code] = {**resources, **settings}
+    return parameters
@@ -0,0 +1,114 @@
+"""Resolution of the processes called by a job and of their outputs.
+
+The plugin APIs need the outputs of several sub-processes of a job (``relax``,
+``bands``, ``pdos``, ...). Looking them up with ``get_outgoing`` costs one query
+per call; ``JobResults`` fetches all of them with a fixed number of queries.
+"""
+from typing import Dict, Iterable, Optional
+
+from aiida import orm
+from aiida.common import AttributeDict
+from aiida.common.exceptions import NotExistent
+from aiida.common.links import LinkType
+
+CALL_LINK_TYPES = [LinkType.CALL_CALC.value, LinkType.CALL_WORK.value]
+OUTPUT_LINK_TYPES = [LinkType.CREATE.value, LinkType.RETURN.value]
+
+
+def _nest_outputs(outputs: Dict[str, orm.Node]) -> AttributeDict:
+    """Nest the outputs by namespace, the link labels use ``__`` as separator."""
+    nested = AttributeDict()
+    for label, node in outputs.items():
+        *namespaces, name = label.split("__")
+        current = nested
+        for namespace in namespaces:
+            current = current.setdefault(namespace, AttributeDict())
+        current[name] = node
+    return nested
+
+
+class JobResults:
+    """The processes called by a job and their outputs, fetched in three queries.
+
+    The outputs returned by ``get_outputs`` are nested by namespace, so that they
+    can be used in place of ``node.outputs``.
+    """
+
+    def __init__(
+        self,
+        node: orm.ProcessNode,
+        called: Dict[str, orm.ProcessNode],
+        outputs: Dict[str, Dict[str, orm.Node]],
+    ):
+        self.node = node
+        self._called = called
+        self._outputs = outputs
+
+    @classmethod
+    def from_pk(cls, pk: int, outputs: Optional[Iterable[str]] = None) -> "JobResults":
+        """Fetch the job ``pk``, the processes it called and their outputs.
+
+        The job, the called processes and their outputs are fetched with one query
+        each, whatever the number of called processes. A job that did not call any
+        process yet, or whose processes have no outputs, is returned too.
+
+        :param outputs: the link labels of the outputs to fetch (default: all)
+        :raises NotExistent: if the job does not exist.
+        """
+        node = orm.load_node(pk)
+        if not isinstance(node, orm.ProcessNode):
+            raise NotExistent(f"No process with pk {pk} found")
+        # the edge filters are part of the WHERE clause, so the joins are inner
+        # joins: the processes without outputs are found by the first query
+        qb = orm.QueryBuilder()
+        qb.append(orm.ProcessNode, filters={"id": pk}, tag="job")
+        qb.append(
+            orm.ProcessNode,
+            with_incoming="job",
+            edge_filters={"type": {"in": CALL_LINK_TYPES}},
+            edge_project="label",
+            project="*",
+            tag="called",
+        )
+        called = {label: process for label, process in qb.iterall()}
+        called_outputs = {label: {} for label in called}
+        if called:
+            labels = {process.pk: label for label, process in called.items()}
+            qb = orm.QueryBuilder()
+            qb.append(
+                orm.ProcessNode,
+                filters={"id": {"in": list(labels)}},
+                project="id",
+                tag="called",
+            )
+            qb.append(
+                orm.Node,
+                with_incoming="called",
+                edge_filters={"type": {"in": OUTPUT_LINK_TYPES}},
+                edge_project="label",
+                project="*",
+            )
+            wanted = None if outputs is None else set(outputs)
+            for called_id, link_label, output in qb.iterall():
+                if wanted is None or link_label in wanted:
+                    called_outputs[labels[called_id]][link_label] = output
+        return cls(
+            node,
+            called,
+            {label: _nest_outputs(value) for label, value in called_outputs.items()},
+        )
+
+    def get_called(self, label: str) -> Optional[orm.ProcessNode]:
+        """Return the process called with the link ``label``, if any."""
+        return self._called.get(label)
+
+    def get_outputs(self, label: str) -> AttributeDict:
+        """Return the outputs of the process called with the link ``label``."""
+        return self._outputs.get(label, AttributeDict())
+
+    def get_structure(self) -> Optional[dict]:
+        """Return the attributes of the relaxed structure, if any."""
+        relax_outputs = self.get_outputs("relax")
+        if "output_structure" in relax_outputs:
+            return relax_outputs.output_structure.backend_entity.attributes
+        return None
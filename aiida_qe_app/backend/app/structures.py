@@ -0,0 +1,85 @@
+"""Reuse the stored structure when the same crystal is submitted again.
+
+Each stored structure gets a canonical hash in its extras, see ``indexes.py``
+for the index of the extra, so that a resubmitted structure is found with one
+indexed lookup. Reusing the node also lets the AiiDA caching find the
+calculations already done on it.
+"""
+import hashlib
+import json
+from typing import Optional
+
+from aiida import orm
+
+STRUCTURE_HASH_EXTRA = "qeapp_structure_hash"
+# positions and cells equal within the tolerance (Angstrom) have the same hash
+HASH_TOLERANCE = 1e-4
+
+
+def get_structure_hash(atoms, tolerance: float = HASH_TOLERANCE) -> str:
+    """Return the canonical hash of the ``ase.Atoms``.
+
+    The hash does not depend on the order of the atoms, nor on atoms translated by
+    a lattice vector along the periodic directions. Cell and positions are rounded
+    to ``tolerance``, so that two values on both sides of a rounding boundary can
+    still have different hashes.
+    """
+    import numpy as np
+
+    atoms = atoms.copy()
+    if atoms.cell.rank == 3 and atoms.pbc.any():
+        atoms.wrap(eps=tolerance)
+    cell = np.round(np.asarray(atoms.cell) / tolerance).astype(int)
+    positions = np.round(atoms.positions / tolerance).astype(int)
+    sites = sorted(
+        (symbol, position.tolist())
+        for symbol, position in zip(atoms.get_chemical_symbols(), positions)
+    )
+    content = {
+        "cell": cell.tolist(),
+        "pbc": [bool(pbc) for pbc in atoms.pbc],
+        "sites": sites,
+    }
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
+def _find_structure_query(structure_hash: str):
+    """Return the SQLAlchemy query of the structures with the hash, oldest first.
+
+    It filters on the expression of the index of the hash, see ``indexes.py``,
+    since the filters of QueryBuilder on the extras can not use it.
+    """
+    from aiida.manage import get_manager
+    from aiida.storage.psql_dos.models.node import DbNode
+    from .indexes import extra_text
+
+    session = get_manager().get_profile_storage().get_session()
+    return (
+        session.query(DbNode.id)
+        .filter(
+            extra_text(STRUCTURE_HASH_EXTRA) == structure_hash,
+            DbNode.node_type == orm.StructureData.class_node_type,
+        )
+        .order_by(DbNode.id)
+    )
+
+
+def find_structure(structure_hash: str) -> Optional[orm.StructureData]:
+    """Return the oldest stored structure with the hash, if any."""
+    from .indexes import uses_postgresql
+
+    if uses_postgresql():
+        pk = _find_structure_query(structure_hash).limit(1).scalar()
+        return orm.load_node(pk) if pk is not None else None
+
+    qb = orm.QueryBuilder()
+    qb.append(
+        orm.StructureData,
+        filters={f"extras.{STRUCTURE_HASH_EXTRA}": structure_hash},
+        project="*",
+        tag="structure",
+    )
+    qb.order_by({"structure": {"id": "asc"}})
+    qb.limit(1)
+    result = qb.first()
+    return result[0] if result else None
@@ -1,11 +1,17 @@
 # backend/app/api/endpoints.py
 
+from typing import Dict, List, Literal, Optional, Union
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from aiida.engine import submit
 from aiida.orm import StructureData, load_code
 import traceback
 from .utils import get_plugins
+from .indexes import FORMULA_EXTRA
+from .caching import enable_caching
+from .resources import apply_resource_estimate, estimate_resources
+from .structures import STRUCTURE_HASH_EXTRA, find_structure, get_structure_hash
+from .executor import get_executor, offload
 
 
 router = APIRouter()
@@ -116,7 +122,7 @@ def get_advanced_setting_value(data):
 def get_codes_values(data):
     codes = {}
     for _, settings in data.computational_resources.items():
-        for code_name, data in settings["codes"].items():
+        for code_name, data in settings.get("codes", {}).items():
             label = data["label"]
             aiida_code = load_code(label)
             codes[code_name] = {
@@ -130,27 +136,68 @@ def get_codes_values(data):
     return codes
 
 
-def prepare_inputs(data: CalculationData):
+# the fields of the resources of a step, and the keys of the code settings
+STEP_RESOURCE_FIELDS = {
+    "nodes": "nodes",
+    "cpus": "ntasks_per_node",
+    "threads": "cpus_per_task",
+    "max_wallclock_seconds": "max_wallclock_seconds",
+}
+
+
+def get_step_resources_values(data) -> Dict[str, dict]:
+    """Return the resources of each step, overriding the settings of its codes.
+
+    The ``steps`` of the resource tabs map the path of a step in the builder, e.g.
+    ``relax``, ``pdos`` or ``pdos.nscf``, to the resources of its codes. Only the
+    fields that are set override the settings of the code.
     """
-    Prepare inputs for the calculation
+    step_resources = {}
+    for _, settings in data.computational_resources.items():
+        for path, step_codes in settings.get("steps", {}).items():
+            for code_name, values in step_codes.items():
+                resources = {
+                    key: values[field]
+                    for field, key in STEP_RESOURCE_FIELDS.items()
+                    if values.get(field) is not None
+                }
+                if values.get("npool") is not None:
+                    resources["parallelization"] = {"npool": values["npool"]}
+                if resources:
+                    step_resources.setdefault(path, {})[code_name] = resources
+    return step_resources
+
+
+def get_structure(structure: dict) -> StructureData:
+    """Return the ``StructureData`` of the structure sent by the front-end.
+
+    If the same structure is already stored, it is reused, otherwise a new
+    unstored structure is returned.
     """
     from ase import Atoms
-    from copy import deepcopy
 
-    data = deepcopy(data)
-    print("data: ", data)
-    # structure
-    structure = data.structure["Structure Selection"]["selectedStructure"]
-    if isinstance(structure, list):
-        structure = structure[0]
     atoms = Atoms(
         symbols=structure["symbols"],
         positions=structure["positions"],
         cell=structure["cell"],
         pbc=structure["pbc"],
     )
+    structure_hash = get_structure_hash(atoms)
+    stored = find_structure(structure_hash)
+    if stored is not None:
+        return stored
     structure = StructureData(ase=atoms)
-    structure.store()
+    structure.base.extras.set(STRUCTURE_HASH_EXTRA, structure_hash)
+    # indexed to search the structures by formula in the data browser
+    structure.base.extras.set(FORMULA_EXTRA, structure.get_formula())
+    return structure
+
+
+def prepare_parameters(data):
+    """Prepare the parameters of the calculation from the settings.
+
+    The settings are consumed, pass a copy of the data.
+    """
     # workflow settings
     parameters = get_advanced_setting_value(data)
     # bands
@@ -162,90 +209,287 @@ def prepare_inputs(data: CalculationData):
             )
     # computational resources
     parameters["codes"] = get_codes_values(data)
+    parameters["step_resources"] = get_step_resources_values(data)
+    # the calculations of the other jobs do not use the cache
+    parameters["caching"] = is_caching_requested(data.review_submit)
+    return parameters
+
+
+def get_selected_structure(data: CalculationData) -> StructureData:
+    """Return the ``StructureData`` of the structure selected in the GUI."""
+    structure = data.structure["Structure Selection"]["selectedStructure"]
+    if isinstance(structure, list):
+        structure = structure[0]
+    return get_structure(structure)
+
+
+def auto_size_resources(data, structure: StructureData, parameters: dict):
+    """Replace the resources of the codes and steps with the estimate for the
+    structure, if the user opted in. The nodes and cores per node of the settings
+    are the maximum resources given to each code, and the resources set for a
+    step are kept.
+
+    :return: the estimate, or ``None`` if the resources are not sized.
+    """
+    basic_settings = data.computational_resources.get("Basic Resource Settings", {})
+    if not basic_settings.get("autoResources", False):
+        return None
+    estimate = estimate_resources(structure.get_ase(), parameters)
+    apply_resource_estimate(parameters, estimate)
+    return estimate
+
+
+def prepare_inputs(data: CalculationData):
+    """
+    Prepare inputs for the calculation
+    """
+    from copy import deepcopy
+
+    data = deepcopy(data)
+    structure = get_selected_structure(data)
+    parameters = prepare_parameters(data)
+    auto_size_resources(data, structure, parameters)
+    if not structure.is_stored:
+        structure.store()
     return {
         "structure": structure,
         "parameters": parameters,
     }
 
 
-def update_builder(builder, codes):
-    """Update the resources and parallelization of the ``relax`` builder."""
-    # this is hardcoded for now, but in the future, the relax should be a plugin
-    # update resources
+def submit_inputs(engine: str, inputs: dict, data: CalculationData):
+    """Submit the QE App ``workchain`` or ``workgraph`` and return its node.
 
-    builder.relax.base.pw.metadata.options.resources = {
-        "num_machines": codes.get("pw")["nodes"],
-        "num_mpiprocs_per_machine": codes.get("pw")["ntasks_per_node"],
-        "num_cores_per_mpiproc": codes.get("pw")["cpus_per_task"],
-    }
+    The settings of the submission are stored in the extras of the node, so that
+    the job can be reloaded in the GUI and filtered in the job history.
+    """
+    from aiida.orm.utils.serialize import serialize
 
+    if engine == "workchain":
+        from aiida_qe_app.workflows.qeapp_workchain import QeAppWorkChain
 
-@router.post("/api/submit_workchain")
-async def submit_workchain(data: CalculationData):
-    from aiida_qe_app.workflows.qeapp_workchain import QeAppWorkChain
-    from aiida.orm.utils.serialize import serialize
+        builder = QeAppWorkChain.get_builder_from_protocol(**inputs)
+        process = submit(builder)
+    else:
+        from aiida_qe_app.workflows.qeapp_workgraph import qeapp_workgraph
+
+        wg = qeapp_workgraph(**inputs)
+        process = wg.submit()
+    data.review_submit["Label and Submit"]["jobId"] = process.pk
+    process.base.extras.set("ui_parameters", serialize(data))
+    # store the workchain name in extras, this will help to filter the workchain in the future
+    process.base.extras.set("workchain", inputs["parameters"]["workchain"])
+    process.base.extras.set("structure", inputs["structure"].get_formula())
+    process.label = data.review_submit.get("Label and Submit", {})["label"]
+    process.description = data.review_submit.get("Label and Submit", {})["description"]
+    return process
+
+
+def is_caching_requested(review_submit: dict) -> bool:
+    """Return whether the user opted in to reuse the cached calculations."""
+    return review_submit.get("Label and Submit", {}).get("enableCaching", False)
+
+
+def apply_caching_option(review_submit: dict) -> Dict[str, bool]:
+    """Enable the AiiDA caching of the calculations if the user opted in.
+
+    The calculations are enabled once for the profile, the jobs which did not opt
+    in disable the cache of their own calculations.
+    """
+    enabled = is_caching_requested(review_submit)
+    restart_daemon = enable_caching() if enabled else False
+    return {"enabled": enabled, "restart_daemon": restart_daemon}
+
+
+@router.post("/api/resources/estimate")
+@offload
+def estimate_job_resources(data: CalculationData):
+    """Return the resources estimated for the job, see ``resources.py``.
+
+    The structure is not stored.
+    """
     from copy import deepcopy
 
+    try:
+        data = deepcopy(data)
+        structure = get_selected_structure(data)
+        return estimate_resources(structure.get_ase(), prepare_parameters(data))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/submit_workchain")
+@offload
+def submit_workchain(data: CalculationData):
     try:
         # Process the data
         # For example, start the calculation using AiiDA
         # Return a success response with job details
         inputs = prepare_inputs(data)
-        codes = deepcopy(inputs["parameters"]["codes"])
-        builder = QeAppWorkChain.get_builder_from_protocol(**inputs)
-        update_builder(builder, codes)
-        process = submit(builder)
-        data.review_submit["Label and Submit"]["jobId"] = process.pk
-        process.base.extras.set("ui_parameters", serialize(data))
-        # store the workchain name in extras, this will help to filter the workchain in the future
-        process.base.extras.set("workchain", inputs["parameters"]["workchain"])
-        process.base.extras.set("structure", inputs["structure"].get_formula())
-        process.label = data.review_submit.get("Label and Submit", {})["label"]
-        process.description = data.review_submit.get("Label and Submit", {})[
-            "description"
-        ]
-        return {"status": "success", "job_id": process.pk}
+        caching = apply_caching_option(data.review_submit)
+        process = submit_inputs("workchain", inputs, data)
+        return {"status": "success", "job_id": process.pk, "caching": caching}
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/api/submit_workgraph")
-async def submit_workgraph(data: CalculationData):
-    from aiida_qe_app.workflows.qeapp_workgraph import qeapp_workgraph
-
-    from aiida.orm.utils.serialize import serialize
-    from copy import deepcopy
-
+@offload
+def submit_workgraph(data: CalculationData):
     try:
         # Process the data
         # For example, start the calculation using AiiDA
         # Return a success response with job details
         inputs = prepare_inputs(data)
-        codes = deepcopy(inputs["parameters"]["codes"])
-        print("inputs: ", inputs)
-        wg = qeapp_workgraph(**inputs)
-        if "relax" in wg.tasks:
-            wg.tasks["relax"].set(
-                {
-                    "base.pw.metadata.options.resources": {
-                        "num_machines": codes.get("pw")["nodes"],
-                        "num_mpiprocs_per_machine": codes.get("pw")["ntasks_per_node"],
-                        "num_cores_per_mpiproc": codes.get("pw")["cpus_per_task"],
-                    }
-                }
-            )
-        process = wg.submit()
-        data.review_submit["Label and Submit"]["jobId"] = process.pk
-        process.base.extras.set("ui_parameters", serialize(data))
-        # store the workchain name in extras, this will help to filter the workchain in the future
-        process.base.extras.set("workchain", inputs["parameters"]["workchain"])
-        process.base.extras.set("structure", inputs["structure"].get_formula())
-        process.label = data.review_submit.get("Label and Submit", {})["label"]
-        process.description = data.review_submit.get("Label and Submit", {})[
-            "description"
-        ]
-        return {"status": "success", "job_id": process.pk}
+        caching = apply_caching_option(data.review_submit)
+        process = submit_inputs("workgraph", inputs, data)
+        return {"status": "success", "job_id": process.pk, "caching": caching}
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+class BatchCalculationData(BaseModel):
+    """One settings template submitted for many structures."""
+
+    structures: List[dict]
+    workflow_settings: dict
+    computational_resources: dict
+    review_submit: dict
+    engine: Literal["workchain", "workgraph"] = "workgraph"
+    # maximum number of submissions running at the same time
+    max_concurrency: int = Field(4, ge=1, le=32)
+    # maximum number of submissions per second, no limit if not set
+    rate_limit: Optional[float] = Field(None, gt=0)
+
+
+def prepare_batch_parameters(data: BatchCalculationData) -> dict:
+    """Prepare the parameters shared by all the structures, checking the codes and
+    pseudopotentials once.
+
+    The parameters are plain data, with the UUIDs of the nodes: a node belongs to
+    the session of the thread that loaded it, so each submission loads the nodes
+    in its own thread.
+    """
+    from copy import deepcopy
+    from aiida import orm
+
+    parameters = prepare_parameters(deepcopy(data))
+    for value in parameters["codes"].values():
+        if value["code"] is not None:
+            orm.load_node(value["code"])
+    for uuid in parameters["advanced"]["pw"]["pseudos"].values():
+        orm.load_node(uuid)
+    return parameters
+
+
+def store_batch_structures(structures: List[dict]) -> List[Union[int, str]]:
+    """Store the new valid structures in a single transaction.
+
+    Return the pk of the stored structure, or the error message, of each
+    structure, the nodes staying in the thread that stored them.
+    """
+    from aiida.manage import get_manager
+
+    results = []
+    # the same structure given twice in the batch is stored once
+    new_structures = {}
+    for structure in structures:
+        try:
+            structure = get_structure(structure)
+        except Exception as e:
+            results.append(f"Invalid structure: {e}")
+            continue
+        if not structure.is_stored:
+            structure_hash = structure.base.extras.get(STRUCTURE_HASH_EXTRA)
+            structure = new_structures.setdefault(structure_hash, structure)
+        results.append(structure)
+    with get_manager().get_profile_storage().transaction():
+        for structure in new_structures.values():
+            structure.store()
+    return [
+        result.pk if isinstance(result, StructureData) else result for result in results
+    ]
+
+
+def submit_batch_structure(
+    data: BatchCalculationData, structure_pk: int, parameters: dict, index: int
+) -> int:
+    """Submit the calculation of one structure of a batch, return the job id."""
+    from copy import deepcopy
+    from aiida import orm
+
+    structure = orm.load_node(structure_pk)
+    review_submit = deepcopy(data.review_submit)
+    label_data = review_submit.setdefault("Label and Submit", {})
+    label = data.structures[index].get("label") or structure.get_formula()
+    label_data["label"] = f"{label_data.get('label', '')} {label}".strip()
+    label_data.setdefault("description", "")
+    calculation_data = CalculationData(
+        structure={
+            "Structure Selection": {"selectedStructure": data.structures[index]}
+        },
+        workflow_settings=data.workflow_settings,
+        computational_resources=data.computational_resources,
+        review_submit=review_submit,
+    )
+    inputs = {"structure": structure, "parameters": deepcopy(parameters)}
+    auto_size_resources(data, structure, inputs["parameters"])
+    return submit_inputs(data.engine, inputs, calculation_data).pk
+
+
+@router.post("/api/submit_batch")
+async def submit_batch(data: BatchCalculationData):
+    """Submit the same calculation for many structures.
+
+    The codes, pseudopotentials and settings are resolved once and the structures
+    are stored in bulk. Only plain data, like the pks of the structures, is passed
+    to the submissions, which run in other threads. The submissions are then run concurrently, at most
+    ``max_concurrency`` at a time and ``rate_limit`` per second. The job id, or
+    the error, of each structure is returned in the order of the structures.
+    """
+    import asyncio
+
+    executor = get_executor()
+    try:
+        parameters = await executor.run(prepare_batch_parameters, data)
+        structures = await executor.run(store_batch_structures, data.structures)
+        caching = await executor.run(apply_caching_option, data.review_submit)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(data.max_concurrency)
+    rate_lock = asyncio.Lock()
+    next_start = loop.time()
+
+    async def submit_one(index, structure):
+        nonlocal next_start
+        if not isinstance(structure, int):
+            return {"index": index, "job_id": None, "error": structure}
+        async with semaphore:
+            if data.rate_limit:
+                async with rate_lock:
+                    await asyncio.sleep(max(0.0, next_start - loop.time()))
+                    next_start = loop.time() + 1.0 / data.rate_limit
+            try:
+                job_id = await executor.run(
+                    submit_batch_structure, data, structure, parameters, index
+                )
+                return {"index": index, "job_id": job_id, "error": None}
+            except Exception as e:
+                traceback.print_exc()
+                return {"index": index, "job_id": None, "error": str(e)}
+
+    results = await asyncio.gather(
+        *(submit_one(index, structure) for index, structure in enumerate(structures))
+    )
+    return {
+        "status": "success",
+        "submitted": sum(result["job_id"] is not None for result in results),
+        "results": results,
+        "caching": caching,
+    }
@@ -0,0 +1,322 @@
+"""Delete nodes in the background, with progress and cancellation.
+
+Deleting a job traverses its provenance graph, which for large graphs takes
+minutes: the deletion runs as a task in its own thread, and the client polls
+the task until it is done. The state of the tasks is saved in files of the cache
+directory, so that with several server workers, see ``qeapp start
+--production``, any of them answers the polls and cancels the task.
+"""
+import functools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from .config import backend_settings
+from .executor import BlockingExecutor
+
+router = APIRouter()
+
+# the most recent tasks kept, to poll their result
+MAX_TASKS = 100
+
+
+class DeleteData(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+    dry_run: bool = False
+
+
+TASK_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+DONE_STATES = ("finished", "cancelled", "failed")
+
+
+class TaskStore:
+    """The state of the tasks, in files shared by the workers of the server.
+
+    Each task has a ``<id>.task`` JSON file, replaced atomically on each update,
+    and a ``<id>.cancel`` file once its cancellation is requested.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _get_path(self, task_id: str, suffix: str) -> Path:
+        if not TASK_ID_PATTERN.match(task_id):
+            raise KeyError(task_id)
+        return self.directory / f"{task_id}{suffix}"
+
+    def save(self, state: Dict[str, Any]) -> None:
+        path = self._get_path(state["id"], ".task")
+        # write to a temporary file first, so that readers never see partial states
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.directory, suffix=".tmp", delete=False
+        ) as handle:
+            json.dump(state, handle)
+        os.replace(handle.name, path)
+
+    def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._get_path(task_id, ".task")) as handle:
+                return json.load(handle)
+        except (KeyError, FileNotFoundError, ValueError):
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        states = [self.load(path.stem) for path in self.directory.glob("*.task")]
+        states = [state for state in states if state is not None]
+        return sorted(states, key=lambda state: state["created"], reverse=True)
+
+    def request_cancel(self, task_id: str) -> None:
+        self._get_path(task_id, ".cancel").touch()
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        return self._get_path(task_id, ".cancel").exists()
+
+    def remove(self, task_id: str) -> None:
+        for suffix in (".task", ".cancel"):
+            self._get_path(task_id, suffix).unlink(missing_ok=True)
+
+    def prune(self, max_tasks: int) -> None:
+        """Remove the oldest finished tasks beyond ``max_tasks`` tasks."""
+        states = self.list()
+        done = [state for state in states if state["state"] in DONE_STATES]
+        for state in done[::-1][: max(len(states) - max_tasks, 0)]:
+            self.remove(state["id"])
+
+
+class DeleteTask:
+    """Delete the nodes and all the nodes that must be deleted with them.
+
+    The AiiDA deletion rules follow the links both ways, e.g. deleting a
+    calculation deletes the workflows that called it, so an arbitrary subset of
+    the nodes to delete can not be deleted alone. The nodes are collected for
+    each of the requested nodes, and each of these sets is deleted in its own
+    transaction: a set is closed under the rules once the sets before it are
+    deleted, so the graph stays consistent if the task is cancelled, or fails,
+    between two sets.
+    """
+
+    def __init__(
+        self, ids: List[int], dry_run: bool = False, store: Optional[TaskStore] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.store = store
+        self.ids = ids
+        self.dry_run = dry_run
+        # queued, collecting, deleting, finished, cancelled or failed
+        self.state = "queued"
+        self.total: Optional[int] = None
+        self.deleted = 0
+        self.counts: Dict[str, int] = {}
+        self.missing: List[int] = []
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.state in DONE_STATES
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the cancellation was requested, by any worker of the server."""
+        if self._cancelled.is_set():
+            return True
+        if self.store is not None and self.store.is_cancel_requested(self.id):
+            self._cancelled.set()
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop the task before it collects or deletes the nodes of its next id."""
+        self._cancelled.set()
+        if self.state == "queued":
+            self._finish("cancelled")
+
+    def save(self):
+        if self.store is not None:
+            self.store.save(self.to_dict())
+
+    def _set_state(self, state: str):
+        self.state = state
+        self.save()
+
+    def _finish(self, state: str):
+        self.finished = time.time()
+        self._set_state(state)
+
+    def run(self):
+        if self.cancelled and not self.done:
+            self._finish("cancelled")
+        if self.done:
+            return
+
+        from aiida.manage import get_manager
+        from aiida.tools.graph.graph_traversers import get_nodes_delete
+
+        try:
+            self._set_state("collecting")
+            backend = get_manager().get_profile_storage()
+            closures = []
+            collected = set()
+            for pk in self.ids:
+                if self.cancelled:
+                    self._finish("cancelled")
+                    return
+                pks = get_nodes_delete(
+                    [pk],
+                    get_links=False,
+                    missing_callback=self.missing.extend,
+                    backend=backend,
+                )["nodes"]
+                closures.append(pks - collected)
+                collected |= pks
+            self.total = len(collected)
+            self.counts = count_node_types(collected)
+            if self.dry_run or self.cancelled:
+                self._finish("cancelled" if self.cancelled else "finished")
+                return
+            self._set_state("deleting")
+            for pks in closures:
+                if self.cancelled:
+                    self._finish("cancelled")
+                    return
+                if not pks:
+                    continue
+                with backend.transaction():
+                    backend.delete_nodes_and_connections(pks)
+                self.deleted += len(pks)
+                self.save()
+            self._finish("finished")
+        except Exception as e:
+            self.error = str(e)
+            self._finish("failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "ids": self.ids,
+            "dry_run": self.dry_run,
+            "state": self.state,
+            "total": self.total,
+            "deleted": self.deleted,
+            "progress": self.deleted / self.total if self.total else None,
+            "counts": self.counts,
+            "missing": self.missing,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+def count_node_types(pks, chunk_size: int = 10000) -> Dict[str, int]:
+    """Return the number of nodes of each type."""
+    from aiida import orm
+
+    counts = Counter()
+    pks = list(pks)
+    for start in range(0, len(pks), chunk_size):
+        qb = orm.QueryBuilder()
+        qb.append(
+            orm.Node,
+            filters={"id": {"in": pks[start : start + chunk_size]}},
+            project="node_type",
+        )
+        counts.update(node_type for node_type, in qb.iterall(batch_size=1000))
+    return dict(counts)
+
+
+class TaskRegistry:
+    """Run the tasks of this worker one at a time, and find the tasks of all the
+    workers in the ``TaskStore``.
+    """
+
+    def __init__(self, store: TaskStore, max_tasks: int = MAX_TASKS):
+        self.store = store
+        self.max_tasks = max_tasks
+        self._tasks: Dict[str, DeleteTask] = {}
+        self._lock = threading.Lock()
+        # a single thread, so that a deletion does not hold the threads of the
+        # routes, and two deletions do not traverse the same graph at once
+        self._executor = BlockingExecutor(max_workers=1)
+
+    def submit(self, task: DeleteTask) -> DeleteTask:
+        task.store = self.store
+        task.save()
+        with self._lock:
+            self._tasks[task.id] = task
+            done = [t for t in self._tasks.values() if t.done]
+            for old in done[: max(len(self._tasks) - self.max_tasks, 0)]:
+                del self._tasks[old.id]
+        self.store.prune(self.max_tasks)
+        self._executor.submit(task.run)
+        return task
+
+    def get(self, task_id: str) -> Dict[str, Any]:
+        """Return the state of the task, run by this worker or by another one."""
+        task = self._tasks.get(task_id)
+        state = task.to_dict() if task is not None else self.store.load(task_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+        return state
+
+    def cancel(self, task_id: str) -> Dict[str, Any]:
+        """Cancel the task, the worker running it stops before its next id."""
+        state = self.get(task_id)
+        task = self._tasks.get(task_id)
+        if task is not None:
+            task.cancel()
+        elif state["state"] not in DONE_STATES:
+            self.store.request_cancel(task_id)
+        return self.get(task_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return self.store.list()
+
+    def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._executor.shutdown()
+
+
+@functools.lru_cache(maxsize=None)
+def get_task_registry() -> TaskRegistry:
+    """Return the registry of the background tasks."""
+    return TaskRegistry(TaskStore(backend_settings.qeapp_cache_dir / "tasks"))
+
+
+@router.post("/api/tasks/delete", status_code=202)
+async def create_delete_task(data: DeleteData) -> Dict[str, Any]:
+    """Delete the nodes in the background, return the task to poll.
+
+    With ``dry_run``, the task only counts the nodes that would be deleted, by
+    node type.
+    """
+    task = get_task_registry().submit(DeleteTask(data.ids, dry_run=data.dry_run))
+    return task.to_dict()
+
+
+@router.get("/api/tasks")
+async def read_tasks() -> List[Dict[str, Any]]:
+    return get_task_registry().list()
+
+
+@router.get("/api/tasks/{task_id}")
+async def read_task(task_id: str) -> Dict[str, Any]:
+    return get_task_registry().get(task_id)
+
+
+@router.delete("/api/tasks/{task_id}")
+async def cancel_task(task_id: str) -> Dict[str, Any]:
+    """Cancel the task, the nodes of the id being deleted are still deleted."""
+    return get_task_registry().cancel(task_id)
@@ -1,24 +1,56 @@
-from typing import Dict, Optional, Union, Tuple, List, Any
+from typing import Dict, Iterable, Optional, Union, Tuple, List, Any
+import functools
+import sys
+import time
 from aiida.orm import load_node, Node
 from datetime import datetime
 from dateutil import relativedelta
 from dateutil.tz import tzlocal
 
 
-def get_plugins():
-    import importlib.metadata
+@functools.lru_cache(maxsize=None)
+def _discover_plugins() -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Load the installed plugins, and report the load time or error of each."""
+    from importlib.metadata import entry_points
 
     plugins = {}
+    report = {}
+    if sys.version_info >= (3, 10):
+        group = entry_points(group="aiida_qe_app.plugins")
+    else:
+        group = entry_points().get("aiida_qe_app.plugins", [])
     # Discover & mount installed plugins
-    for entry in importlib.metadata.entry_points().get("aiida_qe_app.plugins", []):
+    for entry in group:
         plugin_name = entry.name
+        start = time.perf_counter()
         try:
-            plugin_module = entry.load()
-            plugins[plugin_name] = plugin_module
+            plugins[plugin_name] = entry.load()
+            report[plugin_name] = {"loaded": True, "error": None}
         except Exception as e:
             print(f"Failed to load plugin {plugin_name}: {e}")
-            continue
-    return plugins
+            report[plugin_name] = {"loaded": False, "error": str(e)}
+        report[plugin_name]["load_time"] = time.perf_counter() - start
+    return plugins, report
+
+
+def get_plugins() -> Dict[str, Any]:
+    """Return the installed plugins.
+
+    The entry points are scanned and the plugins imported only once, use
+    ``reload_plugins`` to discover them again.
+    """
+    return _discover_plugins()[0]
+
+
+def get_plugin_report() -> Dict[str, Dict[str, Any]]:
+    """Return whether each plugin was loaded, its load time (s) and error."""
+    return _discover_plugins()[1]
+
+
+def reload_plugins() -> Dict[str, Any]:
+    """Discover and load the installed plugins again."""
+    _discover_plugins.cache_clear()
+    return get_plugins()
 
 
 def get_executor_source(tdata: Any) -> Tuple[bool, Optional[str]]:
@@ -192,3 +224,117 @@ def time_ago(past_time: datetime) -> str:
         return f"{delta.minutes}min ago"
     else:
         return "Just now"
+
+
+def encode_cursor(ctime: datetime, pk: int) -> str:
+    """Encode a ``(ctime, pk)`` keyset position into an opaque cursor string."""
+    import base64
+    import json
+
+    payload = json.dumps({"ctime": ctime.isoformat(), "id": pk})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor created by ``encode_cursor``.
+
+    :raises ValueError: if the cursor is malformed.
+    """
+    import base64
+    import binascii
+    import json
+
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return datetime.fromisoformat(payload["ctime"]), int(payload["id"])
+    except (KeyError, TypeError, ValueError, binascii.Error) as exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exception
+
+
+def keyset_filters(cursor: Optional[str], ascending: bool = False) -> Dict[str, Any]:
+    """Return QueryBuilder filters selecting the rows after ``cursor``.
+
+    Rows are assumed to be ordered by ``ctime`` and ``id``, both descending, or
+    both ascending with ``ascending``.
+    """
+    if not cursor:
+        return {}
+    ctime, pk = decode_cursor(cursor)
+    operator = ">" if ascending else "<"
+    return {
+        "or": [
+            {"ctime": {operator: ctime}},
+            {"and": [{"ctime": {"==": ctime}}, {"id": {operator: pk}}]},
+        ]
+    }
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request) -> bool:
+    """Return whether the client asked for a streamed NDJSON response."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(rows: Iterable[Any], chunk_size: int = 100, buffered: int = 2):
+    """Return a response streaming each row as one line of JSON.
+
+    The rows are serialized as they are produced, so a lazy iterable such as
+    ``QueryBuilder.iterall`` keeps the server memory flat. The whole iteration
+    runs in a single call of the executor, on one thread, since the database
+    cursor of the query belongs to the session of the thread that opened it.
+    The chunks of ``chunk_size`` rows are passed to the event loop through a
+    queue of at most ``buffered`` chunks. When the client disconnects, the
+    iteration stops and the iterator is closed, releasing its cursor.
+    """
+    import asyncio
+    import json
+    import threading
+    from itertools import islice
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import StreamingResponse
+    from .executor import get_executor
+
+    def produce(loop, queue, stopped):
+        iterator = iter(rows)
+        try:
+            while not stopped.is_set():
+                chunk = [
+                    json.dumps(jsonable_encoder(row)) + "\n"
+                    for row in islice(iterator, chunk_size)
+                ]
+                asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+                if not chunk:
+                    break
+        except Exception as exception:
+            if not stopped.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(exception), loop).result()
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    async def lines():
+        queue = asyncio.Queue(maxsize=buffered)
+        stopped = threading.Event()
+        producer = asyncio.ensure_future(
+            get_executor().run(produce, asyncio.get_running_loop(), queue, stopped)
+        )
+        try:
+            while True:
+                chunk = await queue.get()
+                if isinstance(chunk, Exception):
+                    raise chunk
+                if not chunk:
+                    break
+                yield "".join(chunk)
+        finally:
+            stopped.set()
+            # unblock the producer waiting for room in the queue
+            while not queue.empty():
+                queue.get_nowait()
+            if producer.done():
+                producer.result()
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
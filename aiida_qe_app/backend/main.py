@@ -1,13 +1,27 @@
 import uvicorn
 import os
 
+from app.config import backend_settings
+
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))  # Default to 8000 if PORT is not set
-    uvicorn.run(
-        "app.api:app",
-        host="0.0.0.0",
-        port=port,
-        reload=True,
-        log_level="debug",
-    )
+    if os.getenv("QEAPP_PRODUCTION"):
+        # each worker process imports the app and loads its own profile
+        uvicorn.run(
+            "app.api:app",
+            host="0.0.0.0",
+            port=port,
+            workers=backend_settings.qeapp_server_workers,
+            timeout_keep_alive=backend_settings.qeapp_server_keep_alive,
+            timeout_graceful_shutdown=backend_settings.qeapp_server_graceful_timeout,
+            log_level="info",
+        )
+    else:
+        uvicorn.run(
+            "app.api:app",
+            host="0.0.0.0",
+            port=port,
+            reload=True,
+            log_level="debug",
+        )
@@ -1,8 +1,10 @@
 import click
+import json
 import os
 import sys
 import subprocess
 import signal
+import time
 
 PID_FILE = "aiida_qe_app.pid"
 
@@ -13,40 +15,209 @@ def cli():
     pass
 
 
-@cli.command()
-@click.option("--port", default=8000, help="Port number to run the server on.")
-def start(port):
-    """Start the FastAPI server."""
-    port = int(os.getenv("PORT", port))  # Use environment variable or default port
+APP = "aiida_qe_app.backend.app.api:app"
+
+
+def get_server_command(host, port, production, workers, timeout, keep_alive):
+    """Return the command running the server.
+
+    In production mode the app runs in several worker processes, each one
+    importing the app and thus loading its own AiiDA profile. gunicorn is used
+    as process manager when it is installed, otherwise uvicorn.
+    """
+    from aiida_qe_app.backend.app.config import backend_settings
 
-    # Start uvicorn in a subprocess
-    process = subprocess.Popen(
-        [
+    if not production:
+        return [
             sys.executable,
             "-m",
             "uvicorn",
-            "aiida_qe_app.backend.app.api:app",
+            APP,
             "--host",
-            "0.0.0.0",
+            host,
             "--port",
             str(port),
             "--reload",
             "--log-level",
             "debug",
         ]
-    )
-    # Write the PID to a file
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            APP,
+            "--host",
+            host,
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--timeout-keep-alive",
+            str(keep_alive),
+            "--timeout-graceful-shutdown",
+            str(backend_settings.qeapp_server_graceful_timeout),
+            "--log-level",
+            "info",
+        ]
+    return [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        APP,
+        "--worker-class",
+        "uvicorn.workers.UvicornWorker",
+        "--bind",
+        f"{host}:{port}",
+        "--workers",
+        str(workers),
+        "--timeout",
+        str(timeout),
+        "--graceful-timeout",
+        str(backend_settings.qeapp_server_graceful_timeout),
+        "--keep-alive",
+        str(keep_alive),
+        "--log-level",
+        "info",
+    ]
+
+
+def write_server(pid, command, env):
+    """Write the PID of the server, and the command and environment variables
+    it was started with, to the PID file.
+    """
+    # the command is ``python -m <server> ...``
+    server = {"pid": pid, "server": command[2], "command": command, "env": env}
     with open(PID_FILE, "w") as f:
-        f.write(str(process.pid))
-    click.echo(f"Server started with PID {process.pid} on port {port}")
+        json.dump(server, f)
+
+
+def read_server():
+    """Return the content of the PID file written by ``write_server``, or None.
+
+    A PID file holding only the PID, written by an older version, has no
+    ``server`` nor ``command``.
+    """
+    try:
+        with open(PID_FILE, "r") as f:
+            server = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if isinstance(server, int):
+        server = {"pid": server}
+    if not isinstance(server, dict) or not isinstance(server.get("pid"), int):
+        return None
+    return server
+
+
+def read_pid():
+    """Return the PID of the running server, or None."""
+    server = read_server()
+    if server is None:
+        return None
+    pid = server["pid"]
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        # the process exists but belongs to another user
+        pass
+    return pid
+
+
+def wait_for_exit(pid, timeout):
+    """Wait for the process to exit, return whether it did within ``timeout`` s."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def spawn_server(command, env):
+    """Start the server and write its PID file, return its PID."""
+    process = subprocess.Popen(command, env={**os.environ, **env})
+    write_server(process.pid, command, env)
+    return process.pid
+
+
+@cli.command()
+@click.option("--host", default="0.0.0.0", help="Host to bind the server to.")
+@click.option("--port", default=8000, help="Port number to run the server on.")
+@click.option(
+    "--production",
+    is_flag=True,
+    help="Run several worker processes, without auto-reload.",
+)
+@click.option("--workers", type=int, help="Number of worker processes.")
+@click.option("--timeout", type=int, help="Restart workers silent for longer (s).")
+@click.option("--keep-alive", type=int, help="Keep idle connections open (s).")
+def start(host, port, production, workers, timeout, keep_alive):
+    """Start the FastAPI server."""
+    from aiida_qe_app.backend.app.config import backend_settings
+
+    port = int(os.getenv("PORT", port))  # Use environment variable or default port
+    pid = read_pid()
+    if pid is not None:
+        click.echo(f"Server is already running with PID {pid}.")
+        return
+    workers = workers or backend_settings.qeapp_server_workers
+    timeout = timeout or backend_settings.qeapp_server_timeout
+    keep_alive = keep_alive or backend_settings.qeapp_server_keep_alive
+    env = {"QEAPP_LOG_LEVEL": "info"} if production else {}
+    command = get_server_command(host, port, production, workers, timeout, keep_alive)
+    pid = spawn_server(command, env)
+    mode = f"production mode with {workers} workers" if production else "dev mode"
+    click.echo(f"Server started with PID {pid} on port {port} ({mode})")
+
+
+@cli.command()
+def restart():
+    """Restart the server, for example to load new code or plugins.
+
+    The workers of gunicorn are restarted gracefully: they finish their requests
+    and are replaced by new ones. uvicorn has no such restart, so the server is
+    stopped, once its requests are finished, and started again with the same
+    options.
+    """
+    from aiida_qe_app.backend.app.config import backend_settings
+
+    pid = read_pid()
+    if pid is None:
+        click.echo("Server is not running.")
+        return
+    server = read_server()
+    if server.get("server") == "gunicorn":
+        os.kill(pid, signal.SIGHUP)
+        click.echo(f"Sent restart signal to server with PID {pid}")
+        return
+    if not server.get("command"):
+        raise click.ClickException(
+            f"The server with PID {pid} was started without its options in "
+            f"{PID_FILE}, stop and start it again instead."
+        )
+    os.kill(pid, signal.SIGTERM)
+    click.echo(f"Stopping server with PID {pid}")
+    if not wait_for_exit(pid, backend_settings.qeapp_server_graceful_timeout + 10):
+        raise click.ClickException(f"Server with PID {pid} did not stop.")
+    pid = spawn_server(server["command"], server.get("env", {}))
+    click.echo(f"Server restarted with PID {pid}")
 
 
 @cli.command()
 def stop():
     """Stop the FastAPI server."""
     try:
-        with open(PID_FILE, "r") as f:
-            pid = int(f.read())
+        server = read_server()
+        if server is None:
+            raise FileNotFoundError(PID_FILE)
+        pid = server["pid"]
         os.kill(pid, signal.SIGTERM)
         click.echo(f"Server with PID {pid} stopped")
         os.remove(PID_FILE)
@@ -61,11 +232,42 @@ def stop():
 @cli.command()
 def status():
     """Check the status of the FastAPI server."""
-    if os.path.isfile(PID_FILE):
-        click.echo("Server is running.")
+    pid = read_pid()
+    if pid is not None:
+        click.echo(f"Server is running with PID {pid}.")
+    elif os.path.isfile(PID_FILE):
+        click.echo("Server is not running (stale PID file removed).")
+        os.remove(PID_FILE)
     else:
         click.echo("Server is not running.")
 
 
+@cli.command("create-indexes")
+@click.option("--profile", default=None, help="AiiDA profile, the default if not set.")
+@click.option("--dry-run", is_flag=True, help="Only list the indexes to create.")
+def create_indexes(profile, dry_run):
+    """Create the database indexes used to search the data nodes.
+
+    The ``formula`` extra, searched with these indexes, is also set on the
+    structures stored before the app set it.
+    """
+    from aiida import load_profile
+    from aiida_qe_app.backend.app.indexes import (
+        backfill_formula_extra,
+        create_search_indexes,
+    )
+
+    load_profile(profile)
+    try:
+        status = create_search_indexes(dry_run=dry_run)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for name, result in status.items():
+        click.echo(f"{name}: {result}")
+    count = backfill_formula_extra(dry_run=dry_run)
+    action = "to update" if dry_run else "updated"
+    click.echo(f"formula extra: {count} structures {action}")
+
+
 if __name__ == "__main__":
     cli()
@@ -1,3 +1,4 @@
+import functools
 import sys
 
 
@@ -38,4 +39,17 @@ def get_entry_items(entry_point_name, item_name="workchain"):
     }
 
 
-plugin_entries = get_entry_items("aiidalab_qe.properties", "workchain")
+@functools.lru_cache(maxsize=None)
+def get_plugin_entries():
+    """Return the workchain entries of the property plugins.
+
+    The plugins are imported on first use, not when this module is imported.
+    """
+    return get_entry_items("aiidalab_qe.properties", "workchain")
+
+
+def __getattr__(name):
+    # ``plugin_entries`` is loaded lazily on first access
+    if name == "plugin_entries":
+        return get_plugin_entries()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,8 +7,19 @@ from aiida.plugins import DataFactory
 from aiida_quantumespresso.common.types import ElectronicType, RelaxType, SpinType
 from aiida_quantumespresso.data.hubbard_structure import HubbardStructureData
 from aiida_quantumespresso.utils.mapping import prepare_process_inputs
+from aiida_quantumespresso.workflows.pw.base import PwBaseWorkChain
 from aiida_quantumespresso.workflows.pw.relax import PwRelaxWorkChain
-from aiida_qe_app.utils import plugin_entries
+from aiida_qe_app.utils import get_plugin_entries
+from aiida_qe_app.workflows.utils import (
+    apply_code_resources,
+    apply_step_resources,
+    disable_caching,
+    get_relax_metadata,
+    get_shared_scf_plugins,
+    reuse_scf,
+    supports_scf_reuse,
+    update_plugin_inputs,
+)
 
 XyData = DataFactory("core.array.xy")
 StructureData = DataFactory("core.structure")
@@ -43,8 +54,21 @@ class QeAppWorkChain(WorkChain):
                 ),
             }
         )
+        spec.expose_inputs(
+            PwBaseWorkChain,
+            namespace='scf',
+            exclude=('clean_workdir', 'pw.structure'),
+            namespace_options={
+                'required': False,
+                'populate_defaults': False,
+                'help': (
+                    'Inputs for the SCF shared by the plugins, whose own SCF is '
+                    'skipped. If not specified, each plugin runs its own SCF.'
+                ),
+            }
+        )
         i = 0
-        for name, entry_point in plugin_entries.items():
+        for name, entry_point in get_plugin_entries().items():
             plugin_workchain = entry_point["workchain"]
             spec.expose_inputs(
                 plugin_workchain,
@@ -72,9 +96,15 @@ class QeAppWorkChain(WorkChain):
                 cls.run_relax,
                 cls.inspect_relax
             ),
+            if_(cls.should_run_scf)(
+                cls.run_scf,
+                cls.inspect_scf
+            ),
             cls.run_plugin,
             cls.inspect_plugin,
         )
+        spec.exit_code(400, 'ERROR_SUB_PROCESS_FAILED_SCF',
+                       message='The shared SCF PwBaseWorkChain sub process failed')
         spec.exit_code(401, 'ERROR_SUB_PROCESS_FAILED_RELAX',
                        message='The PwRelaxWorkChain sub process failed')
         spec.exit_code(402, 'ERROR_SUB_PROCESS_FAILED_PDOS',
@@ -95,13 +125,16 @@ class QeAppWorkChain(WorkChain):
         parameters = parameters or {}
         properties = parameters["workchain"].pop("properties", [])
         codes = parameters.pop("codes", {})
-        # load codes from uuid
+        step_resources = parameters.pop("step_resources", {})
+        caching = parameters.pop("caching", False)
+        # load codes from uuid, unless already loaded
         for _, value in codes.items():
-            if value["code"] is not None:
+            if value["code"] is not None and not isinstance(value["code"], orm.Node):
                 value["code"] = orm.load_node(value["code"])
         # update pseudos
         for kind, uuid in parameters["advanced"]["pw"]["pseudos"].items():
-            parameters["advanced"]["pw"]["pseudos"][kind] = orm.load_node(uuid)
+            if not isinstance(uuid, orm.Node):
+                parameters["advanced"]["pw"]["pseudos"][kind] = orm.load_node(uuid)
         #
         builder = cls.get_builder()
         # Set a HubbardStructureData if hubbard_parameters is specified
@@ -174,7 +207,8 @@ class QeAppWorkChain(WorkChain):
         clean_workdir = orm.Bool(parameters["advanced"]["clean_workdir"])
         builder.clean_workdir = clean_workdir
         # add plugin workchain
-        for name, entry_point in plugin_entries.items():
+        plugin_workchains = {}
+        for name, entry_point in get_plugin_entries().items():
             if name in properties:
                 plugin_builder = entry_point["get_builder"](
                     codes, builder.structure, copy.deepcopy(parameters), **kwargs
@@ -183,8 +217,36 @@ class QeAppWorkChain(WorkChain):
                 if plugin_workchain.spec().has_input("clean_workdir"):
                     plugin_builder.clean_workdir = clean_workdir
                 setattr(builder, name, plugin_builder)
+                plugin_workchains[name] = plugin_workchain
             else:
                 builder.pop(name, None)
+        # one SCF shared by the plugins which can start from it
+        if get_shared_scf_plugins(plugin_workchains):
+            scf_builder = PwBaseWorkChain.get_builder_from_protocol(
+                code=codes.get("pw")["code"],
+                structure=builder.structure,
+                protocol=protocol,
+                electronic_type=ElectronicType(
+                    parameters["workchain"]["electronic_type"]
+                ),
+                spin_type=SpinType(parameters["workchain"]["spin_type"]),
+                initial_magnetic_moments=parameters["advanced"][
+                    "initial_magnetic_moments"
+                ],
+                overrides=parameters["advanced"],
+                **kwargs,
+            )
+            scf_builder.pop("clean_workdir", None)
+            scf_builder.pw.pop("structure", None)
+            builder.scf = scf_builder
+        else:
+            builder.pop("scf", None)
+        # the resources of the calculations of all the steps, then of each step
+        apply_code_resources(builder, codes)
+        apply_step_resources(builder, codes, step_resources)
+        # only the jobs which opted in reuse the cached calculations
+        if not caching:
+            disable_caching(builder)
 
         return builder
 
@@ -194,6 +256,7 @@ class QeAppWorkChain(WorkChain):
         """
         self.ctx.current_structure = self.inputs.structure
         self.ctx.current_number_of_bands = None
+        self.ctx.relax_metadata = {}
         self.ctx.scf_parent_folder = None
 
         # logic based on the properties input
@@ -229,10 +292,44 @@ class QeAppWorkChain(WorkChain):
 
         if "output_structure" in workchain.outputs:
             self.ctx.current_structure = workchain.outputs.output_structure
-            self.ctx.current_number_of_bands = (
-                workchain.outputs.output_parameters.get_attribute("number_of_bands")
-            )
             self.out("structure", self.ctx.current_structure)
+        # the number of bands, to size the NSCF calculations of the plugins
+        self.ctx.relax_metadata = get_relax_metadata(
+            workchain.outputs.output_parameters
+        )
+        self.ctx.current_number_of_bands = self.ctx.relax_metadata["number_of_bands"]
+
+    def should_run_scf(self):
+        """Check if the plugins share one SCF."""
+        return "scf" in self.inputs
+
+    def run_scf(self):
+        """Run the SCF `PwBaseWorkChain` shared by the plugins."""
+        inputs = AttributeDict(self.exposed_inputs(PwBaseWorkChain, namespace="scf"))
+        inputs.metadata.call_link_label = "scf"
+        inputs.pw.structure = self.ctx.current_structure
+        parameters = inputs.pw.parameters.get_dict()
+        parameters.setdefault("CONTROL", {})["calculation"] = "scf"
+        inputs.pw.parameters = orm.Dict(parameters)
+
+        inputs = prepare_process_inputs(PwBaseWorkChain, inputs)
+        running = self.submit(PwBaseWorkChain, **inputs)
+
+        self.report(f"launching shared SCF PwBaseWorkChain<{running.pk}>")
+
+        return ToContext(workchain_scf=running)
+
+    def inspect_scf(self):
+        """Verify that the shared SCF finished successfully."""
+        workchain = self.ctx.workchain_scf
+
+        if not workchain.is_finished_ok:
+            self.report(
+                f"Shared SCF PwBaseWorkChain failed with exit status {workchain.exit_status}"
+            )
+            return self.exit_codes.ERROR_SUB_PROCESS_FAILED_SCF
+
+        self.ctx.scf_parent_folder = workchain.outputs.remote_folder
 
     def should_run_plugin(self, name):
         return name in self.inputs
@@ -240,7 +337,7 @@ class QeAppWorkChain(WorkChain):
     def run_plugin(self):
         """Run the plugin `WorkChain`."""
         plugin_running = {}
-        for name, entry_point in plugin_entries.items():
+        for name, entry_point in get_plugin_entries().items():
             if not self.should_run_plugin(name):
                 continue
             self.report(f"Run plugin : {name}")
@@ -251,6 +348,11 @@ class QeAppWorkChain(WorkChain):
             inputs.metadata.call_link_label = name
             if entry_point.get("update_inputs"):
                 entry_point["update_inputs"](inputs, self.ctx)
+            if self.ctx.relax_metadata:
+                update_plugin_inputs(inputs, self.ctx.relax_metadata)
+            if self.ctx.scf_parent_folder and supports_scf_reuse(plugin_workchain):
+                self.report(f"plugin {name} starts from the shared SCF")
+                reuse_scf(inputs, self.ctx.scf_parent_folder)
             inputs = prepare_process_inputs(plugin_workchain, inputs)
             running = self.submit(plugin_workchain, **inputs)
             self.report(f"launching plugin {name} <{running.pk}>")
@@ -261,7 +363,7 @@ class QeAppWorkChain(WorkChain):
     def inspect_plugin(self):
         """Verify that the `pluginWorkChain` finished successfully."""
         self.report("Inspect plugins:")
-        for name, entry_point in plugin_entries.items():
+        for name, entry_point in get_plugin_entries().items():
             if not self.should_run_plugin(name):
                 continue
             workchain = self.ctx[name]
@@ -3,7 +3,16 @@ from aiida import orm
 from aiida_quantumespresso.workflows.pw.relax import PwRelaxWorkChain
 from aiida_quantumespresso.common.types import ElectronicType, RelaxType, SpinType
 from aiida_quantumespresso.data.hubbard_structure import HubbardStructureData
-from aiida_qe_app.utils import plugin_entries
+from aiida_qe_app.utils import get_plugin_entries
+from aiida_qe_app.workflows.utils import (
+    apply_code_resources,
+    apply_step_resources,
+    disable_caching,
+    get_builder_namespace,
+    get_nscf_paths,
+    get_relax_metadata,
+    update_nscf_parameters,
+)
 import copy
 
 
@@ -64,13 +73,20 @@ def prepare_relax_inputs(structure, codes, parameters, protocol, **kwargs):
     # pop the inputs that are excluded from the expose_inputs
     relax_builder.pop("clean_workdir", None)
     relax_builder.pop("base_final_scf", None)  # never run a final scf
+    apply_code_resources(relax_builder, codes)
     return relax_builder
 
 
 @task()
 def inspect_relax(parameters):
-    """Inspect relax calculation."""
-    return parameters["number_of_bands"]
+    """Return the number of bands of the relaxation."""
+    return get_relax_metadata(parameters)
+
+
+@task()
+def update_nscf(parameters, metadata):
+    """Size the NSCF calculation of a plugin with the bands of the relaxation."""
+    return update_nscf_parameters(parameters, metadata)
 
 
 def get_inputs_from_builder(builder):
@@ -97,13 +113,16 @@ def qeapp_workgraph(
     properties = parameters["workchain"].pop("properties", [])
     protocol = parameters["workchain"]["protocol"]
     codes = parameters.pop("codes", {})
-    # load codes from uuid
+    step_resources = parameters.pop("step_resources", {})
+    caching = parameters.pop("caching", False)
+    # load codes from uuid, unless already loaded
     for _, value in codes.items():
-        if value["code"] is not None:
+        if value["code"] is not None and not isinstance(value["code"], orm.Node):
             value["code"] = orm.load_node(value["code"])
     # update pseudos
     for kind, uuid in parameters["advanced"]["pw"]["pseudos"].items():
-        parameters["advanced"]["pw"]["pseudos"][kind] = orm.load_node(uuid)
+        if not isinstance(uuid, orm.Node):
+            parameters["advanced"]["pw"]["pseudos"][kind] = orm.load_node(uuid)
     # Set a HubbardStructureData if hubbard_parameters is specified
     hubbard_dict = parameters["advanced"].pop("hubbard_parameters", None)
     structure = prepare_hubbard_structure(structure, hubbard_dict)
@@ -111,7 +130,7 @@ def qeapp_workgraph(
     wg = WorkGraph("QeAppWorkGraph")
     # Initialize some variables which can be overridden in the following
     current_structure = structure
-    # current_number_of_bands = None
+    relax_metadata = None
     # ------- relax -----------
     if "relax" in properties:
         relax_task = wg.add_task(PwRelaxWorkChain, name="relax")
@@ -121,24 +140,32 @@ def qeapp_workgraph(
             parameters=parameters,
             protocol=protocol,
         )
+        apply_step_resources(relax_builder, codes, step_resources, prefix="relax")
+        # only the jobs which opted in reuse the cached calculations
+        if not caching:
+            disable_caching(relax_builder)
         # retrieve the relax inputs from the inputs, and set the relax inputs
         relax_task.set(get_inputs_from_builder(relax_builder))
         # override the input structure with the relaxed structure
         current_structure = relax_task.outputs["output_structure"]
         # -------- inspect_relax -----------
-        wg.add_task(
+        inspect_relax_task = wg.add_task(
             inspect_relax,
             name="inspect_relax",
             parameters=relax_task.outputs["output_parameters"],
         )
-        # current_number_of_bands = inspect_relax_task.outputs["result"]
+        relax_metadata = inspect_relax_task.outputs["result"]
     # -------- plugins -----------
     # add plugin workchain
-    for name, entry_point in plugin_entries.items():
+    for name, entry_point in get_plugin_entries().items():
         if name in properties:
             plugin_builder = entry_point["get_builder"](
                 codes, structure, copy.deepcopy(parameters)
             )
+            apply_code_resources(plugin_builder, codes)
+            apply_step_resources(plugin_builder, codes, step_resources, prefix=name)
+            if not caching:
+                disable_caching(plugin_builder)
             plugin_task = wg.add_task(entry_point["workchain"], name=name)
             if "inspect_relax" in wg.tasks:
                 plugin_task.waiting_on.add(["inspect_relax"])
@@ -148,5 +175,18 @@ def qeapp_workgraph(
             # set the structure for the plugin
             if "structure" in plugin_task.inputs:
                 plugin_task.set({"structure": current_structure})
+            # size the NSCF calculations with the bands of the relaxation
+            if relax_metadata is None:
+                continue
+            plugin_inputs = get_inputs_from_builder(plugin_builder)
+            for path in get_nscf_paths(plugin_inputs):
+                namespace = path[: -len(".pw")].replace(".", "_")
+                update_task = wg.add_task(
+                    update_nscf,
+                    name=f"{name}_update_{namespace}",
+                    parameters=get_builder_namespace(plugin_inputs, path)["parameters"],
+                    metadata=relax_metadata,
+                )
+                plugin_task.set({f"{path}.parameters": update_task.outputs["result"]})
 
     return wg
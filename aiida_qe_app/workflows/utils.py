@@ -0,0 +1,290 @@
+"""Helpers shared by the ``QeAppWorkChain`` and the ``QeAppWorkGraph``."""
+import copy
+from collections.abc import Mapping
+from typing import Dict, List
+
+# a shared SCF runs when at least this number of plugins can start from it, see
+# ``get_shared_scf_plugins``
+SHARED_SCF_MIN_PLUGINS = 2
+
+
+def supports_scf_reuse(workchain) -> bool:
+    """Return whether the plugin workchain can start from the folder of an SCF.
+
+    This is the case of the workchains, like the ``PdosWorkChain``, whose ``scf``
+    step is optional when ``nscf.pw.parent_folder`` is given.
+    """
+    spec = workchain.spec()
+    if not spec.has_input("scf") or spec.inputs["scf"].required:
+        return False
+    try:
+        return "parent_folder" in spec.inputs["nscf"]["pw"]
+    except (KeyError, TypeError):
+        return False
+
+
+def get_shared_scf_plugins(workchains: Dict[str, type]) -> List[str]:
+    """Return the plugins starting from a shared SCF instead of their own.
+
+    A shared SCF runs when at least ``SHARED_SCF_MIN_PLUGINS`` plugins can start
+    from it, since it saves no SCF otherwise and only adds a step before the
+    plugins. The other plugins run their own SCF, like the ``PwBandsWorkChain``
+    of the bands plugin which requires its ``scf`` step.
+
+    :param workchains: the workchain of each selected plugin.
+    :return: the plugins starting from the shared SCF, empty if it does not run.
+    """
+    reusing = [name for name, wc in workchains.items() if supports_scf_reuse(wc)]
+    if len(reusing) >= SHARED_SCF_MIN_PLUGINS:
+        return reusing
+    return []
+
+
+def reuse_scf(inputs, parent_folder):
+    """Skip the ``scf`` step of the plugin inputs, starting from ``parent_folder``."""
+    inputs.pop("scf", None)
+    inputs.nscf.pw.parent_folder = parent_folder
+    return inputs
+
+
+# the plugin namespaces of the non-self-consistent calculations
+NSCF_NAMESPACES = ("nscf", "bands")
+
+
+def _to_dict(parameters) -> dict:
+    return parameters.get_dict() if hasattr(parameters, "get_dict") else parameters
+
+
+def get_relax_metadata(output_parameters) -> dict:
+    """Return the metadata of the relaxation used to set up the plugins.
+
+    The number of bands is read from the ``output_parameters`` of the relaxation,
+    ``None`` if missing. The cutoffs and the k-points mesh of the plugins come from
+    their protocol, and the NSCF calculations compute their own Fermi energy, so
+    these outputs are not used.
+    """
+    output_parameters = _to_dict(output_parameters)
+    return {"number_of_bands": output_parameters.get("number_of_bands")}
+
+
+def update_nscf_parameters(parameters, metadata) -> dict:
+    """Return the ``pw`` parameters of a non-self-consistent calculation sized with
+    the number of bands of the relaxation, unless ``nbnd`` is already set.
+    """
+    parameters = copy.deepcopy(_to_dict(parameters))
+    number_of_bands = _to_dict(metadata).get("number_of_bands")
+    if number_of_bands:
+        parameters.setdefault("SYSTEM", {}).setdefault("nbnd", number_of_bands)
+    return parameters
+
+
+def get_nscf_paths(inputs, prefix: str = "") -> List[str]:
+    """Return the dotted paths of the ``pw`` inputs of the NSCF calculations.
+
+    The ``NSCF_NAMESPACES`` are searched in the nested namespaces of the plugin
+    inputs, like ``nscf.pw`` for the PDOS plugin and ``bands.bands.pw`` for the
+    ``PwBandsWorkChain`` of the bands plugin.
+    """
+    paths = []
+    for key, value in inputs.items():
+        if not isinstance(value, Mapping):
+            continue
+        pw_inputs = value.get("pw")
+        if (
+            key in NSCF_NAMESPACES
+            and isinstance(pw_inputs, Mapping)
+            and pw_inputs.get("parameters") is not None
+        ):
+            paths.append(f"{prefix}{key}.pw")
+        else:
+            paths.extend(get_nscf_paths(value, prefix=f"{prefix}{key}."))
+    return paths
+
+
+def update_plugin_inputs(inputs, metadata):
+    """Set the number of bands of the relaxation in the NSCF calculations of the
+    plugin inputs.
+    """
+    from aiida import orm
+
+    for path in get_nscf_paths(inputs):
+        pw_inputs = get_builder_namespace(inputs, path)
+        pw_inputs["parameters"] = orm.Dict(
+            update_nscf_parameters(pw_inputs["parameters"], metadata)
+        )
+    return inputs
+
+
+# the command line flags of the parallelization levels of the codes
+PARALLELIZATION_FLAGS = {
+    "npool": "-nk",
+    "nimage": "-ni",
+    "nband": "-nb",
+    "ntg": "-nt",
+    "ndiag": "-nd",
+}
+
+
+def get_code_resources(settings: dict) -> dict:
+    """Return the scheduler ``resources`` of the settings of a code."""
+    return {
+        "num_machines": settings["nodes"],
+        "num_mpiprocs_per_machine": settings["ntasks_per_node"],
+        "num_cores_per_mpiproc": settings.get("cpus_per_task", 1),
+    }
+
+
+def set_parallelization(inputs, parallelization: dict):
+    """Set the parallelization of the calculation inputs.
+
+    The ``parallelization`` input is used if the calculation has one, otherwise the
+    flags are added to the ``CMDLINE`` of the ``settings``.
+    """
+    from aiida import orm
+
+    try:
+        inputs.parallelization = orm.Dict(parallelization)
+        return inputs
+    except AttributeError:
+        pass
+    settings = copy.deepcopy(_to_dict(inputs.get("settings") or {}))
+    cmdline = list(settings.get("CMDLINE", []))
+    for key, value in parallelization.items():
+        flag = PARALLELIZATION_FLAGS[key]
+        if flag in cmdline:
+            index = cmdline.index(flag)
+            del cmdline[index : index + 2]
+        cmdline.extend([flag, str(value)])
+    settings["CMDLINE"] = cmdline
+    inputs.settings = orm.Dict(settings)
+    return inputs
+
+
+def set_code_resources(inputs, settings: dict):
+    """Set the resources, wallclock time, OpenMP threads and parallelization of
+    the calculation inputs from the ``settings`` of its code.
+    """
+    options = inputs.metadata.options
+    options.resources = get_code_resources(settings)
+    if settings.get("max_wallclock_seconds"):
+        options.max_wallclock_seconds = settings["max_wallclock_seconds"]
+    environment_variables = dict(options.get("environment_variables") or {})
+    environment_variables["OMP_NUM_THREADS"] = str(settings.get("cpus_per_task", 1))
+    options.environment_variables = environment_variables
+    if settings.get("parallelization"):
+        set_parallelization(inputs, settings["parallelization"])
+    return inputs
+
+
+def apply_code_resources(builder, codes: dict):
+    """Set the resources of every calculation of the builder from its code.
+
+    The calculations are found in the nested namespaces of the builder, from
+    their ``code`` input, so that the relax, the shared SCF and the calculations
+    of every plugin get the resources of the settings of their code in ``codes``.
+    The codes must be loaded.
+    """
+    from aiida import orm
+    from aiida.engine.processes.builder import ProcessBuilderNamespace
+
+    settings = {
+        value["code"].uuid: value
+        for value in codes.values()
+        if isinstance(value.get("code"), orm.Node)
+    }
+
+    def apply(namespace):
+        code = namespace.get("code")
+        if isinstance(code, orm.Node) and code.uuid in settings:
+            set_code_resources(namespace, settings[code.uuid])
+        for value in namespace.values():
+            if isinstance(value, ProcessBuilderNamespace):
+                apply(value)
+
+    apply(builder)
+    return builder
+
+
+def disable_caching(builder):
+    """Disable the cache for every calculation of the builder.
+
+    The calculations are found in the nested namespaces of the builder from their
+    ``code`` input, like in ``apply_code_resources``. Their ``disable_cache``
+    metadata takes precedence over the ``caching.enabled_for`` option of the
+    profile, so that only the jobs which opted in reuse the cached calculations.
+    """
+    from aiida import orm
+    from aiida.engine.processes.builder import ProcessBuilderNamespace
+
+    def disable(namespace):
+        if isinstance(namespace.get("code"), orm.Node):
+            namespace.metadata.disable_cache = True
+        for value in namespace.values():
+            if isinstance(value, ProcessBuilderNamespace):
+                disable(value)
+
+    disable(builder)
+    return builder
+
+
+def get_builder_namespace(builder, path: str):
+    """Return the namespace of the builder at the dotted ``path``, or ``None``."""
+    namespace = builder
+    for key in filter(None, path.split(".")):
+        try:
+            namespace = namespace[key]
+        except (KeyError, TypeError):
+            return None
+    return namespace
+
+
+def merge_code_settings(code_settings: dict, settings: dict) -> dict:
+    """Return the settings of a code overridden by the ``settings`` of a step.
+
+    The number of pools of the code is reduced to divide the MPI ranks of the
+    step, as required by ``pw.x``.
+    """
+    merged = {**code_settings, **settings}
+    parallelization = dict(merged.get("parallelization") or {})
+    npool = parallelization.get("npool")
+    ranks = merged["nodes"] * merged["ntasks_per_node"]
+    if npool and ranks % npool:
+        parallelization["npool"] = max(
+            divisor for divisor in range(1, npool + 1) if ranks % divisor == 0
+        )
+        merged["parallelization"] = parallelization
+    return merged
+
+
+def apply_step_resources(builder, codes: dict, step_resources: dict, prefix=None):
+    """Set the resources of the calculations of each step of the builder.
+
+    :param codes: the settings of the loaded codes.
+    :param step_resources: the settings overriding the ones of the codes, for the
+        calculations of the step at each dotted path of the builder, e.g.
+        ``{"pdos.nscf": {"pw": {"nodes": 4}}, "pdos": {"dos": {"nodes": 1}}}``.
+        The settings of a nested step take precedence.
+    :param prefix: the path of the builder, for the builder of a single step, like
+        the tasks of the ``QeAppWorkGraph``. Only the paths of the step are used.
+    """
+    paths = {}
+    for path, step_codes in step_resources.items():
+        if prefix is not None:
+            if path == prefix:
+                path = ""
+            elif path.startswith(f"{prefix}."):
+                path = path[len(prefix) + 1 :]
+            else:
+                continue
+        paths[path] = step_codes
+    for path in sorted(paths, key=lambda path: path.count(".") + bool(path)):
+        namespace = get_builder_namespace(builder, path)
+        if namespace is None:
+            continue
+        step_codes = {
+            name: merge_code_settings(codes[name], settings)
+            for name, settings in paths[path].items()
+            if name in codes
+        }
+        apply_code_resources(namespace, step_codes)
+    return builder
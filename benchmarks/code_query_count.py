@@ -0,0 +1,45 @@
+"""Count the SQL queries needed to list the codes.
+
+Run it against an AiiDA profile with some codes::
+
+    python benchmarks/code_query_count.py [--profile <name>]
+
+The codes are listed with an increasing page size: the number of queries must
+stay constant, instead of growing with the number of codes (N+1 queries).
+"""
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--profile", default=None)
+    args = parser.parse_args()
+
+    from aiida import load_profile, orm
+    from aiida.manage import get_manager
+    from sqlalchemy import event
+
+    load_profile(args.profile)
+    from aiida_qe_app.backend.app.models import Code
+
+    statements = []
+    engine = get_manager().get_profile_storage().get_session().get_bind()
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *_: statements.append(statement),
+    )
+
+    total = orm.QueryBuilder().append(orm.Code).count()
+    page_size = 1
+    while True:
+        statements.clear()
+        codes = Code.get_entities(page_size=page_size, page=1)
+        print(f"{len(codes):5d} codes: {len(statements)} queries")
+        if page_size >= total:
+            break
+        page_size *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure the import time of the entry points of the app.
+
+Each module is imported in a fresh interpreter with ``python -X importtime``::
+
+    python benchmarks/import_time.py [--top 10]
+
+The cumulative import time of each entry point is compared with its cold-start
+budget, the script exits with an error if one of them is over budget. The
+slowest imports are listed to find what to import lazily.
+"""
+import argparse
+import subprocess
+import sys
+
+# module: cold-start budget (s)
+BUDGETS = {
+    "aiida_qe_app": 0.1,
+    "aiida_qe_app.cli": 0.3,
+    "aiida_qe_app.workflows.qeapp_workchain": 3.0,
+    "aiida_qe_app.backend.app.api": 6.0,
+}
+
+
+def get_import_times(module):
+    """Return the cumulative import time (s) of each module imported by ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    over_budget = []
+    for module, budget in BUDGETS.items():
+        try:
+            times = get_import_times(module)
+        except RuntimeError as e:
+            print(f"{module}: failed to import ({e})")
+            over_budget.append(module)
+            continue
+        total = times[module]
+        status = "ok" if total <= budget else "OVER BUDGET"
+        print(f"{module}: {total:.3f} s (budget {budget:.1f} s) {status}")
+        times.pop(module)
+        slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)
+        for name, seconds in slowest[: args.top]:
+            print(f"    {seconds:8.3f} s  {name}")
+        if total > budget:
+            over_budget.append(module)
+    if over_budget:
+        sys.exit(f"Over the import time budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Check that slow requests do not stall the other requests of the server.
+
+Start the server (``qeapp start``), then run::
+
+    python benchmarks/load_test.py --slow-path /api/electronic_structure/<pk>
+
+The latency of the fast requests is measured alone, then while the slow
+requests are in flight. If the blocking calls serialized on the event loop,
+the fast requests would wait for the slow ones and their latency would grow to
+the latency of the slow requests.
+"""
+import argparse
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def timed_get(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def measure(base_url, path, count, concurrency):
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(timed_get, [base_url + path] * count))
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    return f"median {statistics.median(latencies) * 1000:8.1f} ms, p95 {p95 * 1000:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--slow-path", default="/api/jobs-data?limit=500")
+    parser.add_argument("--fast-path", default="/api/executor/metrics")
+    parser.add_argument("--slow", type=int, default=4, help="number of slow requests")
+    parser.add_argument("--fast", type=int, default=50, help="number of fast requests")
+    args = parser.parse_args()
+
+    alone = measure(args.url, args.fast_path, args.fast, 4)
+    print(f"fast requests alone:        {summary(alone)}")
+
+    with ThreadPoolExecutor(args.slow) as pool:
+        slow = pool.map(timed_get, [args.url + args.slow_path] * args.slow)
+        loaded = measure(args.url, args.fast_path, args.fast, 4)
+        slow = list(slow)
+    print(f"fast requests under load:   {summary(loaded)}")
+    print(f"slow requests:              {summary(slow)}")
+    ratio = statistics.median(loaded) / statistics.median(slow)
+    print(f"fast/slow median ratio:     {ratio:.2f} (close to 1 means serialized)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import React from "react";
 import CodeResourcesTab from "./computational_resources/CodeResourcesTab";
+import StepResourcesTab from "./computational_resources/StepResourcesTab";
 import BasicSettingsTab from "./workflow/BasicSettingsTab";
 import AdvancedSettingsTab from "./workflow/AdvancedSettingsTab";
 import StructureSelection from "./structure_selection/StructureSelection";
@@ -94,6 +95,11 @@ export function makeInitialStepsData(pluginIds) {
               React.createElement(pl.CodeResourcesTab, null)
             ),
           })),
+        {
+          id: "steps",
+          title: "Step Resource Settings",
+          content: <StepResourcesTab />,
+        },
       ],
       dependents: [3],
       ButtonText: "Confirm",
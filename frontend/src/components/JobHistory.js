@@ -19,6 +19,23 @@ function parseDateString(dateStr) {
   }
 }
 
+// Read a streamed NDJSON response, calling onRows with the rows of every received chunk
+async function readNdjson(response, onRows) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    const rows = lines.filter((line) => line.trim()).map((line) => JSON.parse(line));
+    if (rows.length) onRows(rows);
+  }
+  if (buffer.trim()) onRows([JSON.parse(buffer)]);
+}
+
 const JobHistory = () => {
   const navigate = useNavigate();
   // State for jobs data
@@ -27,112 +44,204 @@ const JobHistory = () => {
   const [error, setError] = useState(null);     // Error state
 
   // State for search inputs
-  const [searchLabel, setSearchLabel] = useState('');
-  const [jobState, setJobState] = useState('');
-  const [startDate, setStartDate] = useState('');
-  const [endDate, setEndDate] = useState('');
-  const [properties, setProperties] = useState({
-    xps: false,
-    vibronic: false,
-    bands: false,
-    bader: false,
-    pdos: false,
-    hp: false,
-    xas: false,
-    relax: false,
+  const [filters, setFilters] = useState({
+    searchLabel: '',
+    jobState: '',
+    startDate: '',
+    endDate: '',
+    properties: {
+      xps: false,
+      vibronic: false,
+      bands: false,
+      bader: false,
+      pdos: false,
+      hp: false,
+      xas: false,
+      relax: false,
+    },
   });
-
-  // State for pagination
-  const [currentPage, setCurrentPage] = useState(1);
+  const { searchLabel, jobState, startDate, endDate, properties } = filters;
+
+  // State for pagination, the pages are fetched from the server using keyset cursors
+  const firstPage = { currentPage: 1, pageCursors: [null] }; // cursor of each visited page
+  const [paging, setPaging] = useState(firstPage);
+  const { currentPage, pageCursors } = paging;
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalJobs, setTotalJobs] = useState(0);
   const jobsPerPage = 20; // Configurable
 
-  // Sorting state
-  const [sortConfig, setSortConfig] = useState({ key: 'id', direction: 'descending' });
+  // The server orders the jobs by creation time, and the PKs follow the creation time
+  const [order, setOrder] = useState('desc');
+
+  // Change the filters and go back to the first page in the same update, so that the
+  // page is never fetched with the new filters and the cursor of the old ones
+  const updateFilters = (changes) => {
+    setFilters((previous) => ({ ...previous, ...changes }));
+    setPaging(firstPage);
+  };
+
+  // Construct query parameters based on search inputs
+  const buildFilterParams = () => {
+    const queryParams = new URLSearchParams();
+
+    if (searchLabel) queryParams.append('label', searchLabel);
+    if (jobState) queryParams.append('state', jobState);
+    if (startDate) queryParams.append('start_date', startDate);
+    if (endDate) queryParams.append('end_date', endDate);
+
+    // Append properties to query parameters
+    Object.keys(properties).forEach((prop) => {
+      if (properties[prop]) {
+        queryParams.append('properties', prop);
+      }
+    });
+    return queryParams;
+  };
+
+  // Count the jobs matching the search filters
+  useEffect(() => {
+    const controller = new AbortController();
+
+    const fetchCount = async () => {
+      try {
+        const response = await fetch(`${baseURL}/api/jobs-data/count?${buildFilterParams().toString()}`, {
+          signal: controller.signal,
+        });
+        if (response.ok) {
+          const data = await response.json();
+          setTotalJobs(data.total);
+        }
+      } catch (err) {
+        if (err.name !== 'AbortError') {
+          console.error('Failed to fetch the number of jobs:', err);
+        }
+      }
+    };
+
+    fetchCount();
+    return () => controller.abort();
+  }, [filters]);
 
-  // useEffect to fetch data from the API when the component mounts or when search filters change
+  // useEffect to fetch the current page from the API, the request of a previous page
+  // or of previous filters is aborted so that its rows never replace the current ones
   useEffect(() => {
+    const controller = new AbortController();
+
     const fetchJobs = async () => {
       setLoading(true);
       setError(null);
 
       try {
-        // Construct query parameters based on search inputs
-        const queryParams = new URLSearchParams();
-
-        if (searchLabel) queryParams.append('label', searchLabel);
-        if (jobState) queryParams.append('state', jobState);
-        if (startDate) queryParams.append('start_date', startDate);
-        if (endDate) queryParams.append('end_date', endDate);
-
-        // Append properties to query parameters
-        Object.keys(properties).forEach((prop) => {
-          if (properties[prop]) {
-            queryParams.append('properties', prop);
-          }
+        const queryParams = buildFilterParams();
+        queryParams.append('order', order);
+        const cursor = pageCursors[currentPage - 1];
+        if (cursor) queryParams.append('cursor', cursor);
+
+        // Stream the page one row at a time, fetching one extra job to know whether
+        // there is a next page
+        queryParams.set('limit', jobsPerPage + 1);
+        const response = await fetch(`${baseURL}/api/jobs-data?${queryParams.toString()}`, {
+          headers: { Accept: 'application/x-ndjson' },
+          signal: controller.signal,
         });
-
-        const response = await fetch(`${baseURL}/api/jobs-data?${queryParams.toString()}`);
-        console.log("response", response)
         if (!response.ok) {
           throw new Error(`Server responded with ${response.status}`);
         }
-        const data = await response.json();
-        setJobs(data.jobs); // Assuming the API returns an object with a 'jobs' array
+        let received = [];
+        setJobs([]);
+        await readNdjson(response, (rows) => {
+          if (controller.signal.aborted) return;
+          received = received.concat(rows);
+          setJobs(received.slice(0, jobsPerPage));
+          setLoading(false); // render the rows as they arrive
+        });
+        if (received.length > jobsPerPage) {
+          const last = received[jobsPerPage - 1];
+          setNextCursor(last.cursor);
+        } else {
+          setNextCursor(null);
+        }
       } catch (err) {
-        setError(err.message);
+        if (err.name !== 'AbortError') {
+          setError(err.message);
+        }
       } finally {
-        setLoading(false);
+        if (!controller.signal.aborted) {
+          setLoading(false);
+        }
       }
     };
 
     fetchJobs();
-  }, [searchLabel, jobState, startDate, endDate, properties]);
+    return () => controller.abort();
+  }, [paging, filters, order]);
 
-  // Function to handle sorting
-  const handleSort = (key) => {
-    let direction = 'ascending';
-    if (sortConfig.key === key && sortConfig.direction === 'ascending') {
-      direction = 'descending';
-    }
-    setSortConfig({ key, direction });
+  // Update the state of the listed jobs when the server pushes a change
+  useEffect(() => {
+    const source = new EventSource(`${baseURL}/api/events/jobs`);
+    source.addEventListener('update', (event) => {
+      const process = JSON.parse(event.data);
+      setJobs((previous) =>
+        previous.map((job) =>
+          job.id === process.id
+            ? { ...job, 'attributes.process_state': process.process_state }
+            : job
+        )
+      );
+    });
+    return () => source.close();
+  }, []);
+
+  // Sort the jobs on the server, from the first page
+  const handleSort = () => {
+    setOrder((previous) => (previous === 'desc' ? 'asc' : 'desc'));
+    setPaging(firstPage);
   };
+  const sortIndicator = order === 'asc' ? '▲' : '▼';
 
-  // Sort the jobs based on the current sort configuration
-  const sortedJobs = [...jobs].sort((a, b) => {
-    if (a[sortConfig.key] < b[sortConfig.key]) {
-      return sortConfig.direction === 'ascending' ? -1 : 1;
-    }
-    if (a[sortConfig.key] > b[sortConfig.key]) {
-      return sortConfig.direction === 'ascending' ? 1 : -1;
-    }
-    return 0;
-  });
-
-  // Paginate the sorted jobs
-  const paginatedJobs = sortedJobs.slice((currentPage - 1) * jobsPerPage, currentPage * jobsPerPage);
-
-  // Handle search form submit
+  // Handle search form submit, fetch the first page again
   const handleSearch = (e) => {
     e.preventDefault();
-    setCurrentPage(1); // Reset to first page on new search
-    // The useEffect hook will handle fetching new data
+    setPaging(firstPage);
   };
 
-  // Handle pagination
+  // Handle pagination, only the previous pages and the next one are reachable
   const handlePageChange = (page) => {
-    setCurrentPage(page);
+    if (page === currentPage + 1) {
+      if (!nextCursor) return;
+      setPaging({ currentPage: page, pageCursors: [...pageCursors.slice(0, currentPage), nextCursor] });
+      return;
+    }
+    setPaging({ currentPage: page, pageCursors });
   };
 
-  // Handle delete job (you can implement this function)
+  // Delete the job in a background task, and poll the task until it is done
   const handleDeleteJob = async (jobId) => {
     if (window.confirm(`Are you sure you want to delete job ${jobId}?`)) {
       try {
-        const response = await fetch(`${baseURL}/api/jobs-data/${jobId}`, { method: 'DELETE' });
+        let response = await fetch(`${baseURL}/api/tasks/delete`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ ids: [jobId] }),
+        });
         if (!response.ok) {
           throw new Error(`Server responded with ${response.status}`);
         }
+        let task = await response.json();
+        while (!['finished', 'cancelled', 'failed'].includes(task.state)) {
+          await new Promise((resolve) => setTimeout(resolve, 1000));
+          response = await fetch(`${baseURL}/api/tasks/${task.id}`);
+          if (!response.ok) {
+            throw new Error(`Server responded with ${response.status}`);
+          }
+          task = await response.json();
+        }
+        if (task.state !== 'finished') {
+          throw new Error(task.error || `deletion ${task.state}`);
+        }
         // Remove the deleted job from the state
-        setJobs(jobs.filter((job) => job.id !== jobId));
+        setJobs((previous) => previous.filter((job) => job.id !== jobId));
+        setTotalJobs((total) => Math.max(total - 1, 0));
       } catch (err) {
         alert(`Error deleting job: ${err.message}`);
       }
@@ -158,7 +267,7 @@ const JobHistory = () => {
                 type="text"
                 placeholder="Enter label to search"
                 value={searchLabel}
-                onChange={(e) => setSearchLabel(e.target.value)}
+                onChange={(e) => updateFilters({ searchLabel: e.target.value })}
               />
             </Form.Group>
           </Col>
@@ -169,7 +278,7 @@ const JobHistory = () => {
               <Form.Control
                 as="select"
                 value={jobState}
-                onChange={(e) => setJobState(e.target.value)}
+                onChange={(e) => updateFilters({ jobState: e.target.value })}
               >
                 <option value="">Any</option>
                 <option value="finished">Finished</option>
@@ -190,7 +299,7 @@ const JobHistory = () => {
                     type="checkbox"
                     label={prop}
                     checked={properties[prop]}
-                    onChange={() => setProperties({ ...properties, [prop]: !properties[prop] })}
+                    onChange={() => updateFilters({ properties: { ...properties, [prop]: !properties[prop] } })}
                   />
                 ))}
               </div>
@@ -205,7 +314,7 @@ const JobHistory = () => {
               <Form.Control
                 type="date"
                 value={startDate}
-                onChange={(e) => setStartDate(e.target.value)}
+                onChange={(e) => updateFilters({ startDate: e.target.value })}
               />
             </Form.Group>
           </Col>
@@ -216,7 +325,7 @@ const JobHistory = () => {
               <Form.Control
                 type="date"
                 value={endDate}
-                onChange={(e) => setEndDate(e.target.value)}
+                onChange={(e) => updateFilters({ endDate: e.target.value })}
               />
             </Form.Group>
           </Col>
@@ -247,11 +356,11 @@ const JobHistory = () => {
           <Table striped bordered hover responsive className="mt-4">
             <thead>
               <tr>
-                <th onClick={() => handleSort('id')} style={{ cursor: 'pointer' }}>
-                  PK {sortConfig.key === 'id' ? (sortConfig.direction === 'ascending' ? '▲' : '▼') : ''}
+                <th onClick={handleSort} style={{ cursor: 'pointer' }}>
+                  PK {sortIndicator}
                 </th>
-                <th onClick={() => handleSort('creationTime')} style={{ cursor: 'pointer' }}>
-                  Creation Time {sortConfig.key === 'creationTime' ? (sortConfig.direction === 'ascending' ? '▲' : '▼') : ''}
+                <th onClick={handleSort} style={{ cursor: 'pointer' }}>
+                  Creation Time {sortIndicator}
                 </th>
                 <th>Structure</th>
                 <th>State</th>
@@ -262,7 +371,7 @@ const JobHistory = () => {
               </tr>
             </thead>
             <tbody>
-              {paginatedJobs.map((job) => (
+              {jobs.map((job) => (
                 <tr key={job.id}>
                   <td>{job.id}</td>
                   <td>{parseDateString(job.ctime)?.toLocaleString()}</td>
@@ -286,9 +395,13 @@ const JobHistory = () => {
           </Table>
 
           {/* Pagination */}
-          {jobs.length > jobsPerPage && (
+          {(currentPage > 1 || nextCursor) && (
             <Pagination>
-              {Array.from({ length: Math.ceil(jobs.length / jobsPerPage) }).map((_, idx) => (
+              <Pagination.Prev
+                disabled={currentPage === 1}
+                onClick={() => handlePageChange(currentPage - 1)}
+              />
+              {pageCursors.map((_, idx) => (
                 <Pagination.Item
                   key={idx + 1}
                   active={idx + 1 === currentPage}
@@ -297,8 +410,15 @@ const JobHistory = () => {
                   {idx + 1}
                 </Pagination.Item>
               ))}
+              <Pagination.Next
+                disabled={!nextCursor}
+                onClick={() => handlePageChange(currentPage + 1)}
+              />
             </Pagination>
           )}
+          <div className="text-muted">
+            Page {currentPage} of {Math.max(Math.ceil(totalJobs / jobsPerPage), 1)} ({totalJobs} jobs)
+          </div>
         </>
       )}
     </div>
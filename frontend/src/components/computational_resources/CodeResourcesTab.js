@@ -1,4 +1,5 @@
 import React, { useEffect, useState, useContext } from 'react';
+import { Form } from 'react-bootstrap';
 import BaseCodeResourcesTab from '../widgets/CodeResourcesTab';
 import { WizardContext } from '../wizard/WizardContext';
 
@@ -37,12 +38,28 @@ const CodeResourcesTab = ({}) => {
   };
 
   return (
-    <BaseCodeResourcesTab
-      codesConfig={codesConfig}
-      codes={codes}
-      data={data}
-      onDataChange={(newData) => handleDataChange(stepIndex, tabTitle, newData)}
-    />
+    <>
+      <Form.Check
+        type="checkbox"
+        id="auto-resources"
+        className="mb-3"
+        label="Size the resources automatically from the structure"
+        checked={data.autoResources || false}
+        onChange={(e) => handleDataChange(stepIndex, tabTitle, { ...data, autoResources: e.target.checked })}
+      />
+      {data.autoResources && (
+        <Form.Text className="d-block mb-3" muted>
+          The MPI ranks, pools, OpenMP threads and wallclock time of each code are estimated at submission,
+          using at most the nodes and CPUs per node set below. See the estimate in the review step.
+        </Form.Text>
+      )}
+      <BaseCodeResourcesTab
+        codesConfig={codesConfig}
+        codes={codes}
+        data={data}
+        onDataChange={(newData) => handleDataChange(stepIndex, tabTitle, newData)}
+      />
+    </>
   );
 };
 
@@ -0,0 +1,101 @@
+import React, { useContext } from 'react';
+import { Form, Table } from 'react-bootstrap';
+import { WizardContext } from '../wizard/WizardContext';
+
+// the resources of a step, empty fields use the settings of the code
+const fields = [
+  { key: 'nodes', label: 'Nodes' },
+  { key: 'cpus', label: 'CPUs per node' },
+  { key: 'threads', label: 'OpenMP threads' },
+  { key: 'npool', label: 'Pools (-nk)' },
+];
+
+// the codes of a step: pw, and the codes of the resource tab of its plugin
+const getStepCodes = (resourcesData, step) => {
+  const codes = new Set(['pw']);
+  Object.entries(resourcesData).forEach(([title, tabData]) => {
+    if (step !== 'relax' && title.toLowerCase().startsWith(`${step} `)) {
+      Object.keys(tabData.codes || {}).forEach((code) => codes.add(code));
+    }
+  });
+  return [...codes];
+};
+
+const StepResourcesTab = ({}) => {
+  const stepIndex = 2;
+  const tabTitle = 'Step Resource Settings';
+  const { steps, handleDataChange } = useContext(WizardContext);
+  const data = steps[stepIndex]?.data?.[tabTitle] || {};
+  const resourcesData = steps[stepIndex]?.data || {};
+  const basicSettings = steps[1]?.data?.['Basic Settings'] || {};
+
+  const stepNames = [
+    ...(basicSettings.relaxType && basicSettings.relaxType !== 'none' ? ['relax'] : []),
+    ...Object.entries(basicSettings.properties || {})
+      .filter(([, enabled]) => enabled)
+      .map(([name]) => name),
+  ];
+
+  const handleChange = (step, code, field, value) => {
+    const parsedValue = parseInt(value, 10);
+    const stepCodes = { ...(data.steps?.[step] || {}) };
+    const values = { ...(stepCodes[code] || {}) };
+    if (!isNaN(parsedValue) && parsedValue > 0) {
+      values[field] = parsedValue;
+    } else {
+      delete values[field];
+    }
+    stepCodes[code] = values;
+    handleDataChange(stepIndex, tabTitle, {
+      ...data,
+      steps: { ...(data.steps || {}), [step]: stepCodes },
+    });
+  };
+
+  if (stepNames.length === 0) {
+    return <p className="text-muted">No step selected in the workflow settings.</p>;
+  }
+
+  return (
+    <Form>
+      <p className="text-muted">
+        Override the resources of the codes for each step, e.g. fewer cores for the post-processing.
+        Empty fields use the resource settings of the code.
+      </p>
+      <Table bordered size="sm">
+        <thead>
+          <tr>
+            <th>Step</th>
+            <th>Code</th>
+            {fields.map((field) => (
+              <th key={field.key}>{field.label}</th>
+            ))}
+          </tr>
+        </thead>
+        <tbody>
+          {stepNames.flatMap((step) =>
+            getStepCodes(resourcesData, step).map((code) => (
+              <tr key={`${step}-${code}`}>
+                <td>{step}</td>
+                <td>{code}</td>
+                {fields.map((field) => (
+                  <td key={field.key}>
+                    <Form.Control
+                      type="number"
+                      min="1"
+                      size="sm"
+                      value={data.steps?.[step]?.[code]?.[field.key] ?? ''}
+                      onChange={(e) => handleChange(step, code, field.key, e.target.value)}
+                    />
+                  </td>
+                ))}
+              </tr>
+            ))
+          )}
+        </tbody>
+      </Table>
+    </Form>
+  );
+};
+
+export default StepResourcesTab;
@@ -4,6 +4,38 @@ import BandsPdosPlot from '../../widgets/BandsPdosPlot';
 import { WizardContext } from '../../wizard/WizardContext';
 
 const baseURL = process.env.PUBLIC_URL || '';
+// number of points of the PDOS curves requested from the server
+const PDOS_POINTS = 1500;
+
+// Rebuild (nested) arrays of the given shape from a flat typed array
+const reshape = (flat, shape) => {
+  if (shape.length <= 1) return Array.from(flat);
+  const stride = shape.slice(1).reduce((a, b) => a * b, 1);
+  return Array.from({ length: shape[0] }, (_, i) =>
+    reshape(flat.subarray(i * stride, (i + 1) * stride), shape.slice(1))
+  );
+};
+
+// Decode the binary payload of the backend: a uint32 header length, a JSON header
+// with the payload and the arrays descriptions, then the 4-byte aligned array buffers.
+export const decodeBinaryPayload = (buffer) => {
+  const headerLength = new DataView(buffer).getUint32(0, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+  const start = 4 + headerLength;
+  const arrays = header.arrays.map(({ dtype, shape, offset, length }) => {
+    const TypedArray = dtype === 'int32' ? Int32Array : Float32Array;
+    return reshape(new TypedArray(buffer, start + offset, length), shape);
+  });
+  const restore = (value) => {
+    if (Array.isArray(value)) return value.map(restore);
+    if (value && typeof value === 'object') {
+      if ('__array__' in value) return arrays[value.__array__];
+      return Object.fromEntries(Object.entries(value).map(([k, v]) => [k, restore(v)]));
+    }
+    return value;
+  };
+  return restore(header.payload);
+};
 
 const BandsPdosContainer = () => {
   const { steps } = useContext(WizardContext);
@@ -26,12 +58,15 @@ const BandsPdosContainer = () => {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch(`${baseURL}/api/electronic_structure/${jobId}`);
+      // the arrays are shipped as binary buffers, the decompression is done by the browser
+      const response = await fetch(
+        `${baseURL}/api/electronic_structure/${jobId}?format=binary&points=${PDOS_POINTS}`
+      );
       if (!response.ok) {
         throw new Error('Failed to fetch data');
       }
 
-      const data = await response.json();
+      const data = decodeBinaryPayload(await response.arrayBuffer());
       console.log("electronic_structure data: ", data);
       setBandsData(data.bands_data);
       setPdosData(data.pdos_data);
@@ -42,13 +77,35 @@ const BandsPdosContainer = () => {
     }
   };
 
+  // Refetch only the PDOS in the zoomed energy window, at full resolution of the plot
+  const handleEnergyRangeChange = async (range) => {
+    const params = new URLSearchParams({ format: 'binary', points: PDOS_POINTS, include_bands: false });
+    if (range) {
+      params.append('emin', range[0]);
+      params.append('emax', range[1]);
+    }
+    try {
+      const response = await fetch(`${baseURL}/api/electronic_structure/${jobId}?${params.toString()}`);
+      if (response.ok) {
+        const data = decodeBinaryPayload(await response.arrayBuffer());
+        setPdosData(data.pdos_data);
+      }
+    } catch (err) {
+      console.error('Failed to fetch the PDOS of the energy window:', err);
+    }
+  };
+
   return (
     <div>
       {loading && <Spinner animation="border" />}
       {error && <Alert variant="danger">{error}</Alert>}
       {(!bandsData && !pdosData) && !loading && !error && <Alert variant="info">No data available for plotting.</Alert>}
 
-      <BandsPdosPlot bands_data={bandsData} pdos_data={pdosData} />
+      <BandsPdosPlot
+        bands_data={bandsData}
+        pdos_data={pdosData}
+        onEnergyRangeChange={pdosData ? handleEnergyRangeChange : undefined}
+      />
     </div>
   );
 };
@@ -1,31 +1,34 @@
-import React, { useEffect, useState, useContext } from 'react';
+import React, { useEffect, useRef, useState, useContext } from 'react';
 import { Spinner } from 'react-bootstrap';
 import { WizardContext } from '../wizard/WizardContext';
 const baseURL = process.env.PUBLIC_URL || '';
 
-const TreeNode = ({ node }) => {
-  if (Array.isArray(node)) {
-    // If the node is an array, the first element is the node name,
-    // and the second element is the children (which can be an array or a string)
-    const [nodeName, children] = node;
-    return (
-      <li>
-        <strong>{nodeName}</strong>
-        {children && (
-          <ul>
-            {Array.isArray(children)
-              ? children.map((child, index) => (
-                  <TreeNode key={index} node={child} />
-                ))
-              : null}
-          </ul>
-        )}
-      </li>
-    );
-  } else {
-    // If the node is a string, simply render it
-    return <li>{node}</li>;
+const TERMINAL_STATES = ['finished', 'excepted', 'killed'];
+
+const formatProcess = (process) => {
+  const name = process.process_label || process.label || 'Process';
+  let state = process.process_state || 'created';
+  if (process.process_state === 'finished') {
+    state = `Finished [${process.exit_status}]`;
   }
+  const status = process.scheduler_state ? ` (${process.scheduler_state})` : '';
+  return `${name}<${process.id}> ${state}${status}`;
+};
+
+const TreeNode = ({ process, childrenOf }) => {
+  const children = childrenOf[process.id] || [];
+  return (
+    <li>
+      <strong>{formatProcess(process)}</strong>
+      {children.length > 0 && (
+        <ul>
+          {children.map((child) => (
+            <TreeNode key={child.id} process={child} childrenOf={childrenOf} />
+          ))}
+        </ul>
+      )}
+    </li>
+  );
 };
 
 const JobStatusTab = ({}) => {
@@ -36,85 +39,66 @@ const JobStatusTab = ({}) => {
 
   const jobId = steps[3]?.data?.['Label and Submit']?.jobId || null;
 
-  const [jobStatus, setJobStatus] = useState(null);
+  const [jobStatusKey, setJobStatusKey] = useState(0); // reconnects on change
+  // processes of the job by id, kept up to date by the server-sent events
+  const [processes, setProcesses] = useState({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const sourceRef = useRef(null);
 
   useEffect(() => {
-    let intervalId;
-    let isComponentMounted = true; // To prevent state updates after unmounting
-
-    const fetchJobStatus = async () => {
-      if (!isComponentMounted) return; // Prevent fetching if component is unmounted
+    if (!jobId) {
+      setLoading(false);
+      return;
+    }
+    const source = new EventSource(`${baseURL}/api/events/jobs/${jobId}`);
+    sourceRef.current = source;
+
+    const updateProcesses = (rows, reset = false) => {
+      setProcesses((previous) => {
+        const next = reset ? {} : { ...previous };
+        rows.forEach((row) => {
+          next[row.id] = row;
+        });
+        return next;
+      });
+      setLoading(false);
+      setError(null);
+    };
 
-      if (!jobId) {
+    source.addEventListener('snapshot', (event) => {
+      updateProcesses(JSON.parse(event.data), true);
+    });
+    source.addEventListener('update', (event) => {
+      updateProcesses([JSON.parse(event.data)]);
+    });
+    source.addEventListener('resync', () => {
+      // events were missed, reconnect to get a new snapshot
+      source.close();
+      setProcesses({});
+      setLoading(true);
+      setError(null);
+      setJobStatusKey((key) => key + 1);
+    });
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        setError('Failed to fetch job status');
         setLoading(false);
-        return;
-      }
-      // setLoading(true);
-
-      try {
-        const response = await fetch(
-          `${baseURL}/api/jobs-data/${jobId}`
-        );
-        if (!response.ok) {
-          throw new Error('Failed to fetch job status');
-        }
-        const data = await response.json();
-        if (isComponentMounted) {
-          setJobStatus(data.processStatus);
-          setLoading(false);
-          setError(null)
-        }
-
-        // Check if the job is finished
-        if (isJobFinished(data.processStatus)) {
-          handleChange('jobStatus', 'finished'); // Update job status in parent component
-          clearInterval(intervalId); // Stop polling when job is finished
-        }
-      } catch (err) {
-        if (isComponentMounted) {
-          setError(err.message);
-          setLoading(false);
-        }
-        // clearInterval(intervalId); // Stop polling on error
       }
+      // otherwise the browser reconnects by itself
     };
 
-    // Start initial fetch
-    fetchJobStatus();
-
-    // Set up polling interval (e.g., every 5 seconds)
-    intervalId = setInterval(fetchJobStatus, 5000);
+    // Close the connection when the component is unmounted
+    return () => source.close();
+  }, [jobId, jobStatusKey]);
 
-    // Cleanup function to clear interval and prevent memory leaks
-    return () => {
-      isComponentMounted = false;
-      clearInterval(intervalId);
-    };
-  }, [jobId]);
-
-  // Function to determine if the job is finished
-  const isJobFinished = (processStatus) => {
-    // Implement logic to check if all processes are finished
-    const traverse = (node) => {
-      if (Array.isArray(node)) {
-        const [nodeName, children] = node;
-        // Check if nodeName contains "Finished", "Killed" or "Failed"
-        const isFinished = nodeName.includes('Finished');
-        if (!isFinished) return false;
-        if (children && Array.isArray(children)) {
-          return children.every(traverse);
-        }
-        return isFinished;
-      } else if (typeof node === 'string') {
-        return node.includes('Finished');
-      }
-      return false;
-    };
-
-    return traverse(processStatus);
-  };
+  const jobState = processes[jobId]?.process_state;
+  useEffect(() => {
+    if (TERMINAL_STATES.includes(jobState)) {
+      sourceRef.current?.close(); // Stop listening when the job is finished
+      handleChange('jobStatus', 'finished'); // Update job status in parent component
+    }
+  }, [jobState]);
 
   const handleChange = (field, value) => {
     const newData = { ...data, [field]: value };
@@ -135,15 +119,24 @@ const JobStatusTab = ({}) => {
     return <div>Error: {error}</div>;
   }
 
-  if (!jobStatus) {
+  const job = processes[jobId];
+  if (!job) {
     return <div>No job status available.</div>;
   }
 
+  // the children of each process, from the caller of each one
+  const childrenOf = {};
+  Object.values(processes).forEach((process) => {
+    if (process.caller !== null) {
+      (childrenOf[process.caller] = childrenOf[process.caller] || []).push(process);
+    }
+  });
+
   return (
     <div>
       <h4>Job Status</h4>
       <ul style={{ listStyleType: 'none' }}>
-        <TreeNode node={jobStatus} />
+        <TreeNode process={job} childrenOf={childrenOf} />
       </ul>
     </div>
   );
@@ -31,6 +31,7 @@ const LabelGroupTab = ({}) => {
 
   const [submissionStatus, setSubmissionStatus] = useState(null); // New state for submission status
   const [loading, setLoading] = useState(false); // New loading state
+  const [restartDaemon, setRestartDaemon] = useState(false); // caching needs a daemon restart
 
   const defaultData = {
     label: '',
@@ -63,6 +64,7 @@ const LabelGroupTab = ({}) => {
       const data = await response.json();
       console.log('Submission successful:', data);
       setSubmissionStatus('success');
+      setRestartDaemon(Boolean(data.caching?.restart_daemon));
       setLoading(false); // Set loading to false after successful submission
       // alert(`Calculation submitted successfully! Process PK: ${data.job_id}`);
       handleChange('jobId', data.job_id); // Update the job_id in the parent component
@@ -118,6 +120,15 @@ const LabelGroupTab = ({}) => {
             placeholder="Enter job description"
           />
         </Form.Group>
+
+        <Form.Group className="mb-3">
+          <Form.Check
+            type="checkbox"
+            label="Reuse the results of identical calculations (AiiDA caching)"
+            checked={data.enableCaching || false}
+            onChange={(e) => handleChange('enableCaching', e.target.checked)}
+          />
+        </Form.Group>
       </Form>
       <div>
         <button
@@ -139,6 +150,11 @@ const LabelGroupTab = ({}) => {
             <Link to="/job-history">Go to Calculation History</Link>, or click the Confirm button and go to the job status and results step.
           </div>
         )}
+        {restartDaemon && (
+          <div className="alert alert-warning mt-3">
+            Caching was enabled for the profile, restart the daemon for it to apply to this job.
+          </div>
+        )}
         {submissionStatus === 'error' && (
           <div className="alert alert-danger mt-3">
             Error submitting data. Please try again.
@@ -1,8 +1,104 @@
-import React, { useState, useContext } from 'react';
+import React, { useState, useContext, useEffect } from 'react';
 import * as yaml from 'js-yaml';
+import { Table, Spinner, Alert } from 'react-bootstrap';
 import { WizardContext } from '../wizard/WizardContext';
 import { accumulateData } from './utils';
 
+const baseURL = process.env.PUBLIC_URL || '';
+
+const formatWallclock = (seconds) => `${(seconds / 3600).toFixed(1)} h`;
+
+// the resources estimated from the structure and the settings
+const ResourceEstimate = ({ steps }) => {
+  const [estimate, setEstimate] = useState(null);
+  const [error, setError] = useState(null);
+  const autoResources = steps[2]?.data?.['Basic Resource Settings']?.autoResources || false;
+  // only the structure, workflow and resources steps change the estimate
+  const settingsKey = JSON.stringify(steps.slice(0, 3).map((step) => step.data));
+
+  useEffect(() => {
+    const controller = new AbortController();
+    setEstimate(null);
+    setError(null);
+    fetch(`${baseURL}/api/resources/estimate`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(accumulateData(steps)),
+      signal: controller.signal,
+    })
+      .then(async (response) => {
+        if (!response.ok) {
+          const errorData = await response.json();
+          throw new Error(errorData.detail || response.statusText);
+        }
+        return response.json();
+      })
+      .then(setEstimate)
+      .catch((err) => {
+        if (err.name !== 'AbortError') setError(err.message);
+      });
+    return () => controller.abort();
+  }, [settingsKey]);
+
+  if (error) return <Alert variant="warning">Could not estimate the resources: {error}</Alert>;
+  if (!estimate) return <Spinner animation="border" size="sm" />;
+  const { system } = estimate;
+  return (
+    <div className="mb-4">
+      <h4>Estimated Resources</h4>
+      <p>
+        {system.natoms} atoms, {system.nbands} bands, {system.nplanewaves} plane waves,{' '}
+        {system.nkpoints} k-points (mesh {system.kpoints_mesh.join('x')}).{' '}
+        {autoResources
+          ? 'These resources are used at submission.'
+          : 'Enable the automatic resources in the resources step to use them.'}
+      </p>
+      <Table striped bordered size="sm">
+        <thead>
+          <tr>
+            <th>Code</th>
+            <th>Nodes</th>
+            <th>MPI ranks per node</th>
+            <th>OpenMP threads</th>
+            <th>Pools (-nk)</th>
+            <th>Wallclock</th>
+          </tr>
+        </thead>
+        <tbody>
+          {Object.entries(estimate.codes).map(([code, resources]) => (
+            <tr key={code}>
+              <td>{code}</td>
+              <td>{resources.nodes}</td>
+              <td>{resources.ntasks_per_node}</td>
+              <td>{resources.cpus_per_task}</td>
+              <td>{resources.parallelization?.npool ?? '-'}</td>
+              <td>{formatWallclock(resources.max_wallclock_seconds)}</td>
+            </tr>
+          ))}
+        </tbody>
+      </Table>
+      <Table striped bordered size="sm">
+        <thead>
+          <tr>
+            <th>Step</th>
+            <th>Core-hours</th>
+            <th>Wallclock</th>
+          </tr>
+        </thead>
+        <tbody>
+          {Object.entries(estimate.steps).map(([step, cost]) => (
+            <tr key={step}>
+              <td>{step}</td>
+              <td>{cost.core_hours.toFixed(2)}</td>
+              <td>{formatWallclock(cost.wallclock_seconds)}</td>
+            </tr>
+          ))}
+        </tbody>
+      </Table>
+    </div>
+  );
+};
+
 const ReviewAndSubmitTab = ({}) => {
   const stepIndex = 3;
   const tabTitle = 'Review Settings';
@@ -32,6 +128,7 @@ const ReviewAndSubmitTab = ({}) => {
 
   return (
     <div>
+      <ResourceEstimate steps={steps} />
       <h3>Review and Edit</h3>
       {isEditing ? (
         <div>
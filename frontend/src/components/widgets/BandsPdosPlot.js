@@ -9,7 +9,7 @@ const colorPalette = [
   '#e377c2', '#7f7f7f', '#bcbd22', '#17becf', '#1f77b4', '#ffbb78',
 ];
 
-const BandsPdosPlot = ({ bands_data, pdos_data }) => {
+const BandsPdosPlot = ({ bands_data, pdos_data, onEnergyRangeChange }) => {
   const [groupTag, setGroupTag] = useState('kinds');
   const [plotTag, setPlotTag] = useState('total');
   const [selectedAtoms, setSelectedAtoms] = useState('');
@@ -64,6 +64,7 @@ const BandsPdosPlot = ({ bands_data, pdos_data }) => {
     const plotLayout = {
       showlegend: true,
       plot_bgcolor: 'white',
+      uirevision: 'energy', // keep the zoom when the PDOS of a zoomed window is loaded
     };
 
     const hasBandsData = bands_data != null;
@@ -296,7 +297,8 @@ const BandsPdosPlot = ({ bands_data, pdos_data }) => {
       const spinLabel = spin === 1 ? ' (↑)' : spin === -1 ? ' (↓)' : '';
 
       // Format position for atom identifier with two decimal precision
-      const positionStr = orbital.position.map((coord) => coord.toFixed(2)).join(',');
+      // the position is missing when the projections were aggregated by kind or element
+      const positionStr = orbital.position ? orbital.position.map((coord) => coord.toFixed(2)).join(',') : '';
 
       // Determine if this PDOS contribution should be included based on selectedAtoms
       if (selectedAtomPositions.length > 0 && positionStr !== null) {
@@ -368,6 +370,21 @@ const BandsPdosPlot = ({ bands_data, pdos_data }) => {
     return orbitalLabels[l]?.[m] || `l=${l}, m=${m}`;
   };
 
+  // Report the zoomed energy range (absolute, not shifted by the Fermi energy), or null on reset
+  const handleRelayout = (event) => {
+    if (!onEnergyRangeChange) return;
+    const axis = bands_data ? 'yaxis' : 'xaxis'; // the energy is on the y axis next to the bands
+    const { fermi_energy_up: fermiEnergy } = getFermiEnergy();
+    if (event[`${axis}.autorange`]) {
+      onEnergyRangeChange(null);
+    } else if (event[`${axis}.range[0]`] !== undefined) {
+      onEnergyRangeChange([
+        event[`${axis}.range[0]`] + fermiEnergy,
+        event[`${axis}.range[1]`] + fermiEnergy,
+      ]);
+    }
+  };
+
   // Helper function to transpose a 2D array
   const transpose2DArray = (array) => array[0].map((_, colIndex) => array.map(row => row[colIndex]));
 
@@ -426,6 +443,7 @@ const BandsPdosPlot = ({ bands_data, pdos_data }) => {
           config={{ responsive: true }}
           style={{ width: '100%', height: '600px' }}
           useResizeHandler={true}
+          onRelayout={handleRelayout}
         />
       )}
     </div>
@@ -0,0 +1,10 @@
+"""Fixtures of the tests.
+
+The tests of the backend need AiiDA: its fixtures, which create a temporary
+profile, are only loaded when it is installed, and those tests are skipped
+otherwise.
+"""
+import importlib.util
+
+if importlib.util.find_spec("aiida") is not None:
+    pytest_plugins = ["aiida.tools.pytest_fixtures"]
@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("aiida")
+
+from aiida.manage import get_config, get_manager  # noqa: E402
+
+from aiida_qe_app.backend.app.caching import (  # noqa: E402
+    CACHED_CALCULATIONS,
+    enable_caching,
+)
+
+pytestmark = pytest.mark.usefixtures("aiida_profile_clean")
+
+
+def test_enable_caching_once():
+    other = "aiida.calculations:core.arithmetic.add"
+    config = get_config()
+    profile = get_manager().get_profile()
+    config.set_option("caching.enabled_for", [other], scope=profile.name)
+
+    assert enable_caching()
+    enabled_for = config.get_option("caching.enabled_for", scope=profile.name)
+    assert enabled_for == [other, *CACHED_CALCULATIONS]
+    assert not enable_caching()
@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("aiida")
+pytest.importorskip("fastapi")
+
+from aiida import orm  # noqa: E402
+
+from aiida_qe_app.backend.app.calculation import (  # noqa: E402
+    _get_pseudo_family_state,
+)
+
+pytestmark = pytest.mark.usefixtures("aiida_profile_clean")
+
+
+def test_pseudo_family_state():
+    group = orm.Group(label="family").store()
+    pseudo = orm.Int(1).store()
+    group.add_nodes(pseudo)
+    state = _get_pseudo_family_state(group.uuid)
+    assert state == _get_pseudo_family_state(group.uuid)
+    assert state[0] == 1
+
+    # the cutoffs are stored in the extras of the group
+    group.base.extras.set("_cutoffs", {"normal": {"Si": {"cutoff_wfc": 30.0}}})
+    assert _get_pseudo_family_state(group.uuid) != state
+    state = _get_pseudo_family_state(group.uuid)
+
+    pseudo.base.extras.set("modified", True)
+    assert _get_pseudo_family_state(group.uuid) != state
+
+    orm.Group.collection.delete(group.pk)
+    assert _get_pseudo_family_state(group.uuid) is None
@@ -0,0 +1,72 @@
+import json
+import signal
+
+import pytest
+from click.testing import CliRunner
+
+from aiida_qe_app import cli
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Run the commands in a temporary directory, with a fake server process."""
+    pytest.importorskip("pydantic_settings")
+    monkeypatch.chdir(tmp_path)
+    state = {"running": {42}, "signals": [], "started": []}
+
+    def kill(pid, sig):
+        if pid not in state["running"]:
+            raise ProcessLookupError(pid)
+        if sig:
+            state["signals"].append(sig)
+        if sig == signal.SIGTERM:
+            state["running"].discard(pid)
+
+    class Popen:
+        def __init__(self, command, env):
+            self.pid = 43
+            state["running"].add(self.pid)
+            state["started"].append((command, env))
+
+    monkeypatch.setattr(cli.os, "kill", kill)
+    monkeypatch.setattr(cli.subprocess, "Popen", Popen)
+    return state
+
+
+def test_read_server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert cli.read_server() is None
+    cli.write_server(42, ["python", "-m", "gunicorn", "app"], {})
+    assert cli.read_server()["server"] == "gunicorn"
+    # a PID file written by an older version holds only the PID
+    with open(cli.PID_FILE, "w") as f:
+        f.write("42")
+    assert cli.read_server() == {"pid": 42}
+
+
+def test_restart_gunicorn(server):
+    cli.write_server(42, ["python", "-m", "gunicorn", "app"], {})
+    result = CliRunner().invoke(cli.cli, ["restart"])
+    assert result.exit_code == 0, result.output
+    assert server["signals"] == [signal.SIGHUP]
+    assert server["started"] == []
+
+
+def test_restart_uvicorn(server):
+    command = ["python", "-m", "uvicorn", "app", "--reload"]
+    cli.write_server(42, command, {"QEAPP_LOG_LEVEL": "info"})
+    result = CliRunner().invoke(cli.cli, ["restart"])
+    assert result.exit_code == 0, result.output
+    assert server["signals"] == [signal.SIGTERM]
+    assert server["started"][0][0] == command
+    assert server["started"][0][1]["QEAPP_LOG_LEVEL"] == "info"
+    with open(cli.PID_FILE) as f:
+        assert json.load(f)["pid"] == 43
+
+
+def test_restart_without_options(server):
+    with open(cli.PID_FILE, "w") as f:
+        f.write("42")
+    result = CliRunner().invoke(cli.cli, ["restart"])
+    assert result.exit_code != 0
+    assert server["signals"] == []
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("aiida")
+pytest.importorskip("fastapi")
+
+from aiida import orm  # noqa: E402
+
+from aiida_qe_app.backend.app.datanode import (  # noqa: E402
+    parse_slices,
+    read_array_slice,
+)
+
+
+def test_parse_slices():
+    assert parse_slices("0:10, ::2,3") == (slice(0, 10), slice(None, None, 2), 3)
+    assert parse_slices("-1") == (-1,)
+    for value in ("1:2:3:4", "a:b", ""):
+        with pytest.raises(ValueError):
+            parse_slices(value)
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+@pytest.mark.parametrize(
+    "slices",
+    ["0:3", "2:7", "::3,1:", "-1", "5,2", "8:1:-2,::2,0", "7:2", "::-1,-1,::-1"],
+)
+def test_read_array_slice(slices):
+    array = np.arange(10 * 4 * 3, dtype=float).reshape(10, 4, 3)
+    node = orm.ArrayData()
+    node.set_array("values", array)
+    node.set_array("fortran", np.asfortranarray(array))
+    node.store()
+    index = parse_slices(slices)
+    for name in ("values", "fortran"):
+        expected = node.get_array(name)[index]
+        result = read_array_slice(node, name, index)
+        assert result.shape == expected.shape
+        np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_read_array_slice_checks_size_first():
+    node = orm.ArrayData()
+    node.set_array("values", np.zeros((100, 10)))
+    node.store()
+    sizes = []
+    read_array_slice(node, "values", parse_slices("0:5,0:2"), check_size=sizes.append)
+    assert sizes == [5 * 2 * 8]
+    with pytest.raises(ValueError):
+        read_array_slice(node, "values", parse_slices("0:5,0:2,1"))
+    with pytest.raises(ValueError):
+        read_array_slice(node, "values", parse_slices("100"))
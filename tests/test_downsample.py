@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from aiida_qe_app.backend.app.plugins.electronic_structure.downsample import (
+    aggregate_projections,
+    lttb_indices,
+    reduce_pdos_data,
+)
+
+
+def test_lttb_keeps_all_points_below_threshold():
+    x = np.linspace(0, 1, 10)
+    np.testing.assert_array_equal(lttb_indices(x, x, 10), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(x, x, 2), np.arange(10))
+
+
+def test_lttb_indices():
+    x = np.linspace(-10, 10, 1001)
+    y = np.exp(-((x - 3.3) ** 2) / 0.01)
+    indices = lttb_indices(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+    # the narrow peak is kept, a uniform decimation misses it
+    assert y[indices].max() > 0.9
+    assert y[np.linspace(0, len(x) - 1, 50).astype(int)].max() < 0.5
+
+
+def _pdos_data(size=200):
+    energy = np.linspace(-5, 5, size)
+    curve = np.exp(-(energy**2))
+    orbitals = [
+        {"kind_name": "Si1", "position": [0, 0, 0], "angular_momentum": 0},
+        {"kind_name": "Si2", "position": [1, 1, 1], "angular_momentum": 0},
+    ]
+    return {
+        "energy_dos": energy.tolist(),
+        "tdos": {"dos": (2 * curve).tolist()},
+        "projections": [
+            {"orbital": orbital, "pdos": curve.tolist(), "energy": energy.tolist()}
+            for orbital in orbitals
+        ],
+    }
+
+
+def test_aggregate_projections():
+    projections = _pdos_data()["projections"]
+    assert len(aggregate_projections(projections, "kind")) == 2
+    (element,) = aggregate_projections(projections, "element")
+    assert element["orbital"]["kind_name"] == "Si"
+    np.testing.assert_allclose(element["pdos"], 2 * np.asarray(projections[0]["pdos"]))
+
+
+def test_reduce_pdos_data():
+    data = _pdos_data()
+    assert reduce_pdos_data(data) is data
+    reduced = reduce_pdos_data(data, points=20, emin=-2, emax=2, aggregate="element")
+    assert len(reduced["energy_dos"]) == 20
+    assert min(reduced["energy_dos"]) >= -2 and max(reduced["energy_dos"]) <= 2
+    assert len(reduced["projections"]) == 1
+    assert len(reduced["projections"][0]["pdos"]) == 20
+    with pytest.raises(ValueError):
+        reduce_pdos_data(data, aggregate="atom")
@@ -0,0 +1,90 @@
+import re
+
+import pytest
+
+pytest.importorskip("aiida")
+
+from aiida import orm  # noqa: E402
+
+from aiida_qe_app.backend.app.indexes import (  # noqa: E402
+    FORMULA_EXTRA,
+    backfill_formula_extra,
+    create_search_indexes,
+    uses_postgresql,
+)
+from aiida_qe_app.backend.app.structures import (  # noqa: E402
+    STRUCTURE_HASH_EXTRA,
+    find_structure,
+)
+
+pytestmark = pytest.mark.usefixtures("aiida_profile_clean")
+
+
+def _structure(symbol="Si"):
+    structure = orm.StructureData(cell=[[4.0, 0, 0], [0, 4.0, 0], [0, 0, 4.0]])
+    structure.append_atom(position=(0.0, 0.0, 0.0), symbols=symbol)
+    return structure.store()
+
+
+def _explain(query) -> str:
+    """Return the plan of the SQLAlchemy query, with the sequential scans off."""
+    from sqlalchemy import text
+
+    session = query.session
+    compiled = query.statement.compile(
+        dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = session.execute(text(f"EXPLAIN {compiled}")).fetchall()
+    session.rollback()
+    return "\n".join(line for line, in plan)
+
+
+@pytest.fixture
+def search_indexes():
+    if not uses_postgresql():
+        pytest.skip("The search indexes require PostgreSQL")
+    status = create_search_indexes()
+    assert set(status.values()) == {"ok"}, status
+
+
+def test_backfill_formula_extra():
+    old = _structure("Si")
+    new = _structure("Ge")
+    new.base.extras.set(FORMULA_EXTRA, "Ge")
+    assert backfill_formula_extra(dry_run=True) == 1
+    assert FORMULA_EXTRA not in old.base.extras.all
+    assert backfill_formula_extra() == 1
+    assert old.base.extras.get(FORMULA_EXTRA) == "Si"
+    assert backfill_formula_extra() == 0
+
+
+def test_find_structure():
+    first = _structure()
+    second = _structure()
+    for structure in (first, second):
+        structure.base.extras.set(STRUCTURE_HASH_EXTRA, "abc")
+    assert find_structure("abc").pk == first.pk
+    assert find_structure("other") is None
+
+
+def test_structure_hash_uses_index(search_indexes):
+    from aiida_qe_app.backend.app.structures import _find_structure_query
+
+    plan = _explain(_find_structure_query("abc"))
+    assert re.search(r"\bix_qeapp_db_dbnode_structure_hash\b", plan), plan
+
+
+@pytest.mark.parametrize(
+    "match, index",
+    [
+        ("prefix", "ix_qeapp_db_dbnode_formula"),
+        ("contains", "ix_qeapp_db_dbnode_formula_trgm"),
+    ],
+)
+def test_formula_search_uses_index(search_indexes, match, index):
+    pytest.importorskip("fastapi")
+    from aiida_qe_app.backend.app.datanode import _formula_search_query
+
+    plan = _explain(_formula_search_query(None, None, None, "SiO", match, None))
+    assert re.search(rf"\b{index}\b", plan), plan
@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip("aiida")
+pytest.importorskip("fastapi")
+
+from aiida import orm  # noqa: E402
+from aiida.common.links import LinkType  # noqa: E402
+
+from aiida_qe_app.backend.app import instrumentation  # noqa: E402
+from aiida_qe_app.backend.app.cache import ResultCache  # noqa: E402
+from aiida_qe_app.backend.app.instrumentation import (  # noqa: E402
+    count_atoms,
+    get_calcjob_timings,
+    get_percentiles,
+    get_structure_size,
+)
+
+
+@pytest.mark.parametrize(
+    "formula, natoms",
+    [("Si2O6", 8), ("Si", 1), ("H2O", 3), ("LiFePO4", 7), ("", None), (None, None)],
+)
+def test_count_atoms(formula, natoms):
+    assert count_atoms(formula) == natoms
+
+
+def test_structure_size():
+    assert get_structure_size(None) == "unknown"
+    assert get_structure_size(10) == "1-10"
+    assert get_structure_size(11) == "11-50"
+    assert get_structure_size(201) == ">200"
+
+
+def test_percentiles():
+    summary = get_percentiles([float(value) for value in range(100, 0, -1)] + [None])
+    assert summary == {"count": 100, "p50": 50.0, "p90": 90.0, "p99": 99.0}
+    assert get_percentiles([3.0]) == {"count": 1, "p50": 3.0, "p90": 3.0, "p99": 3.0}
+    assert get_percentiles([]) == {"count": 0, "p50": None, "p90": None, "p99": None}
+
+
+@pytest.mark.usefixtures("aiida_profile_clean")
+def test_retrieved_size_is_cached(aiida_localhost, tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path, 10**6)
+    monkeypatch.setattr(instrumentation, "get_result_cache", lambda: cache)
+    calcjob = orm.CalcJobNode(
+        computer=aiida_localhost,
+        process_type="aiida.calculations:core.arithmetic.add",
+    ).store()
+    retrieved = orm.FolderData()
+    retrieved.base.repository.put_object_from_bytes(b"output", "aiida.out")
+    retrieved.base.repository.put_object_from_bytes(b"{}", "data/result.json")
+    retrieved.base.links.add_incoming(calcjob, LinkType.CREATE, "retrieved")
+    retrieved.store()
+
+    expected = {"files": 2, "bytes": 8}
+    assert get_calcjob_timings([calcjob.pk])[0]["retrieved"] == expected
+
+    def read_folder_size(node):
+        raise AssertionError("the files of a retrieved folder are opened again")
+
+    monkeypatch.setattr(instrumentation, "_read_folder_size", read_folder_size)
+    assert get_calcjob_timings([calcjob.pk])[0]["retrieved"] == expected
@@ -0,0 +1,57 @@
+import itertools
+
+import pytest
+
+from aiida_qe_app.backend.app.resources import (
+    MAX_WALLCLOCK,
+    MIN_WALLCLOCK,
+    get_wallclock,
+    propose_resources,
+)
+
+
+def test_resources_within_node_limit():
+    resources = propose_resources(1e9, 3, 500, 2, 6)
+    assert resources["nodes"] <= 2
+    assert resources["ntasks_per_node"] * resources["cpus_per_task"] <= 6
+
+
+@pytest.mark.parametrize(
+    "core_seconds, nks, nplanewaves, nodes, cores_per_node",
+    list(
+        itertools.product(
+            [1.0, 1e5, 1e9], [1, 3, 7, 64], [500, 5000, 200000], [1, 2, 3], [1, 6, 48]
+        )
+    ),
+)
+def test_resources_fit_the_nodes(core_seconds, nks, nplanewaves, nodes, cores_per_node):
+    resources = propose_resources(core_seconds, nks, nplanewaves, nodes, cores_per_node)
+    assert 1 <= resources["nodes"] <= nodes
+    assert resources["ntasks_per_node"] >= 1
+    assert resources["ntasks_per_node"] * resources["cpus_per_task"] <= cores_per_node
+    ranks = resources["nodes"] * resources["ntasks_per_node"]
+    npool = resources["parallelization"]["npool"]
+    assert 1 <= npool <= nks
+    assert ranks % npool == 0
+
+
+def test_small_calculation_uses_one_core():
+    resources = propose_resources(60.0, 1, 500, 4, 48)
+    assert resources == {
+        "nodes": 1,
+        "ntasks_per_node": 1,
+        "cpus_per_task": 1,
+        "parallelization": {"npool": 1},
+    }
+
+
+def test_pools_do_not_exceed_max_npool():
+    resources = propose_resources(1e9, 16, 5000, 1, 48, max_npool=2)
+    assert resources["parallelization"]["npool"] <= 2
+
+
+def test_wallclock_bounds():
+    resources = {"nodes": 1, "ntasks_per_node": 1, "cpus_per_task": 1}
+    assert get_wallclock(1.0, resources) == MIN_WALLCLOCK
+    assert get_wallclock(1e12, resources) == MAX_WALLCLOCK
+    assert get_wallclock(3 * 3600, resources) % MIN_WALLCLOCK == 0
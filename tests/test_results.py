@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("aiida")
+
+from aiida import orm  # noqa: E402
+from aiida.common.exceptions import NotExistent  # noqa: E402
+from aiida.common.links import LinkType  # noqa: E402
+
+from aiida_qe_app.backend.app.results import JobResults  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("aiida_profile_clean")
+
+
+def _call(caller, label):
+    process = orm.WorkflowNode()
+    process.base.links.add_incoming(caller, LinkType.CALL_WORK, label)
+    return process.store()
+
+
+def _return(process, label, node):
+    node.store()
+    node.base.links.add_incoming(process, LinkType.RETURN, label)
+    return node
+
+
+def test_job_without_called_processes():
+    job = orm.WorkflowNode().store()
+    results = JobResults.from_pk(job.pk, outputs=["output_structure"])
+    assert results.node.pk == job.pk
+    assert results.get_called("relax") is None
+    assert results.get_structure() is None
+
+
+def test_job_without_output_structure():
+    job = orm.WorkflowNode().store()
+    relax = _call(job, "relax")
+    _return(relax, "output_parameters", orm.Dict({"energy": 1.0}))
+    results = JobResults.from_pk(job.pk, outputs=["output_structure"])
+    assert results.get_called("relax").pk == relax.pk
+    assert "output_parameters" not in results.get_outputs("relax")
+    assert results.get_structure() is None
+
+
+def test_job_outputs():
+    job = orm.WorkflowNode().store()
+    relax = _call(job, "relax")
+    _call(job, "pdos")
+    structure = orm.StructureData(cell=[[4, 0, 0], [0, 4, 0], [0, 0, 4]])
+    structure.append_atom(position=(0, 0, 0), symbols="Si")
+    _return(relax, "output_structure", structure)
+    _return(relax, "output_parameters", orm.Dict({"energy": 1.0}))
+    results = JobResults.from_pk(job.pk)
+    assert results.get_outputs("relax").output_parameters["energy"] == 1.0
+    assert results.get_outputs("pdos") == {}
+    assert results.get_structure()["cell"] == structure.cell
+
+
+def test_missing_job():
+    with pytest.raises(NotExistent):
+        JobResults.from_pk(orm.Int(1).store().pk)
@@ -0,0 +1,95 @@
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+from aiida_qe_app.backend.app.tasks import (  # noqa: E402
+    DeleteTask,
+    TaskRegistry,
+    TaskStore,
+)
+
+
+@pytest.fixture
+def registries(tmp_path):
+    """Two registries sharing the task directory, like two server workers."""
+    registries = [TaskRegistry(TaskStore(tmp_path)) for _ in range(2)]
+    yield registries
+    for registry in registries:
+        registry.shutdown()
+
+
+def test_task_of_another_worker(registries):
+    task = DeleteTask([1, 2], store=registries[0].store)
+    task.save()
+    state = registries[1].get(task.id)
+    assert state["ids"] == [1, 2]
+    assert state["state"] == "queued"
+    assert [state["id"] for state in registries[1].list()] == [task.id]
+
+
+def test_cancel_from_another_worker(registries):
+    task = DeleteTask([1], store=registries[0].store)
+    task.save()
+    assert not task.cancelled
+    registries[1].cancel(task.id)
+    assert task.cancelled
+    # the worker running the task stops before starting it
+    task.run()
+    assert registries[1].get(task.id)["state"] == "cancelled"
+
+
+def test_missing_task(registries):
+    with pytest.raises(HTTPException):
+        registries[0].get("0" * 32)
+    with pytest.raises(HTTPException):
+        registries[0].get("../config")
+
+
+def test_prune(tmp_path):
+    store = TaskStore(tmp_path)
+    tasks = [DeleteTask([i], store=store) for i in range(3)]
+    for i, task in enumerate(tasks):
+        task.created = i
+        task.state = "finished"
+        task.save()
+    store.prune(max_tasks=2)
+    assert [state["ids"] for state in store.list()] == [[2], [1]]
+
+
+def _store_workflow():
+    """Store a workflow calling a calculation that creates a data node."""
+    from aiida import orm
+    from aiida.common.links import LinkType
+
+    workflow = orm.WorkflowNode().store()
+    calculation = orm.CalculationNode()
+    calculation.base.links.add_incoming(workflow, LinkType.CALL_CALC, "call")
+    calculation.store()
+    data = orm.Int(1)
+    data.base.links.add_incoming(calculation, LinkType.CREATE, "result")
+    data.store()
+    return workflow, calculation, data
+
+
+@pytest.mark.parametrize("dry_run", [False, True])
+def test_delete_task(dry_run, request):
+    pytest.importorskip("aiida")
+    request.getfixturevalue("aiida_profile_clean")
+    from aiida import orm
+
+    first = _store_workflow()
+    second = _store_workflow()
+    # the data node takes its creator and the caller of the creator with it, while
+    # the calculation called by the second workflow is kept
+    task = DeleteTask([first[2].pk, first[1].pk, second[0].pk], dry_run=dry_run)
+    task.run()
+    assert task.state == "finished"
+    assert task.total == 4
+    assert task.deleted == (0 if dry_run else 4)
+    remaining = orm.QueryBuilder().append(orm.Node, project="id").all(flat=True)
+    expected = [second[1].pk, second[2].pk]
+    if dry_run:
+        expected += [node.pk for node in first] + [second[0].pk]
+    assert sorted(remaining) == sorted(expected)
@@ -0,0 +1,115 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("aiida")
+
+from aiida_qe_app.backend.app.utils import (  # noqa: E402
+    decode_cursor,
+    encode_cursor,
+    keyset_filters,
+)
+
+CTIME = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(CTIME, 42)) == (CTIME, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", encode_cursor(CTIME, 1)[:-4]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_filters():
+    cursor = encode_cursor(CTIME, 42)
+    assert keyset_filters(None) == {}
+    assert keyset_filters(cursor) == {
+        "or": [
+            {"ctime": {"<": CTIME}},
+            {"and": [{"ctime": {"==": CTIME}}, {"id": {"<": 42}}]},
+        ]
+    }
+    assert keyset_filters(cursor, ascending=True) == {
+        "or": [
+            {"ctime": {">": CTIME}},
+            {"and": [{"ctime": {"==": CTIME}}, {"id": {">": 42}}]},
+        ]
+    }
+
+
+class _Executor:
+    """Stand-in for the backend executor that runs the calls on a thread pool."""
+
+    def __init__(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.pool = ThreadPoolExecutor(4)
+
+    async def run(self, func, *args):
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+
+def _stream(rows, chunk_size, limit=None):
+    import asyncio
+
+    from aiida_qe_app.backend.app import executor, utils
+
+    async def consume():
+        response = utils.ndjson_response(rows, chunk_size=chunk_size)
+        chunks = []
+        async for chunk in response.body_iterator:
+            chunks.append(chunk)
+            if limit is not None and len(chunks) == limit:
+                break
+        await response.body_iterator.aclose()
+        return chunks
+
+    original = executor.get_executor
+    executor.get_executor = lambda: _Executor()
+    try:
+        return asyncio.run(consume())
+    finally:
+        executor.get_executor = original
+
+
+def _rows(count, threads, closed):
+    import threading
+
+    try:
+        for index in range(count):
+            threads.add(threading.get_ident())
+            yield {"id": index}
+    finally:
+        closed.append(True)
+
+
+def test_ndjson_response_streams_from_one_thread():
+    pytest.importorskip("fastapi")
+    threads, closed = set(), []
+    chunks = _stream(_rows(35, threads, closed), chunk_size=10)
+    lines = "".join(chunks).splitlines()
+    assert len(chunks) == 4
+    assert [json.loads(line)["id"] for line in lines] == list(range(35))
+    assert len(threads) == 1
+    assert closed == [True]
+
+
+def test_ndjson_response_closes_rows_on_disconnect():
+    pytest.importorskip("fastapi")
+    threads, closed = set(), []
+    chunks = _stream(_rows(1000, threads, closed), chunk_size=10, limit=1)
+    assert len(chunks) == 1
+    # the producer finishes in the pool once the consumer stops
+    for _ in range(100):
+        if closed:
+            break
+        time.sleep(0.01)
+    assert closed == [True]
+    assert len(threads) == 1
@@ -0,0 +1,141 @@
+import pytest
+
+from aiida_qe_app.workflows.utils import (
+    disable_caching,
+    get_nscf_paths,
+    get_shared_scf_plugins,
+    reuse_scf,
+    supports_scf_reuse,
+    update_plugin_inputs,
+)
+
+
+class Namespace(dict):
+    """Stand-in of a namespace of ports, only the ``required`` flag is used."""
+
+    def __init__(self, required=False, **ports):
+        super().__init__(**ports)
+        self.required = required
+
+
+def _workchain(**ports):
+    class Spec:
+        inputs = Namespace(**ports)
+
+        def has_input(self, name):
+            return name in self.inputs
+
+    class WorkChain:
+        @staticmethod
+        def spec():
+            return Spec()
+
+    return WorkChain
+
+
+# starts from the folder of an SCF, like the ``PdosWorkChain``
+PDOS = _workchain(scf=Namespace(), nscf=Namespace(pw=Namespace(parent_folder=object())))
+# runs its own SCF in a nested workchain, like the bands plugin
+BANDS = _workchain(bands=Namespace(scf=Namespace(required=True)))
+# runs no SCF
+OTHER = _workchain(structure=object())
+
+
+def test_supports_scf_reuse():
+    assert supports_scf_reuse(PDOS)
+    assert not supports_scf_reuse(BANDS)
+    assert not supports_scf_reuse(OTHER)
+
+
+@pytest.mark.parametrize(
+    "plugins, shared",
+    [
+        ({"pdos": PDOS, "bands": BANDS}, []),
+        ({"pdos": PDOS, "bands": BANDS, "xps": PDOS}, ["pdos", "xps"]),
+        ({"pdos": PDOS}, []),
+        ({"pdos": PDOS, "other": OTHER}, []),
+        ({"bands": BANDS, "other": BANDS}, []),
+    ],
+)
+def test_shared_scf_plugins(plugins, shared):
+    assert get_shared_scf_plugins(plugins) == shared
+
+
+def test_reuse_scf_inputs():
+    pytest.importorskip("aiida")
+    from aiida.common import AttributeDict
+
+    inputs = AttributeDict(
+        {
+            "scf": AttributeDict({"pw": AttributeDict()}),
+            "nscf": AttributeDict({"pw": AttributeDict()}),
+        }
+    )
+    folder = object()
+    reuse_scf(inputs, folder)
+    assert "scf" not in inputs
+    assert inputs.nscf.pw.parent_folder is folder
+
+
+def test_quantumespresso_workchains():
+    pytest.importorskip("aiida_quantumespresso")
+    from aiida_quantumespresso.workflows.pdos import PdosWorkChain
+    from aiida_quantumespresso.workflows.pw.bands import PwBandsWorkChain
+
+    assert supports_scf_reuse(PdosWorkChain)
+    assert not supports_scf_reuse(PwBandsWorkChain)
+    assert (
+        get_shared_scf_plugins({"pdos": PdosWorkChain, "bands": PwBandsWorkChain}) == []
+    )
+
+
+def test_nscf_paths():
+    parameters = {"SYSTEM": {}}
+    pdos = {
+        "scf": {"pw": {"parameters": parameters}},
+        "nscf": {"pw": {"parameters": parameters}},
+    }
+    bands = {
+        "bands": {
+            "scf": {"pw": {"parameters": parameters}},
+            "bands": {"pw": {"parameters": parameters}},
+        }
+    }
+    assert get_nscf_paths(pdos) == ["nscf.pw"]
+    assert get_nscf_paths(bands) == ["bands.bands.pw"]
+    assert get_nscf_paths({"nscf": {"pw": {}}}) == []
+
+
+def test_update_nested_builder(request):
+    pytest.importorskip("aiida_quantumespresso")
+    request.getfixturevalue("aiida_profile")
+    from aiida import orm
+    from aiida_quantumespresso.workflows.pw.bands import PwBandsWorkChain
+
+    builder = PwBandsWorkChain.get_builder()
+    builder.scf.pw.parameters = orm.Dict({"SYSTEM": {"ecutwfc": 30}})
+    builder.bands.pw.parameters = orm.Dict({"SYSTEM": {"ecutwfc": 30}})
+    # the bands plugin exposes the ``PwBandsWorkChain`` in its ``bands`` namespace
+    update_plugin_inputs({"bands": builder}, {"number_of_bands": 12})
+    assert builder.bands.pw.parameters["SYSTEM"] == {"ecutwfc": 30, "nbnd": 12}
+    assert builder.scf.pw.parameters["SYSTEM"] == {"ecutwfc": 30}
+
+
+def test_disable_caching(request):
+    pytest.importorskip("aiida_quantumespresso")
+    from aiida import orm
+    from aiida_quantumespresso.workflows.pw.bands import PwBandsWorkChain
+
+    code = orm.InstalledCode(
+        computer=request.getfixturevalue("aiida_localhost"),
+        filepath_executable="/bin/true",
+    ).store()
+    builder = PwBandsWorkChain.get_builder()
+    builder.scf.pw.code = code
+    builder.bands.pw.code = code
+    disable_caching(builder)
+    assert builder.scf.pw.metadata.disable_cache
+    assert builder.bands.pw.metadata.disable_cache
+    # the namespaces of the work chains are left as they are
+    assert "disable_cache" not in builder.metadata
+    assert "disable_cache" not in builder.scf.metadata